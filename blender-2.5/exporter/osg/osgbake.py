@@ -30,6 +30,19 @@ def pose_frame_info(obj):
 def obj_frame_info(obj):
     return obj.matrix_local.copy()
 
+class BakedTransforms(object):
+    # in memory result of bakeBatch, the sampled matrices of the object
+    # (prefix "") and of its pose bones by data path prefix. the channels
+    # are built from them without creating an action
+    def __init__(self, name, frame_range):
+        self.name = name
+        self.frames = list(frame_range)
+        self.frame_range = (0, 0)
+        if len(self.frames) > 0:
+            self.frame_range = (self.frames[0], self.frames[-1])
+        # prefix -> (rotation mode, matrix of each frame)
+        self.transforms = {}
+
 def bakedTransforms(scene,
          obj,
          frame_start,
@@ -38,10 +51,25 @@ def bakedTransforms(scene,
          do_pose=True,
          do_object=True):
 
+    (frame_range, infos) = bakedTransformsBatch(scene, [obj], frame_start, frame_end, step, do_pose, do_object)
+    (obj_info, pose_info) = infos[obj]
+    return (frame_range, obj_info, pose_info)
+
+def bakedTransformsBatch(scene,
+         objects,
+         frame_start,
+         frame_end,
+         step=1,
+         do_pose=True,
+         do_object=True):
+    # the scene is evaluated once per frame and every object is sampled
+    # in the same pass, returns (obj_info, pose_info) for each object
+
     frame_back = scene.frame_current
 
-    pose_info = []
-    obj_info = []
+    infos = {}
+    for obj in objects:
+        infos[obj] = ([], [])
 
     f = frame_start
     frame_range = []
@@ -50,28 +78,31 @@ def bakedTransforms(scene,
         f += step
     #frame_range = range(frame_start, frame_end + 1, step)
     
-    if obj.type == "ARMATURE":
-        original_pose_position = obj.data.pose_position
+    # the baked armatures are in pose position while they are sampled,
+    # pass one armature per call to keep the others in rest position
+    armatures = [obj for obj in objects if obj.type == "ARMATURE"]
+    for obj in armatures:
         obj.data.pose_position = 'POSE'
 
     # -------------------------------------------------------------------------
     # Collect transformations
 
-    # could speed this up by applying steps here too...
     for f in frame_range:
         scene.frame_set(f)
 
-        if do_pose:
-            pose_info.append(pose_frame_info(obj))
-        if do_object:
-            obj_info.append(obj_frame_info(obj))
+        for obj in objects:
+            (obj_info, pose_info) = infos[obj]
+            if do_pose and obj.pose is not None:
+                pose_info.append(pose_frame_info(obj))
+            if do_object:
+                obj_info.append(obj_frame_info(obj))
             
     scene.frame_set(frame_back)
     
-    if obj.type == "ARMATURE":
+    for obj in armatures:
         obj.data.pose_position = 'REST'
             
-    return (frame_range, obj_info, pose_info)
+    return (frame_range, infos)
     
 def action_fcurve_ensure(action, data_path, array_index):
     for fcu in action.fcurves:
@@ -145,25 +176,94 @@ def bake(scene,
          do_pose=True,
          do_object=True,
          do_constraint_clear=False,
-         to_quat=False):
-         
-    pose = obj.pose
-    
-    if pose is None:
-        do_pose = False
+         to_quat=False,
+         in_memory=False):
+
+    actions = bakeBatch(scene, [obj], frame_start, frame_end, step, only_selected,
+                        do_pose, do_object, do_constraint_clear, to_quat, in_memory)
+    return actions.get(obj)
+
+def bakeBatch(scene,
+         objects,
+         frame_start,
+         frame_end, step=1,
+         only_selected=False,
+         do_pose=True,
+         do_object=True,
+         do_constraint_clear=False,
+         to_quat=False,
+         in_memory=False):
+    # bake several objects on the same frame range, returns an action for
+    # each object that had something to bake. with in_memory the sampled
+    # matrices are returned in a BakedTransforms instead of an action
 
     if do_pose is None and do_object is None:
-        return None
+        return {}
 
     if to_quat:
-        print("Change rotation to QUATERNION")
-        obj.rotation_mode = 'QUATERNION'
-        print("rotation " + obj.rotation_mode)
+        for obj in objects:
+            osglog.log("change rotation of %s to QUATERNION", obj.name, subsystem="animation")
+            obj.rotation_mode = 'QUATERNION'
+
 
     # -------------------------------------------------------------------------
     # Collect transformations
 
-    (frame_range, obj_info, pose_info) = bakedTransforms(scene, obj, frame_start, frame_end, step, do_pose, do_object)
+    (frame_range, infos) = bakedTransformsBatch(scene, objects, frame_start, frame_end, step, do_pose, do_object)
+
+    actions = {}
+    for obj in objects:
+        (obj_info, pose_info) = infos[obj]
+        if in_memory:
+            actions[obj] = createBakedTransforms(obj, frame_range, obj_info, pose_info,
+                                                 only_selected, do_pose and obj.pose is not None, do_object,
+                                                 do_constraint_clear)
+        else:
+            actions[obj] = createBakedAction(obj, frame_range, frame_start, step, obj_info, pose_info,
+                                             only_selected, do_pose and obj.pose is not None, do_object,
+                                             do_constraint_clear)
+    return actions
+
+def createBakedTransforms(obj,
+         frame_range,
+         obj_info,
+         pose_info,
+         only_selected,
+         do_pose,
+         do_object,
+         do_constraint_clear):
+
+    baked = BakedTransforms("Action", frame_range)
+
+    if do_pose:
+        for name, pbone in obj.pose.bones.items():
+            if only_selected and not pbone.bone.select:
+                continue
+            if do_constraint_clear:
+                while pbone.constraints:
+                    pbone.constraints.remove(pbone.constraints[0])
+            baked.transforms["pose.bones[\"%s\"]." % (pbone.name)] = (pbone.rotation_mode, [info[name] for info in pose_info])
+
+    if do_object:
+        if do_constraint_clear:
+            while obj.constraints:
+                obj.constraints.remove(obj.constraints[0])
+        baked.transforms[""] = (obj.rotation_mode, list(obj_info))
+
+    return baked
+
+def createBakedAction(obj,
+         frame_range,
+         frame_start,
+         step,
+         obj_info,
+         pose_info,
+         only_selected,
+         do_pose,
+         do_object,
+         do_constraint_clear):
+
+    pose = obj.pose
 
     # -------------------------------------------------------------------------
     # Create action
@@ -178,8 +278,6 @@ def bake(scene,
     # -------------------------------------------------------------------------
     # Apply transformations to action
     
-    frame_back = scene.frame_current
-    
     # pose
     for name, pbone in (pose_items if do_pose else ()):
         if only_selected and not pbone.bone.select:
@@ -238,8 +336,6 @@ def bake(scene,
             else:
                 i += 1
 
-    scene.frame_set(frame_back)
-    
     return action
 
 
@@ -26,10 +26,8 @@ import sys
 from . import osglog
 from . import osgobject
 
-DEBUG = False
 def debug(str):
-    if DEBUG:
-        osglog.log(str)
+    osglog.debug(str)
 
 class Config(object):
     def __init__(self):
@@ -62,6 +60,9 @@ class Config(object):
         self.defaultattr("apply_modifiers", False)
         self.defaultattr("bake_constraints", True)
         self.defaultattr("bake_frame_step", 1)
+        self.defaultattr("bake_to_channels", False)
+        self.defaultattr("keyframe_tolerance", 0.0)
+        self.defaultattr("keyframe_angle_tolerance", 0.0)
         self.defaultattr("run_osgconv", False)
         osgconv_util = "osgconv"
         if sys.platform == 'win32':
@@ -76,6 +77,18 @@ class Config(object):
         self.defaultattr("viewer_path", osgviewer_util)
         self.defaultattr("export_all_scenes", False)
         self.defaultattr("osgconv_cleanup", False)
+        self.defaultattr("binary", False)
+        self.defaultattr("split_geometries", False)
+        self.defaultattr("optimize_vertex_cache", False)
+        self.defaultattr("triangulate", False)
+        self.defaultattr("triangulate_shortest_diagonal", False)
+        self.defaultattr("processes", 1)
+        self.defaultattr("stream_arrays", False)
+        self.defaultattr("cache_geometries", False)
+        self.defaultattr("export_stats", False)
+        self.defaultattr("intern_arrays", False)
+        self.defaultattr("log_level", "INFO")
+        self.defaultattr("log_levels", {})  # subsystem -> level
 
         self.defaultattr("history", {})
         
@@ -90,6 +103,10 @@ class Config(object):
         
     def createLogfile(self):
         logfilename = self.getFullName( "log")
+        osglog.setLevel(self.log_level)
+        for (subsystem, level) in self.log_levels.items():
+            osglog.setLevel(level, subsystem)
+        osglog.flush()
         osglog.LOGFILE = None
         if self.log:
             self.log_file = open(logfilename, "w", encoding='utf-8')
@@ -102,6 +119,7 @@ class Config(object):
         if self.log_file != None:
             filename = self.log_file.name
             osglog.log("Check log file " + filename)
+            osglog.flush()
             self.log_file.close()
             self.log_file = None
             osglog.LOGFILE = None
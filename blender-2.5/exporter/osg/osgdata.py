@@ -28,20 +28,25 @@ from   mathutils import *
 import bpy
 import sys
 import math
+import multiprocessing
 import os
 import shutil
 import subprocess
+import time
 from sys import exit
 
 import osg
 from . import osglog
 from . import osgconf
-from .osgconf import DEBUG
 from .osgconf import debug
 from . import osgbake
+from . import osgmath
+from . import osgmesh
+from . import osgstats
 from . import osgobject
 from .osgobject import *
 osgobject.VERSION = osg.__version__
+osgmath.setBlenderVersion(bpy.app.version)
 
 Vector     = mathutils.Vector
 Quaternion = mathutils.Quaternion
@@ -72,14 +77,14 @@ def createImageFilename(texturePath, image):
     else:
         ext = "unknown"
     name = name + "." +ext
-    print("create Image Filename " + name)
+    osglog.debug("create Image Filename %s", name, subsystem="material")
     if texturePath != "" and not texturePath.endswith("/"):
         texturePath = texturePath + "/"
     return texturePath + name
 
 def getImageFilesFromStateSet(stateset):
     list = []
-    #if DEBUG: osglog.log("stateset %s" % str(stateset))
+    #osglog.debug("stateset %s", stateset, subsystem="material")
     if stateset is not None and len(stateset.texture_attributes) > 0:
         for unit, attributes in stateset.texture_attributes.items():
             for a in attributes:
@@ -119,20 +124,25 @@ def getChildrenOf(scene, object):
             children.append(obj)
     return children
 
+# parent -> children of all the scene objects in one pass, the children
+# keep the scene order like getChildrenOf
+def getChildrenMap(scene):
+    children = {}
+    for obj in scene.objects:
+        if obj.parent is not None:
+            if not obj.parent in children:
+                children[obj.parent] = []
+            children[obj.parent].append(obj)
+    return children
 
-def findBoneInHierarchy(scene, bonename):
-        if scene.name == bonename and (type(scene) == type(Bone()) or type(scene) == type(Skeleton())):
-                return scene
 
-        #print scene.name
-        if isinstance(scene, Group) is False:
-                return None
-        
-        for child in scene.children:
-                result = findBoneInHierarchy(child, bonename)
-                if result is not None:
-                        return result
+def findBoneInSkeleton(skeleton, bonename):
+    # bones are indexed by name in their skeleton
+    if isinstance(skeleton, Skeleton) is False:
         return None
+    if skeleton.name == bonename:
+        return skeleton
+    return skeleton.boneDict.get(bonename)
 
 def isActionLinkedToObject(action, objects_name):
     action_fcurves = action.fcurves
@@ -152,11 +162,13 @@ def findArmatureObjectForTrack(track):
                 return 0
     return None
 
-def createAnimationUpdate(obj, callback, rotation_mode, prefix="", zero=False):
+def getTransformKeys(obj, prefix=""):
+    # (has location keys, has rotation keys, has scale keys) in the
+    # actions of obj
     has_location_keys = False
     has_scale_keys = False
     has_rotation_keys = False
-        
+
     if obj.animation_data:
         actions = []
         if obj.animation_data.action:
@@ -169,7 +181,7 @@ def createAnimationUpdate(obj, callback, rotation_mode, prefix="", zero=False):
         for action in actions:
             for curve in action.fcurves:
                 datapath = curve.data_path[len(prefix):]
-                osglog.log("curve.data_path " + curve.data_path + " " + str(curve.array_index) + " " + datapath)
+                osglog.debug("curve.data_path %s %s %s", curve.data_path, curve.array_index, datapath, subsystem="animation")
                 if datapath == "location":
                     has_location_keys = True
                 
@@ -178,7 +190,14 @@ def createAnimationUpdate(obj, callback, rotation_mode, prefix="", zero=False):
                 
                 if datapath == "scale":
                     has_scale_keys = True
-                    
+    return (has_location_keys, has_rotation_keys, has_scale_keys)
+
+def hasTransformAnimation(obj, prefix=""):
+    # createAnimationUpdate creates a callback for obj
+    return any(getTransformKeys(obj, prefix)) or len(obj.constraints) > 0
+
+def createAnimationUpdate(obj, callback, rotation_mode, prefix="", zero=False):
+    (has_location_keys, has_rotation_keys, has_scale_keys) = getTransformKeys(obj, prefix)
     if not (has_location_keys or has_scale_keys or has_rotation_keys) and (len(obj.constraints) == 0):
         return None
     
@@ -232,36 +251,52 @@ def createAnimationUpdate(obj, callback, rotation_mode, prefix="", zero=False):
 def hasConstraints(config, object):
     return (hasattr(object, "constraints") and (len(object.constraints) > 0) and config.bake_constraints)
     
-def createAnimationsGenericObject(osg_object, blender_object, config, update_callback, unique_objects):
-    osglog.log("animation_data is {} {} {} {}".format(blender_object.name, blender_object.animation_data, config.export_anim, update_callback))
+def isAnimatedObject(config, blender_object, unique_objects):
+    # createAnimationsGenericObject exports the animation of the object
+    # when it has an update callback
     if (config.export_anim is False) \
-        or (update_callback is None) \
         or (blender_object.animation_data is None and not hasConstraints(config, blender_object)):
-        return None
+        return False
 
     if blender_object.animation_data != None and unique_objects.hasAnimation(blender_object.animation_data.action):
+        return False
+    return True
+
+def isAnimatedArmature(config, blender_object):
+    return config.export_anim is not False \
+        and blender_object.animation_data != None \
+        and (blender_object.animation_data.action != None \
+             or len(blender_object.animation_data.nla_tracks) > 0)
+
+def createAnimationsGenericObject(osg_object, blender_object, config, update_callback, unique_objects, baked_actions = None):
+    osglog.log("animation_data is %s %s %s %s", blender_object.name, blender_object.animation_data, config.export_anim, update_callback, subsystem="animation")
+    if update_callback is None or not isAnimatedObject(config, blender_object, unique_objects):
         return None
 
     action2animation = BlenderAnimationToAnimation(object = blender_object, 
                                                    config = config, 
-                                                   unique_objects = unique_objects)
+                                                   unique_objects = unique_objects,
+                                                   baked_actions = baked_actions)
     anim = action2animation.createAnimation()
     if len(anim) > 0:
         osg_object.update_callbacks.append(update_callback)
     return anim
 
 def createAnimationMaterialAndSetCallback(osg_node, obj, config, unique_objects):
-    osglog.log("WARNING update material animation not yet supported")
+    osglog.warning("update material animation not yet supported", subsystem="animation")
     return None
     #return createAnimationsGenericObject(osg_node, obj, config, UpdateMaterial(), uniq_anims)
 
 
 class UniqueObject(object):
+    # blender data -> osg object for each kind of shared object, the
+    # objects also have the reverse map keyed by id() of the osg object
     def __init__(self):
         self.statesets = {}
         self.textures = {}
         self.objects = {}
         self.anims = {}
+        self.object_sources = {}
 
     def hasAnimation(self, obj):
         return obj in self.anims
@@ -283,7 +318,13 @@ class UniqueObject(object):
         return None
 
     def registerObject(self, obj, reg):
+        if obj in self.objects:
+            self.object_sources.pop(id(self.objects[obj]), None)
         self.objects[obj] = reg
+        self.object_sources[id(reg)] = obj
+
+    def getObjectSource(self, reg):
+        return self.object_sources.get(id(reg))
 
     def hasTexture(self, obj):
         return obj in self.textures
@@ -307,6 +348,47 @@ class UniqueObject(object):
     def registerStateSet(self, obj, reg):
         self.statesets[obj] = reg
 
+class WorkerPool(object):
+    # worker processes converting the meshes or writing subtrees. a worker
+    # killed or crashing loses its task without any error, so the workers
+    # are watched while waiting for a result
+    poll_seconds = 0.5
+
+    def __init__(self, processes, fork = False):
+        if fork and hasattr(multiprocessing, "get_context"):
+            # the workers need the objects of the parent process
+            self.pool = multiprocessing.get_context("fork").Pool(processes)
+        else:
+            self.pool = multiprocessing.Pool(processes)
+        self.workers = list(self.pool._pool)
+        self.broken = False
+
+    def submit(self, function, args):
+        return self.pool.apply_async(function, args)
+
+    def isBroken(self):
+        # the workers of the pool only exit when it is closed, the pool
+        # replaces a dead one but its task is lost
+        if not self.broken:
+            self.broken = any(worker.exitcode is not None for worker in self.workers)
+        return self.broken
+
+    def get(self, async_result):
+        # result of a submitted job, raises the error of the job or
+        # multiprocessing.ProcessError when a worker died before the
+        # result arrived
+        while True:
+            try:
+                return async_result.get(self.poll_seconds)
+            except multiprocessing.TimeoutError:
+                pass
+            if self.isBroken() and not async_result.ready():
+                raise multiprocessing.ProcessError("a worker process died")
+
+    def terminate(self):
+        self.pool.terminate()
+
+
 class Export(object):
     def __init__(self, config = None):
         object.__init__(self)
@@ -320,6 +402,13 @@ class Export(object):
         self.lights = {}
         self.root = None
         self.unique_objects = UniqueObject()
+        self.children_map = None
+        self.baked_actions = {}
+        self.geometry_converters = {}
+        self.object_meshes = {}
+        self.array_spill = None
+        self.geometry_cache = None
+        self.stats = osgstats.Stats()
 
     def isValidToExport(self, object):
         if object.name in self.config.exclude_objects:
@@ -331,13 +420,13 @@ class Export(object):
         if self.config.only_visible:
             return object.is_visible(self.config.scene)
         else:
-            osglog.log("object {} hide_render {}".format(object.name, object.hide_render))
+            osglog.log("object %s hide_render %s", object.name, object.hide_render)
             return not object.hide_render
         
     def setArmatureInRestMode(self):
         for arm in bpy.data.objects:
             if arm.type == "ARMATURE":
-                print(arm)
+                osglog.debug("armature %s", arm.name)
                 if arm.data.pose_position == 'POSE':
                     arm.data.pose_position = 'REST'
                     self.rest_armatures.append(arm)
@@ -354,7 +443,7 @@ class Export(object):
     def evaluateGroup(self, obj, item, rootItem):
         if obj.dupli_group is None or len(obj.dupli_group.objects) == 0:
             return
-        osglog.log(str("resolving " + obj.dupli_group.name + " for " + obj.name + " offset " + str(obj.dupli_group.dupli_offset)) )
+        osglog.log("resolving %s for %s offset %s", obj.dupli_group.name, obj.name, obj.dupli_group.dupli_offset)
 
 
         group = MatrixTransform()
@@ -365,7 +454,7 @@ class Export(object):
         config_visible = self.config.only_visible
         self.config.only_visible = False
         for o in obj.dupli_group.objects:
-            osglog.log(str("object " + str(o)))
+            osglog.log("object %s", o)
             self.exportChildrenRecursively( o, group, rootItem)
         self.config.only_visible = config_visible
         # and restore it after processing group
@@ -377,19 +466,17 @@ class Export(object):
 
     def createAnimationsSkeletonObject(self, osg_object, blender_object):
         
-        if (self.config.export_anim is False) \
-            or (blender_object.animation_data == None) \
-            or (blender_object.animation_data.action == None \
-                and len(blender_object.animation_data.nla_tracks) == 0):
+        if not isAnimatedArmature(self.config, blender_object):
             return None
 
         #if self.unique_objects.hasAnimation(blender_object.animation_data.action):
         #    return None
 
-        osglog.log("animation_data is %s %s" % (blender_object.name, blender_object.animation_data))
+        osglog.log("animation_data is %s %s", blender_object.name, blender_object.animation_data, subsystem="animation")
 
-        action2animation = BlenderAnimationToAnimation(object = blender_object, config = self.config, unique_objects = self.unique_objects)
-        osglog.log("animations created for object '%s'" % (blender_object.name))
+        action2animation = BlenderAnimationToAnimation(object = blender_object, config = self.config, unique_objects = self.unique_objects,
+                                                       baked_actions = self.baked_actions)
+        osglog.log("animations created for object '%s'", blender_object.name, subsystem="animation")
 
         anims = action2animation.createAnimation()
         return anims
@@ -397,8 +484,135 @@ class Export(object):
     def createAnimationsObjectAndSetCallback(self, osg_object, blender_object):
         return createAnimationsGenericObject(osg_object, blender_object, self.config, 
                     createAnimationUpdate(blender_object, UpdateMatrixTransform(name=osg_object.name), blender_object.rotation_mode),
-                    self.unique_objects)
+                    self.unique_objects, self.baked_actions)
     
+    def getExportRoots(self):
+        roots = []
+        for obj in self.config.scene.objects:
+            if (self.config.selected == "SELECTED_ONLY_WITH_CHILDREN" and obj.select) \
+                        or (self.config.selected == "ALL" and obj.parent == None):
+                    roots.append(obj)
+        return roots
+
+    def getExportedObjects(self, objects, result = None, visited = None):
+        # objects exportChildrenRecursively will export from objects, in
+        # traversal order
+        if result is None:
+            result = []
+            visited = set()
+        for obj in objects:
+            if obj in visited or self.isValidToExport(obj) == False:
+                continue
+            if obj.type not in ("ARMATURE", "MESH", "EMPTY", "CAMERA", "LAMP"):
+                continue
+            visited.add(obj)
+            result.append(obj)
+            self.getExportedObjects(self.children_map.get(obj, []), result, visited)
+        return result
+
+    def getAnimatedObjects(self, objects):
+        # objects that exportChildrenRecursively will create animations
+        # for, with the conditions of createAnimationsSkeletonObject and
+        # createAnimationsObjectAndSetCallback
+        result = []
+        for obj in objects:
+            if obj.type == "ARMATURE":
+                if isAnimatedArmature(self.config, obj):
+                    result.append(obj)
+            elif isAnimatedObject(self.config, obj, self.unique_objects) and hasTransformAnimation(obj):
+                result.append(obj)
+        return result
+
+    def removeUnusedBakedActions(self):
+        # the animations created take their baked action, the remaining
+        # ones would stay in the blend file
+        for ((obj, name), action) in self.baked_actions.items():
+            osglog.log("baked animation %s of %s not used", name, obj.name, subsystem="animation")
+            if not isinstance(action, osgbake.BakedTransforms):
+                bpy.data.actions.remove(action)
+        self.baked_actions = {}
+
+    def createPool(self, fork = False):
+        if self.config.processes <= 1 or (fork and not hasattr(os, "fork")):
+            return None
+        try:
+            return WorkerPool(self.config.processes, fork)
+        except (OSError, ValueError) as e:
+            osglog.warning("can't start %d processes (%s), the export runs in one process", self.config.processes, e)
+            return None
+
+    def submitGeometryJobs(self, pool, objects):
+        # extract the meshes now, the worker processes convert them while
+        # the scene is traversed
+        submitted = set()
+        for obj in objects:
+            if obj.type != "MESH":
+                continue
+            (mesh_object, armature_modifier) = self.getMeshAndArmatureModifier(obj)
+            if armature_modifier == None:
+                # geodes of meshes without armature are shared
+                if mesh_object in submitted:
+                    continue
+                submitted.add(mesh_object)
+            converter = BlenderObjectToGeometry(object = obj, mesh = mesh_object,
+                                                config = self.config,
+                                                unique_objects = self.unique_objects,
+                                                array_spill = self.array_spill,
+                                                geometry_cache = self.geometry_cache,
+                                                stats = self.stats)
+            converter.submitJobs(pool)
+            self.geometry_converters[obj] = converter
+
+    def bakeAnimations(self, objects):
+        # objects baked on the same frame range share one pass on the
+        # scene frames instead of one pass each. an object is baked once
+        # per animation with its nla track soloed, and a pass holds at most
+        # one armature since the baked armature is the only one in pose
+        # position, like when the objects are baked one by one
+        ranges = {}
+        for obj in objects:
+            action2animation = BlenderAnimationToAnimation(object = obj, config = self.config, unique_objects = self.unique_objects)
+            for (name, start, end, tracks) in action2animation.getBakeRanges():
+                targets = ranges.setdefault((start, end), [])
+                targets.append((obj, name, [tr for tr in tracks if isinstance(tr, bpy.types.NlaTrack)]))
+
+        for ((start, end), targets) in sorted(ranges.items()):
+            while len(targets) > 0:
+                batch = []
+                deferred = []
+                soloed = set()
+                armature = False
+                for (obj, name, tracks) in targets:
+                    owners = set(tr.id_data for tr in tracks)
+                    if obj in (o for (o, n, t) in batch) \
+                            or (armature and obj.type == "ARMATURE") \
+                            or len(owners & soloed) > 0:
+                        deferred.append((obj, name, tracks))
+                        continue
+                    batch.append((obj, name, tracks))
+                    soloed |= owners
+                    armature = armature or obj.type == "ARMATURE"
+                targets = deferred
+
+                for (obj, name, tracks) in batch:
+                    for tr in tracks:
+                        tr.is_solo = True
+                bake_objects = [obj for (obj, name, tracks) in batch]
+                osglog.log("baking %d objects from frame %s to %s", len(bake_objects), start, end, subsystem="animation")
+                actions = osgbake.bakeBatch(self.config.scene,
+                         bake_objects,
+                         start,
+                         end,
+                         self.config.bake_frame_step,
+                         False, #only_selected
+                         True,  #do_pose
+                         True,  #do_object
+                         False, #do_constraint_clear
+                         False, #to_quat
+                         self.config.bake_to_channels) #in_memory
+                for (obj, name, tracks) in batch:
+                    self.baked_actions[(obj, name)] = actions[obj]
+
 
     def exportChildrenRecursively(self, obj, parent, rootItem):
         if self.isValidToExport(obj) == False:
@@ -409,10 +623,10 @@ class Export(object):
         anims = []
         item = None
         if self.unique_objects.hasObject(obj):
-            osglog.log(str("use referenced item for " + obj.name + " " + obj.type))
+            osglog.log("use referenced item for %s %s", obj.name, obj.type)
             item = self.unique_objects.getObject(obj)
         else:
-            osglog.log("Type of " + obj.name + " is " + obj.type)
+            osglog.log("Type of %s is %s", obj.name, obj.type)
             if obj.type == "ARMATURE":
                 item = self.createSkeleton(obj)
                 anims = self.createAnimationsSkeletonObject(item, obj)
@@ -428,14 +642,15 @@ class Export(object):
                 item.matrix = matrix.copy()
                 if self.config.zero_translations and parent == None:
                     if bpy.app.version[0] >= 2 and bpy.app.version[1] >= 62:
-                        print("zero_translations option has not been converted to blender 2.62")
+                        osglog.warning("zero_translations option has not been converted to blender 2.62")
                     else:
                         item.matrix[3].xyz = Vector()
                 
                 anims = self.createAnimationsObjectAndSetCallback(item, obj)
                 
                 if obj.type == "MESH":
-                    objectItem = self.createGeodeFromObject(obj)
+                    with self.stats.timer("createGeodeFromObject"):
+                        objectItem = self.createGeodeFromObject(obj)
                     item.children.append(objectItem)
                 else:
                     self.evaluateGroup(obj, item, rootItem)
@@ -450,7 +665,7 @@ class Export(object):
                 item.children.append(lightItem)
 
             else:
-                osglog.log(str("WARNING " + obj.name + " " + obj.type + " not exported"))
+                osglog.warning("%s %s not exported", obj.name, obj.type)
                 return None
             
             self.unique_objects.registerObject(obj, item)
@@ -462,9 +677,9 @@ class Export(object):
             rootItem = item
 
         if obj.parent_type == "BONE":
-            bone = findBoneInHierarchy(rootItem, obj.parent_bone)
+            bone = findBoneInSkeleton(self.unique_objects.getObject(obj.parent), obj.parent_bone)
             if bone is None:
-                osglog.log(str("WARNING " + obj.parent_bone + " not found"))
+                osglog.warning("%s not found", obj.parent_bone)
             else:               
                 armature = obj.parent.data
                 original_pose_position = armature.pose_position
@@ -480,14 +695,17 @@ class Export(object):
         elif parent:
             parent.children.append(item)
 
-        children = getChildrenOf(self.config.scene, obj)
+        if self.children_map is not None:
+            children = self.children_map.get(obj, [])
+        else:
+            children = getChildrenOf(self.config.scene, obj)
         for child in children:
             self.exportChildrenRecursively(child, item, rootItem)
         return item
 
 
     def createSkeleton(self, obj):
-        osglog.log("processing Armature " + obj.name)
+        osglog.log("processing Armature %s", obj.name)
 
         roots = getRootBonesList(obj.data)
 
@@ -501,6 +719,10 @@ class Export(object):
         return skeleton
 
     def process(self):
+        with self.stats.timer("process"):
+            self.processScene()
+
+    def processScene(self):
 #        Object.resetWriter()
         self.scene_name = self.config.scene.name
         osglog.log("current scene %s" % self.scene_name)
@@ -509,6 +731,17 @@ class Export(object):
         self.config.createLogfile()
         
         self.setArmatureInRestMode()
+        # objects of dupli groups are looked up in the same map, as before
+        # only their children linked in the scene are exported
+        self.children_map = getChildrenMap(self.config.scene)
+        self.baked_actions = {}
+        self.geometry_converters = {}
+        self.object_meshes = {}
+        if self.config.stream_arrays:
+            self.array_spill = ArraySpill()
+        if self.config.cache_geometries:
+            self.geometry_cache = osgmesh.GeometryCache(self.config.getFullName("osgcache"))
+        pool = None
         try:
             if self.config.object_selected != None:
                 o = bpy.data.objects[self.config.object_selected]
@@ -516,18 +749,35 @@ class Export(object):
                     self.config.scene.objects.active = o
                     self.config.scene.objects.selected = [o]
                 except ValueError:
-                    osglog.log("Error, problem happens when assigning object %s to scene %s" % (o.name, self.config.scene.name))
+                    osglog.error("problem happens when assigning object %s to scene %s", o.name, self.config.scene.name)
                     raise
 
-            for obj in self.config.scene.objects:
-                if (self.config.selected == "SELECTED_ONLY_WITH_CHILDREN" and obj.select) \
-                            or (self.config.selected == "ALL" and obj.parent == None):
-                        self.exportItemAndChildren(obj)
+            roots = self.getExportRoots()
+            objects = self.getExportedObjects(roots)
+            if self.config.export_anim:
+                with self.stats.timer("bakeAnimations"):
+                    self.bakeAnimations(self.getAnimatedObjects(objects))
+
+            pool = self.createPool()
+            if pool is not None:
+                self.submitGeometryJobs(pool, objects)
+
+            for obj in roots:
+                self.exportItemAndChildren(obj)
+
+            if self.geometry_cache is not None:
+                removed = self.geometry_cache.prune()
+                if removed > 0:
+                    osglog.log("%d old entries removed from the geometry cache", removed)
 
         finally:
+            if pool is not None:
+                pool.terminate()
+            self.removeUnusedBakedActions()
             self.restoreArmaturePoseMode()
         
-        self.postProcess()
+        with self.stats.timer("postProcess"):
+            self.postProcess()
 
     # OSG requires that rig geometry be a child of the skeleton,
     # but Blender does not.  Move any meshes that are modified by
@@ -538,7 +788,7 @@ class Export(object):
                 and isinstance(item.children[0], Geode) \
                 and not isinstance(parent, Skeleton):
             geode = item.children[0]
-            osglog.log("geode {}".format(geode.name))
+            osglog.debug("geode %s", geode.name)
 
             # some blend files has a armature_modifier but a None object
             # so we have to test armature_modifier and armature_modifier.object
@@ -547,35 +797,23 @@ class Export(object):
                 modifier_object = geode.armature_modifier.object
 
                 arm = self.unique_objects.getObject(modifier_object)
-                for (k, v) in self.unique_objects.objects.items():
-                    if v == item:
-                        meshobj = k
+                meshobj = self.unique_objects.getObjectSource(item)
                 
                 item.matrix = getDeltaMatrixFromMatrix(item.children[0].armature_modifier.object.matrix_world, meshobj.matrix_world)
                 
                 arm.children.append(item)
-                osglog.log("NOTICE: Reparenting {} to {}".format(geode.name, arm.name))
+                osglog.log("NOTICE: Reparenting %s to %s", geode.name, arm.name)
         if hasattr(item, "children"):
             for c in list(item.children):
                 self.reparentRiggedGeodes(c, item)
 
-    def findBone(self, item, bonename):
-        if isinstance(item, Skeleton) or isinstance(item, Bone):
-            if item.name == bonename:
-                return item
-            for c in list(item.children):
-                n = self.findBone(c, bonename)
-                if n != None:
-                    return n
-        return None
-    
     def reparentNonDeformedGeodes(self, item, parent):
         if     isinstance(item, MatrixTransform) \
                 and len(item.children) == 1 \
                 and isinstance(item.children[0], Geode) \
                 and isinstance(parent, Skeleton):
             geode = item.children[0]
-            osglog.log("optimizing armature influence on geode {}".format(geode.name))
+            osglog.log("optimizing armature influence on geode %s", geode.name)
             if geode.armature_modifier != None:
                 singleBoneInfluence = True
                 target = None
@@ -609,14 +847,12 @@ class Export(object):
                     blendbone = geode.armature_modifier.object.data.bones[target]
                     blendbone_matrix = blendbone.matrix_local
                    
-                    osgbone = self.findBone(parent, target)
-                    for (k, v) in self.unique_objects.objects.items():
-                        if v == item:
-                            meshobj = k
+                    osgbone = findBoneInSkeleton(parent, target)
+                    meshobj = self.unique_objects.getObjectSource(item)
                     
                     item.matrix = getDeltaMatrixFromMatrix(geode.armature_modifier.object.matrix_world * blendbone_matrix, meshobj.matrix_world)
                     osgbone.children.append(item)
-                    osglog.log("NOTICE: Reparenting {} to {}".format(geode.name, osgbone.name))
+                    osglog.log("NOTICE: Reparenting %s to %s", geode.name, osgbone.name)
         if hasattr(item, "children"):
             for c in list(item.children):
                 self.reparentNonDeformedGeodes(c, item)
@@ -641,7 +877,7 @@ class Export(object):
             st = StateSet()
             self.root.stateset = st
             if len(self.lights) > 8:
-                osglog.log("WARNING more than 8 lights")
+                osglog.warning("more than 8 lights")
 
             # retrieve world to global ambient
             lm = LightModel()
@@ -670,16 +906,44 @@ class Export(object):
                     self.images.add(i)
 
     def write(self):
+        try:
+            with self.stats.timer("write"):
+                self.writeFiles()
+        finally:
+            if self.array_spill is not None:
+                self.array_spill.close()
+                self.array_spill = None
+        if self.config.export_stats:
+            filename = self.config.getFullName("stats.json")
+            osglog.log("write export statistics to " + filename)
+            self.stats.writeReport(filename)
+
+    def writeFiles(self):
         if len(self.items) == 0:
             if self.config.log_file is not None:
                 self.config.closeLogfile()
             return
 
-        filename = self.config.getFullName("osgt")
+        if self.config.binary:
+            filename = self.config.getFullName("osgb")
+        else:
+            filename = self.config.getFullName("osgt")
         osglog.log("write file to " + filename)
+        if self.config.intern_arrays:
+            osglog.log("%d duplicated arrays replaced by references", internArrays(self.root))
         with open(filename, "wb") as sfile:
         #sfile.write(str(self.root).encode('utf-8'))
-            self.root.writeFile(sfile)
+            if self.config.binary:
+                output = BinaryOutput(sfile)
+            else:
+                output = OutputBuffer(sfile)
+            if self.config.export_stats:
+                output.countBytes(self.stats)
+            with self.stats.timer("serialize"):
+                if self.config.binary:
+                    self.root.writeBinaryFile(output)
+                else:
+                    self.writeText(output)
         
         nativePath = os.path.join(os.path.abspath(self.config.getFullPath()), self.config.texture_prefix)
         #blenderPath = bpy.path.relpath(nativePath)
@@ -688,10 +952,72 @@ class Export(object):
                 if not os.path.exists(nativePath):
                     os.mkdir(nativePath)
             except:
-                osglog.log("can't create textures directory {}".format(nativePath))
+                osglog.error("can't create textures directory %s", nativePath)
                 raise
                 
         copied_images = []
+        with self.stats.timer("copyTextures"):
+            self.copyTextures(nativePath, copied_images)
+
+        filetoview = filename
+        
+        convertedFile = None
+        if self.config.run_osgconv:
+            convertedFile = self.config.getFullName(self.config.osgconv_ext)
+            if self.config.binary or os.path.abspath(convertedFile) == os.path.abspath(filename):
+                # osgconv would read and write the exported file
+                osglog.log("osgconv is not run, %s is already the converted file", filename)
+                convertedFile = None
+
+        if convertedFile is not None:
+            if self.config.osgconv_embed_textures:
+                r = [self.config.osgconv_path, "-O", "includeImageFileInIVEFile", filename, convertedFile]
+            else:
+                r = [self.config.osgconv_path, "-O", "noTexturesInIVEFile", filename, convertedFile]
+            try:
+                osglog.log("Executing osgconv: " + str(r))
+                if subprocess.call(r) == 0:
+                    if self.config.osgconv_cleanup:
+                        os.unlink(filename)
+                        if self.config.osgconv_embed_textures:
+                            for i in copied_images:
+                                os.unlink(i)
+                filetoview = convertedFile
+            except Exception as e:
+                osglog.error("running osgconv failed: %r", e)
+            
+        if self.config.run_viewer:
+            r = [self.config.viewer_path, filetoview]
+            try:
+                subprocess.Popen(r)
+            except Exception as e:
+                osglog.error("running %s failed: %r", r, e)
+
+        if self.config.log_file is not None:
+            self.config.closeLogfile()
+            
+
+    def writeText(self, output):
+        # the children of the root are written in worker processes forked
+        # here, the spilled arrays are read back without a shared file
+        # position
+        pool = None
+        if self.config.processes > 1 and len(self.root.children) > 1 \
+                and (self.array_spill is None or hasattr(os, "pread")):
+            subtrees = SubtreeWriter(self.root, output)
+            pool = self.createPool(fork = True)
+            if pool is not None:
+                subtrees.submit(pool)
+        try:
+            self.root.writeFile(output)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            SubtreeWriter.current = None
+
+    def copyTextures(self, nativePath, copied_images):
+        # save packed images and copy the others in the textures directory,
+        # newly created files are appended to copied_images
         for i in self.images:
             if i is not None:
                 imagename = bpy.path.basename(createImageFilename("", i))
@@ -707,10 +1033,10 @@ class Export(object):
                                 # cleaned up
                                 copied_images.append(filename)
                             i.filepath_raw = filename
-                            osglog.log("packed file, save it to {}".format(os.path.abspath(bpy.path.abspath(filename))))
+                            osglog.log("packed file, save it to %s", os.path.abspath(bpy.path.abspath(filename)), subsystem="material")
                             i.save()
                         except:
-                            osglog.log("failed to save file {} to {}".format(imagename, nativePath))
+                            osglog.error("failed to save file %s to %s", imagename, nativePath, subsystem="material")
                         i.filepath_raw = original_filepath
                     else:
                         filepath = os.path.abspath(bpy.path.abspath(i.filepath))
@@ -721,47 +1047,36 @@ class Export(object):
                                 # cleaned up
                                 copied_images.append(texturePath)
                             shutil.copy(filepath, texturePath)
-                            osglog.log("copy file {} to {}".format(filepath, texturePath))
+                            osglog.log("copy file %s to %s", filepath, texturePath, subsystem="material")
                         else:
-                            osglog.log("file {} not available".format(filepath))
+                            osglog.warning("file %s not available", filepath, subsystem="material")
                 except Exception  as e:
-                    osglog.log("error while trying to copy file {} to {}: {}".format(imagename, nativePath, str(e)))
+                    osglog.error("can't copy file %s to %s: %s", imagename, nativePath, e, subsystem="material")
 
-        filetoview = filename
+    def getMeshAndArmatureModifier(self, obj):
+        # mesh to convert for obj, with modifiers applied it is created
+        # only once
+        if obj in self.object_meshes:
+            return self.object_meshes[obj]
+
+        armature_modifier = None
+        has_non_armature_modifiers = False
         
-        if self.config.run_osgconv:
-            convertedFile = self.config.getFullName(self.config.osgconv_ext)
-            if self.config.osgconv_embed_textures:
-                r = [self.config.osgconv_path, "-O", "includeImageFileInIVEFile", filename, convertedFile]
+        for mod in obj.modifiers:
+            if mod.type == "ARMATURE":
+                armature_modifier = mod
             else:
-                r = [self.config.osgconv_path, "-O", "noTexturesInIVEFile", filename, convertedFile]
-            try:
-                osglog.log("Executing osgconv: " + str(r))
-                if subprocess.call(r) == 0:
-                    if self.config.osgconv_cleanup:
-                        os.unlink(filename)
-                        if self.config.osgconv_embed_textures:
-                            for i in copied_images:
-                                os.unlink(i)
-                filetoview = convertedFile
-            except Exception as e:
-                print("Error running osgconv")
-                print(repr(e))
-            
-        if self.config.run_viewer:
-            r = [self.config.viewer_path, filetoview]
-            try:
-                subprocess.Popen(r)
-            except Exception as e:
-                print("Error running " + str(r))
-                print(repr(e))
-
-        if self.config.log_file is not None:
-            self.config.closeLogfile()
-            
+                has_non_armature_modifiers = True
+ 
+        if self.config.apply_modifiers and has_non_armature_modifiers:
+            mesh_object = obj.to_mesh(self.config.scene, True, 'PREVIEW')
+        else:
+            mesh_object = obj.data
+        self.object_meshes[obj] = (mesh_object, armature_modifier)
+        return (mesh_object, armature_modifier)
 
     def createGeodeFromObject(self, mesh, skeleton = None):
-        osglog.log("exporting object " + mesh.name)
+        osglog.log("exporting object %s", mesh.name, subsystem="geometry")
 
         # check if the mesh has a armature modifier
         # if no we don't write influence
@@ -770,24 +1085,12 @@ class Export(object):
         #if mesh.parent and mesh.parent.type == "ARMATURE":
         #    exportInfluence = True
         
-        armature_modifier = None
-        has_non_armature_modifiers = False
-        
-        for mod in mesh.modifiers:
-            if mod.type == "ARMATURE":
-                armature_modifier = mod
-            else:
-                has_non_armature_modifiers = True
+        (mesh_object, armature_modifier) = self.getMeshAndArmatureModifier(mesh)
         
         if armature_modifier != None:
             exportInfluence = True
- 
-        if self.config.apply_modifiers and has_non_armature_modifiers:
-            mesh_object = mesh.to_mesh(self.config.scene, True, 'PREVIEW')
-        else:
-            mesh_object = mesh.data
          
-        osglog.log("mesh_object is " + mesh_object.name)
+        osglog.log("mesh_object is %s", mesh_object.name, subsystem="geometry")
         
         if armature_modifier == None and self.unique_objects.hasObject(mesh_object):
             return self.unique_objects.getObject(mesh_object)
@@ -800,12 +1103,17 @@ class Export(object):
                 break
 
         geometries = []
-        converter = BlenderObjectToGeometry(object = mesh, mesh = mesh_object,
-                                            config = self.config, 
-                                            unique_objects = self.unique_objects)
+        converter = self.geometry_converters.pop(mesh, None)
+        if converter is None:
+            converter = BlenderObjectToGeometry(object = mesh, mesh = mesh_object,
+                                                config = self.config, 
+                                                unique_objects = self.unique_objects,
+                                                array_spill = self.array_spill,
+                                                geometry_cache = self.geometry_cache,
+                                                stats = self.stats)
         sources_geometries = converter.convert()
 
-        osglog.log("vertex groups %s %s " % (exportInfluence, hasVertexGroup))
+        osglog.log("vertex groups %s %s ", exportInfluence, hasVertexGroup, subsystem="geometry")
         if exportInfluence and hasVertexGroup:
             for geom in sources_geometries:
                 rig_geom = RigGeometry()
@@ -928,6 +1236,18 @@ class BlenderObjectToGeometry(object):
         #else:
         #  self.mesh = self.object.to_mesh(self.config.scene, True, 'PREVIEW')
         self.material_animations = {}
+        self.mesh_data = None
+        self.mesh_data_source = None
+        # material index -> (cache key, job, pending result of osgmesh.buildGeometryData)
+        self.geometry_jobs = {}
+        self.geometry_pool = None
+        # material index -> result found in the geometry cache
+        self.geometry_results = {}
+        self.array_spill = kwargs.get("array_spill", None)
+        self.geometry_cache = kwargs.get("geometry_cache", None)
+        self.stats = kwargs.get("stats", None)
+        if self.stats is None:
+            self.stats = osgstats.Stats()
 
     def createTexture2D(self, mtex):
         image_object = None
@@ -936,7 +1256,7 @@ class BlenderObjectToGeometry(object):
         except: 
             image_object = None
         if image_object is None:
-            osglog.log("WARNING the texture %s has no Image, skip it" % str(mtex))
+            osglog.warning("the texture %s has no Image, skip it", mtex, subsystem="material")
             return None
 
         if self.unique_objects.hasTexture(mtex.texture):
@@ -955,11 +1275,11 @@ class BlenderObjectToGeometry(object):
     def adjustUVLayerFromMaterial(self, geom, material, mesh_uv_textures):
 
         uvs = geom.uvs
-        if DEBUG: osglog.log("geometry uvs %s" % (str(uvs)))
+        osglog.debug("geometry uvs %s", uvs, subsystem="material")
         geom.uvs = {}
 
         texture_list = material.texture_slots
-        if DEBUG: osglog.log("texture list %d - %s" % (len(texture_list), str(texture_list)))
+        osglog.debug("texture list %d - %s", len(texture_list), texture_list, subsystem="material")
 
         # find a default channel if exist uv
         default_uv = None
@@ -970,7 +1290,7 @@ class BlenderObjectToGeometry(object):
             default_uv = uvs[default_uv_key]
             #default_uv_key, default_uv = uvs.popitem()
 
-        if DEBUG: osglog.log("default uv key %s" % str(default_uv_key))
+        osglog.debug("default uv key %s", default_uv_key, subsystem="material")
 
 
 
@@ -979,24 +1299,24 @@ class BlenderObjectToGeometry(object):
             if texture_slot is not None:
                 uv_layer =  texture_slot.uv_layer
                 
-                if DEBUG: osglog.log("uv layer %s" % str(uv_layer))
+                osglog.debug("uv layer %s", uv_layer, subsystem="material")
 
                 if len(uv_layer) > 0 and not uv_layer in uvs.keys():
-                    osglog.log("WARNING your material '%s' with texture '%s' use an uv layer '%s' that does not exist on the mesh '%s', use the first uv channel as fallback" % (material.name, texture_slot, uv_layer, geom.name))
+                    osglog.warning("your material '%s' with texture '%s' use an uv layer '%s' that does not exist on the mesh '%s', use the first uv channel as fallback", material.name, texture_slot, uv_layer, geom.name, subsystem="material")
                 if len(uv_layer) > 0 and uv_layer in uvs.keys():
-                    if DEBUG: osglog.log("texture %s use uv layer %s" % (i, uv_layer))
+                    osglog.debug("texture %s use uv layer %s", i, uv_layer, subsystem="material")
                     geom.uvs[i] = TexCoordArray()
                     geom.uvs[i].array = uvs[uv_layer].array
                     geom.uvs[i].index = i
                 elif default_uv:
-                    if DEBUG: osglog.log("texture %s use default uv layer %s" % (i, default_uv_key))
+                    osglog.debug("texture %s use default uv layer %s", i, default_uv_key, subsystem="material")
                     geom.uvs[i] = TexCoordArray()
                     geom.uvs[i].index = i
                     geom.uvs[i].array = default_uv.array
 
         # adjust uvs channels if no textures assigned
         if len(geom.uvs.keys()) == 0:
-            if DEBUG: osglog.log("no texture set, adjust uvs channels, in arbitrary order")
+            osglog.debug("no texture set, adjust uvs channels, in arbitrary order", subsystem="material")
             index = 0
             for k in uvs.keys():
                 uvs[k].index = index
@@ -1088,7 +1408,7 @@ class BlenderObjectToGeometry(object):
             m.getOrCreateUserData().append(StringValueObject("SpecularIor", str(mat_source.specular_ior)))
 
         # if alpha not 1 then we set the blending mode on
-        if DEBUG: osglog.log("state material alpha %s" % str(alpha))
+        osglog.debug("state material alpha %s", alpha, subsystem="material")
         if alpha != 1.0:
             s.modes["GL_BLEND"] = "ON"
 
@@ -1112,7 +1432,7 @@ class BlenderObjectToGeometry(object):
         s.attributes.append(m)
 
         texture_list = mat_source.texture_slots
-        if DEBUG: osglog.log("texture list %s" % str(texture_list))
+        osglog.debug("texture list %s", texture_list, subsystem="material")
 
         if len(texture_list) > 0:
             userData = s.getOrCreateUserData()
@@ -1125,7 +1445,7 @@ class BlenderObjectToGeometry(object):
                 continue
 
             t = self.createTexture2D(texture_list[i])
-            if DEBUG: osglog.log("texture %s %s" % (i, texture_list[i]))
+            osglog.debug("texture %s %s", i, texture_list[i], subsystem="material")
             if t is None:
                 continue
 
@@ -1211,9 +1531,124 @@ class BlenderObjectToGeometry(object):
 
                     # happens for all generated textures
                     #log("can't read the source image file for texture %s" % t.name)
-        #if DEBUG: osglog.log("state set %s" % str(s))
+        #osglog.debug("state set %s", s, subsystem="material")
         return s
 
+    def getMeshData(self, mesh):
+        # copy the tessellated faces in flat arrays once per mesh, all
+        # the material slots work on the same copy
+        if self.mesh_data is not None and self.mesh_data_source == mesh:
+            return self.mesh_data
+
+        if bpy.app.version[0] >= 2 and bpy.app.version[1] >= 63:
+            faces = mesh.tessfaces
+            uv_textures = mesh.tessface_uv_textures
+        else:
+            faces = mesh.faces
+            uv_textures = mesh.uv_textures
+
+        data = osgmesh.MeshData()
+        nvertexes = len(mesh.vertices)
+        nfaces = len(faces)
+        data.coords = [0.0] * (nvertexes * 3)
+        data.vertex_normals = [0.0] * (nvertexes * 3)
+        mesh.vertices.foreach_get("co", data.coords)
+        mesh.vertices.foreach_get("normal", data.vertex_normals)
+
+        data.face_vertexes = [0] * (nfaces * 4)
+        data.face_materials = [0] * nfaces
+        data.face_smooth = [False] * nfaces
+        data.face_normals = [0.0] * (nfaces * 3)
+        faces.foreach_get("vertices_raw", data.face_vertexes)
+        faces.foreach_get("material_index", data.face_materials)
+        faces.foreach_get("use_smooth", data.face_smooth)
+        faces.foreach_get("normal", data.face_normals)
+
+        if uv_textures:
+            for textureLayer in uv_textures:
+                uv_raw = [0.0] * (nfaces * 8)
+                textureLayer.data.foreach_get("uv_raw", uv_raw)
+                data.uv_layers.append((textureLayer.name, uv_raw))
+
+        # invert the vertex groups in one pass, group -> [(vertex, weight)]
+        for vertex in mesh.vertices:
+            for vg in vertex.groups:
+                if vg.weight >= 0.001:
+                    if not vg.group in data.vertex_groups:
+                        data.vertex_groups[vg.group] = []
+                    data.vertex_groups[vg.group].append((vertex.index, vg.weight))
+
+        self.mesh_data = data
+        self.mesh_data_source = mesh
+        return data
+
+    def getGeometryJob(self, mesh, material_index):
+        groups = [(vertex_group.index, vertex_group.name) for vertex_group in self.object.vertex_groups]
+        return (self.getMeshData(mesh), material_index, groups,
+                self.config.triangulate, self.config.triangulate_shortest_diagonal)
+
+    def getCachedGeometryData(self, job):
+        # returns (cache key, (result,) or None)
+        if self.geometry_cache is None:
+            return (None, None)
+        key = self.geometry_cache.getKey(*job)
+        return (key, self.geometry_cache.load(key))
+
+    def submitJobs(self, pool):
+        # copy the mesh out of blender now and convert the material slots
+        # in the pool, createGeomForMaterialIndex waits for the results
+        if bpy.app.version[0] >= 2 and bpy.app.version[1] >= 63:
+            self.mesh.update(calc_tessface=True)
+        self.geometry_pool = pool
+        for material_index in range(0, max(1, len(self.mesh.materials))):
+            job = self.getGeometryJob(self.mesh, material_index)
+            (key, cached) = self.getCachedGeometryData(job)
+            if cached is not None:
+                self.geometry_results[material_index] = cached[0]
+                continue
+            self.geometry_jobs[material_index] = (key, job, pool.submit(osgmesh.buildGeometryData, job))
+
+    def getGeometryData(self, mesh, material_index):
+        with self.stats.timer("getGeometryData"):
+            (result, cached) = self.waitGeometryData(mesh, material_index)
+        if result is None:
+            return None
+        self.stats.add("vertexes before weld", result.corner_count)
+        self.stats.add("vertexes after weld", len(result.vertexes) // 3)
+        if cached:
+            self.stats.add("geometries from cache")
+        else:
+            # converted in a worker process for most of them, the time is
+            # the one spent by the worker
+            for (name, seconds) in result.timings.items():
+                self.stats.addTime(name, seconds)
+        return result
+
+    def waitGeometryData(self, mesh, material_index):
+        # returns (result of osgmesh.buildGeometryData, True when the
+        # result comes from the geometry cache)
+        if mesh == self.mesh and material_index in self.geometry_results:
+            return (self.geometry_results.pop(material_index), True)
+        if mesh == self.mesh and material_index in self.geometry_jobs:
+            (key, job, async_result) = self.geometry_jobs.pop(material_index)
+            try:
+                result = self.geometry_pool.get(async_result)
+            except Exception as e:
+                # the worker could not import the exporter or died, the
+                # mesh is converted here
+                osglog.warning("worker process failed on mesh %s material %d (%s), converting it without the pool", mesh.name, material_index, e)
+                result = osgmesh.buildGeometryData(*job)
+        else:
+            job = self.getGeometryJob(mesh, material_index)
+            (key, cached) = self.getCachedGeometryData(job)
+            if cached is not None:
+                osglog.log("mesh %s material %d loaded from the geometry cache", mesh.name, material_index, subsystem="geometry")
+                return (cached[0], True)
+            result = osgmesh.buildGeometryData(*job)
+        if key is not None:
+            self.geometry_cache.store(key, result)
+        return (result, False)
+
     def createGeomForMaterialIndex(self, material_index, mesh):
         geom = Geometry()
         geom.groups = {}
@@ -1225,35 +1660,21 @@ class BlenderObjectToGeometry(object):
             faces = mesh.faces
 
         if (len(faces) == 0):
-            osglog.log("object %s has no faces, so no materials" % self.object.name)
+            osglog.log("object %s has no faces, so no materials", self.object.name, subsystem="geometry")
             return None
         if len(mesh.materials) and mesh.materials[material_index] != None:
             material_name = mesh.materials[material_index].name
             title = "mesh %s with material %s" % (self.object.name, material_name)
         else:
             title = "mesh %s without material" % (self.object.name)
-        osglog.log(title)
+        osglog.log(title, subsystem="geometry")
 
-        vertexes = []
-        collected_faces = []
-        for face in faces:
-            if face.material_index != material_index:
-                continue
-            f = []
-            if DEBUG: fdebug = []
-            for vertex in face.vertices:
-                index = len(vertexes)
-                vertexes.append(mesh.vertices[vertex])
-                f.append(index)
-                if DEBUG: fdebug.append(vertex)
-            if DEBUG: osglog.log("true face %s" % str(fdebug))
-            if DEBUG: osglog.log("face %s" % str(f))
-            collected_faces.append((face,f))
-
-        if (len(collected_faces) == 0):
-            osglog.log("object %s has no faces for sub material slot %s" % (self.object.name, str(material_index)))
+        geometry_data = self.getGeometryData(mesh, material_index)
+
+        if geometry_data is None:
+            osglog.log("object %s has no faces for sub material slot %s", self.object.name, material_index, subsystem="geometry")
             end_title = '-' * len(title)
-            osglog.log(end_title)
+            osglog.log(end_title, subsystem="geometry")
             return None
 
         # colors = {}
@@ -1300,143 +1721,27 @@ class BlenderObjectToGeometry(object):
             backupColor.active = True
             #mesh.update()
 
-        # uvs = {}
-        # if mesh.faceUV:
-        #     names = mesh.getUVLayerNames()
-        #     backup_name = mesh.activeUVLayer
-        #     for name in names:
-        #         mesh.activeUVLayer = name
-        #         mesh.update()
-        #         uv_array = []
-        #         for face,f in collected_faces:
-        #             for i in range(0, len(face.vertices)):
-        #                 uv_array.append(face.uv[i])
-        #         uvs[name] = uv_array
-        #     mesh.activeUVLayer = backup_name
-        #     mesh.update()
-
         uv_textures = None
         if bpy.app.version[0] >= 2 and bpy.app.version[1] >= 63:
             uv_textures = mesh.tessface_uv_textures
         else:
             uv_textures = mesh.uv_textures
 
-        uvs = {}
-        if uv_textures:
-            backup_texture = None
-            for textureLayer in uv_textures:
-                if textureLayer.active:
-                    backup_texture = textureLayer
-
-            for textureLayer in uv_textures:
-                textureLayer.active = True
-                #mesh.update()
-                uv_array = []
-
-                for face,f in collected_faces:
-                    data = textureLayer.data[face.index]
-                    uv_array.append(data.uv1)
-                    uv_array.append(data.uv2)
-                    uv_array.append(data.uv3)
-                    if len(face.vertices) > 3:
-                        uv_array.append(data.uv4)
-                uvs[textureLayer.name] = uv_array
-            backup_texture.active = True
-            #mesh.update()
-
-        normals = []
-        for face,f in collected_faces:
-            if face.use_smooth:
-                for vert in face.vertices:
-                    normals.append(mesh.vertices[vert].normal)
-            else:
-                for vert in face.vertices:
-                    normals.append(face.normal)
-
-        mapping_vertexes = []
-        merged_vertexes = []
-        tagged_vertexes = []
-        for i in range(0,len(vertexes)):
-            merged_vertexes.append(i)
-            tagged_vertexes.append(False)
-
-        def truncateFloat(value, digit = 5):
-            return round(value, digit)
-
-        def truncateVector(vector, digit = 5):
-            for i in range(0,len(vector)):
-                vector[i] = truncateFloat(vector[i], digit)
-            return vector
-
-        def get_vertex_key(index):
-            return (
-                (truncateFloat(vertexes[index].co[0]), truncateFloat(vertexes[index].co[1]), truncateFloat(vertexes[index].co[2])),
-
-                (truncateFloat(normals[index][0]), truncateFloat(normals[index][1]), truncateFloat(normals[index][2])),
-                tuple([tuple(truncateVector(uvs[x][index])) for x in uvs.keys()]))
-                # vertex color not supported
-                #tuple([tuple(truncateVector(colors[x][index])) for x in colors.keys()]))
-
-        # Build a dictionary of indexes to all the vertexes that
-        # are equal.
-        vertex_dict = {}
-        for i in range(0, len(vertexes)):
-            key = get_vertex_key(i)
-            if DEBUG: osglog.log("key %s" % str(key))
-            if key in vertex_dict.keys():
-                vertex_dict[key].append(i)
-            else:
-                vertex_dict[key] = [i]
-
-        for i in range(0, len(vertexes)):
-            if tagged_vertexes[i] is True: # avoid processing more than one time a vertex
-                continue
-            index = len(mapping_vertexes)
-            merged_vertexes[i] = index
-            mapping_vertexes.append([i])
-            if DEBUG: osglog.log("process vertex %s" % i)
-            vertex_indexes = vertex_dict[get_vertex_key(i)]
-            for j in vertex_indexes:
-                if j <= i:
-                    continue
-                if tagged_vertexes[j] is True: # avoid processing more than one time a vertex
-                    continue
-                if DEBUG: osglog.log("   vertex %s is the same" % j)
-                merged_vertexes[j] = index
-                tagged_vertexes[j] = True
-                mapping_vertexes[index].append(j)
-
-        if DEBUG:
-            for i in range(0, len(mapping_vertexes)):
-                osglog.log("vertex %s contains %s" % (str(i), str(mapping_vertexes[i])))
-
-        if len(mapping_vertexes) != len(vertexes):
-            osglog.log("vertexes reduced from %s to %s" % (str(len(vertexes)),len(mapping_vertexes)))
+        corner_count = geometry_data.corner_count
+        vertex_count = len(geometry_data.vertexes) // 3
+        if vertex_count != corner_count:
+            osglog.log("vertexes reduced from %s to %s", corner_count, vertex_count, subsystem="geometry")
         else:
-            osglog.log("vertexes %s" % str(len(vertexes)))
-
-        faces = []
-        for (original, face) in collected_faces:
-            f = []
-            if DEBUG: fdebug = []
-            for v in face:
-                f.append(merged_vertexes[v])
-                if DEBUG: fdebug.append(vertexes[mapping_vertexes[merged_vertexes[v]][0]].index)
-            faces.append(f)
-            if DEBUG: osglog.log("new face %s" % str(f))
-            if DEBUG: osglog.log("true face %s" % str(fdebug))
+            osglog.log("vertexes %s", corner_count, subsystem="geometry")
+
+        faces = geometry_data.faces
+        if osglog.isEnabled(osglog.DEBUG, "geometry"):
+            for f in faces:
+                osglog.debug("new face %s", f, subsystem="geometry")
             
-        osglog.log("faces %s" % str(len(faces)))
+        osglog.log("faces %s", len(faces), subsystem="geometry")
 
         vgroups = {}
-        original_vertexes2optimized = {}
-        for i in range(0, len(mapping_vertexes)):
-            for k in mapping_vertexes[i]:
-                index = vertexes[k].index
-                if not index in original_vertexes2optimized.keys():
-                    original_vertexes2optimized[index] = []
-                original_vertexes2optimized[index].append(i)
-
         # for i in mesh.getVertGroupNames():
         #    verts = {}
         #    for idx, weight in mesh.getVertsFromGroup(i, 1):
@@ -1462,53 +1767,28 @@ class BlenderObjectToGeometry(object):
         #    if obj.data == mesh:
         #        blenObject = obj
 
-        for vertex_group in self.object.vertex_groups:
-            #osglog.log("Look at vertex group: " + repr(vertex_group))
-            verts = {}
-            for idx in range(0, len(mesh.vertices)):
-                weight = 0
-
-                for vg in mesh.vertices[idx].groups:
-                    if vg.group == vertex_group.index:
-                        weight = vg.weight
-                if weight >= 0.001:
-                    if idx in original_vertexes2optimized.keys():
-                        for v in original_vertexes2optimized[idx]:
-                            if not v in verts.keys():
-                                verts[v] = weight
-                    
-            if len(verts) == 0:
-                osglog.log( "WARNING group has no vertexes, skip it, if really unsued you should clean it")
+        for (group_name, vertex_weight_list) in geometry_data.groups:
+            if len(vertex_weight_list) == 0:
+                osglog.warning("group has no vertexes, skip it, if really unsued you should clean it", subsystem="geometry")
             else:
-                vertex_weight_list = [ list(e) for e in verts.items() ]
                 vg = VertexGroup()
-                vg.targetGroupName = vertex_group.name
+                vg.targetGroupName = group_name
                 vg.vertexes = vertex_weight_list
-                vgroups[vertex_group.name] = vg
+                vgroups[group_name] = vg
 
         if (len(vgroups)):
-            osglog.log("vertex groups %s" % str(len(vgroups)))
+            osglog.log("vertex groups %s", len(vgroups), subsystem="geometry")
         geom.groups = vgroups
         
-        osg_vertexes = VertexArray()
-        osg_normals = NormalArray()
+        osg_vertexes = VertexArray(array = StridedArray(3, geometry_data.vertexes))
+        osg_normals = NormalArray(array = StridedArray(3, geometry_data.normals))
         osg_uvs = {}
         #osg_colors = {}
-        for vertex in mapping_vertexes:
-            vindex = vertex[0]
-            coord = vertexes[vindex].co
-            osg_vertexes.getArray().append([coord[0], coord[1], coord[2] ])
-
-            ncoord = normals[vindex]
-            osg_normals.getArray().append([ncoord[0], ncoord[1], ncoord[2]])
-
-            for name in uvs.keys():
-                if not name in osg_uvs.keys():
-                    osg_uvs[name] = TexCoordArray()
-                osg_uvs[name].getArray().append(uvs[name][vindex])
+        for name, values in geometry_data.uvs:
+            osg_uvs[name] = TexCoordArray(array = StridedArray(2, values))
 
         if (len(osg_uvs)):
-            osglog.log("uvs channels %s - %s" % (len(osg_uvs), str(osg_uvs.keys())))
+            osglog.log("uvs channels %s - %s", len(osg_uvs), osg_uvs.keys(), subsystem="geometry")
 
         nlin = 0
         ntri = 0
@@ -1523,7 +1803,7 @@ class BlenderObjectToGeometry(object):
             elif nv == 4:
                 nquad = nquad + 1
             else:
-                osglog.log("WARNING can't manage faces with %s vertices" % nv)
+                osglog.warning("can't manage faces with %s vertices", nv, subsystem="geometry")
 
         # counting number of primitives (one for lines, one for triangles and one for quads)
         numprims = 0
@@ -1543,8 +1823,7 @@ class BlenderObjectToGeometry(object):
             for face in faces:
                 nv = len(face)
                 if nv == 2:
-                    lines.indexes.append(face[0])
-                    lines.indexes.append(face[1])
+                    lines.addIndexes(face)
                 nface = nface + 1
             primitives.append(lines)
 
@@ -1555,9 +1834,7 @@ class BlenderObjectToGeometry(object):
             for face in faces:
                 nv = len(face)
                 if nv == 3:
-                    triangles.indexes.append(face[0])
-                    triangles.indexes.append(face[1])
-                    triangles.indexes.append(face[2])
+                    triangles.addIndexes(face)
                 nface = nface + 1
             primitives.append(triangles)
 
@@ -1568,13 +1845,13 @@ class BlenderObjectToGeometry(object):
             for face in faces:
                 nv = len(face)
                 if nv == 4:
-                    quads.indexes.append(face[0])
-                    quads.indexes.append(face[1])
-                    quads.indexes.append(face[2])
-                    quads.indexes.append(face[3])
+                    quads.addIndexes(face)
                 nface = nface + 1
             primitives.append(quads)
 
+        for primitive in primitives:
+            primitive.vertex_count = len(osg_vertexes.getArray())
+
         geom.uvs = osg_uvs
         #geom.colors = osg_colors
         geom.vertexes = osg_vertexes
@@ -1589,7 +1866,7 @@ class BlenderObjectToGeometry(object):
             self.adjustUVLayerFromMaterial(geom, mesh.materials[material_index], uv_textures)
 
         end_title = '-' * len(title)
-        osglog.log(end_title)
+        osglog.log(end_title, subsystem="geometry")
         return geom
 
     def process(self, mesh):
@@ -1608,8 +1885,109 @@ class BlenderObjectToGeometry(object):
                 if geom is not None:
                     geometry_list.append(geom)
                 material_index += 1
+
+        if self.config.optimize_vertex_cache:
+            for geom in geometry_list:
+                self.optimizeGeometry(geom)
+
+        if self.config.split_geometries:
+            split_list = []
+            for geom in geometry_list:
+                split_list += self.splitGeometry(geom)
+            geometry_list = split_list
+
+        if self.array_spill is not None:
+            for geom in geometry_list:
+                for data in [geom.vertexes, geom.normals, geom.colors] + list(geom.uvs.values()):
+                    if data is not None and data.array is not None:
+                        data.array.spill(self.array_spill)
         return geometry_list
 
+    def optimizeGeometry(self, geom):
+        # reorder the faces for the post transform cache then the vertexes
+        # in order of first use for the pre transform fetch
+        vertex_count = len(geom.vertexes.getArray())
+        size = { "GL_LINES": 2, "GL_TRIANGLES": 3, "GL_QUADS": 4 }
+        for primitive in geom.primitives:
+            if primitive.type != "GL_LINES":
+                primitive.indexes = osgmesh.optimizeVertexCache(primitive.indexes, size[primitive.type], vertex_count)
+
+        order, primitives = osgmesh.optimizeVertexFetch([p.indexes for p in geom.primitives], vertex_count)
+        new_index = [0] * vertex_count
+        for (new, old) in enumerate(order):
+            new_index[old] = new
+        for (primitive, indexes) in zip(geom.primitives, primitives):
+            primitive.setIndexes(indexes)
+
+        arrays = [geom.vertexes.array, geom.normals.array] + [uv.array for uv in geom.uvs.values()]
+        reordered = set()
+        for data in arrays:
+            # texture units can share the same array
+            if id(data) not in reordered:
+                reordered.add(id(data))
+                data.reorder(order)
+
+        for group in geom.groups.values():
+            group.vertexes = [[new_index[v], weight] for (v, weight) in group.vertexes]
+
+    def splitGeometry(self, geom, max_vertexes = 65536):
+        # split geom in geometries small enough to use 16 bits indexes,
+        # primitives are never cut
+        if len(geom.vertexes.getArray()) <= max_vertexes:
+            return [geom]
+
+        chunks = []
+        chunk = None
+        for primitive in geom.primitives:
+            size = { "GL_LINES": 2, "GL_TRIANGLES": 3, "GL_QUADS": 4 }[primitive.type]
+            for start in range(0, len(primitive.indexes), size):
+                face = primitive.indexes[start:start + size]
+                if chunk is not None:
+                    new_vertexes = len(set(v for v in face if v not in chunk[0]))
+                    if len(chunk[0]) + new_vertexes > max_vertexes:
+                        chunk = None
+                if chunk is None:
+                    # (old index -> new index, primitives by type)
+                    chunk = ({}, {})
+                    chunks.append(chunk)
+                (remap, primitives) = chunk
+                if primitive.type not in primitives:
+                    primitives[primitive.type] = DrawElements()
+                    primitives[primitive.type].type = primitive.type
+                primitives[primitive.type].addIndexes([remap.setdefault(v, len(remap)) for v in face])
+
+        osglog.log("geometry %s split in %d geometries", geom.name, len(chunks), subsystem="geometry")
+        geometries = []
+        for (remap, primitives) in chunks:
+            for primitive in primitives.values():
+                primitive.vertex_count = len(remap)
+            order = sorted(remap.keys(), key=lambda v: remap[v])
+            split = Geometry()
+            split.setName(geom.name)
+            split.stateset = geom.stateset
+            split.vertexes = VertexArray(array = geom.vertexes.getArray().take(order))
+            split.normals = NormalArray(array = geom.normals.getArray().take(order))
+            uv_arrays = {}
+            split.uvs = {}
+            for key, uv in geom.uvs.items():
+                # texture units can share the same array
+                if id(uv.array) not in uv_arrays:
+                    uv_arrays[id(uv.array)] = TexCoordArray(array = uv.getArray().take(order)).array
+                split.uvs[key] = TexCoordArray()
+                split.uvs[key].index = uv.index
+                split.uvs[key].array = uv_arrays[id(uv.array)]
+            split.primitives = [primitives[t] for t in ("GL_LINES", "GL_TRIANGLES", "GL_QUADS") if t in primitives]
+            split.groups = {}
+            for name, group in geom.groups.items():
+                vertexes = [[remap[v], weight] for (v, weight) in group.vertexes if v in remap]
+                if len(vertexes) > 0:
+                    vg = VertexGroup()
+                    vg.targetGroupName = group.targetGroupName
+                    vg.vertexes = vertexes
+                    split.groups[name] = vg
+            geometries.append(split)
+        return geometries
+
     def convert(self):
         # looks like this was dropped
         # if self.mesh.vertexUV:
@@ -1631,6 +2009,15 @@ class BlenderAnimationToAnimation(object):
         self.unique_objects = kwargs.get("unique_objects", {})
         self.blenderanimations = {}
         self.needbake = {}
+        self.fcurve_indexes = {}
+        self.baked_actions = kwargs.get("baked_actions", None)
+        if self.baked_actions is None:
+            self.baked_actions = {}
+
+    def getFCurveIndex(self, action):
+        if action not in self.fcurve_indexes:
+            self.fcurve_indexes[action] = getFCurveIndex(action)
+        return self.fcurve_indexes[action]
     
     def needBake(self, action):
         for fcu in action.fcurves:
@@ -1651,7 +2038,8 @@ class BlenderAnimationToAnimation(object):
                      True,  #do_pose
                      True,  #do_object
                      False, #do_constraint_clear
-                     False) #to_quat
+                     False, #to_quat
+                     self.config.bake_to_channels) #in_memory
         
         return action
 
@@ -1683,38 +2071,58 @@ class BlenderAnimationToAnimation(object):
                         if bake or self.needBake(strip.action):
                             self.needbake[n.name] = True  
     
+    def getFrameRange(self, tracks):
+        start = 1000000
+        end = -1000000
+        for tr in tracks:
+            if isinstance(tr, bpy.types.NlaTrack):
+                for strip in tr.strips:
+                    if strip.frame_start < start:
+                        start = strip.frame_start
+                    if strip.frame_end > end:
+                        end = strip.frame_end
+            else:
+                if tr.frame_range[0] < start:
+                    start = tr.frame_range[0]
+                if tr.frame_range[1] > end:
+                    end = tr.frame_range[1]
+        return (start, end)
+
+    def getBakeRanges(self):
+        # (animation name, start, end, tracks) of the animations
+        # createAnimation will bake
+        self.findApplicableAnimations(self.object, False)
+        ranges = []
+        for (a, b) in self.blenderanimations.items():
+            if a in self.needbake and self.needbake[a]:
+                (start, end) = self.getFrameRange(b)
+                ranges.append((a, start, end, b))
+        return ranges
+
     def createAnimation(self, target = None):
-        osglog.log("Exporting animation on object " + str(self.object))
+        osglog.log("Exporting animation on object %s", self.object, subsystem="animation")
         
         if target == None:
             target = self.object.name
 
         self.findApplicableAnimations(self.object, False)
-        osglog.log("Found animations {}".format(self.blenderanimations))
-        osglog.log("needbake {}".format(self.needbake))
+        osglog.log("Found animations %s", self.blenderanimations, subsystem="animation")
+        osglog.log("needbake %s", self.needbake, subsystem="animation")
         
         anims = []
         for (a, b) in self.blenderanimations.items():
             animation = Animation()
             animation.setName(a)
             
-            start = 1000000
-            end = -1000000
             for tr in b:
                 if isinstance(tr, bpy.types.NlaTrack):
                     tr.is_solo = True
-                    for strip in tr.strips:
-                        if strip.frame_start < start:
-                            start = strip.frame_start
-                        if strip.frame_end > end:
-                            end = strip.frame_end
-                else:
-                    if tr.frame_range[0] < start:
-                        start = tr.frame_range[0]
-                    if tr.frame_range[1] > end:
-                        end = tr.frame_range[1]
-            osglog.log("{} frame range {} {}".format(a, start, end))
-            if a in self.needbake and self.needbake[a]:
+            (start, end) = self.getFrameRange(b)
+            osglog.log("%s frame range %s %s", a, start, end, subsystem="animation")
+            if a in self.needbake and self.needbake[a] and (self.object, a) in self.baked_actions:
+                action = self.baked_actions.pop((self.object, a))
+                self.createAnimationFromAction(target, a, action, animation)
+            elif a in self.needbake and self.needbake[a]:
                 action = osgbake.bake(self.config.scene,
                      self.object,
                      start, 
@@ -1724,7 +2132,8 @@ class BlenderAnimationToAnimation(object):
                      True,  #do_pose
                      True,  #do_object
                      False, #do_constraint_clear
-                     False) #to_quat
+                     False, #to_quat
+                     self.config.bake_to_channels) #in_memory
                 self.createAnimationFromAction(target, a, action, animation)
             else:
                 for tr in b:
@@ -1747,36 +2156,43 @@ class BlenderAnimationToAnimation(object):
         if self.object.type == "ARMATURE":
             for bone in self.object.data.bones:
                 bname = bone.name
-                osglog.log("%s processing channels for bone %s" % (name, bname))
+                osglog.debug("%s processing channels for bone %s", name, bname, subsystem="animation")
                 self.appendChannelsToAnimation(bname, animation, action, prefix=('pose.bones["%s"].' % (bname)))
         else:
             self.appendChannelsToAnimation(target, animation, action)
 
     def appendChannelsToAnimation(self, target, anim, action, prefix = ""):
-        channels = exportActionsToKeyframeSplitRotationTranslationScale(target, action, self.config.anim_fps, prefix)
+        if isinstance(action, osgbake.BakedTransforms):
+            channels = exportBakedTransformsToChannels(target, action, self.config.anim_fps, prefix)
+        else:
+            channels = exportActionsToKeyframeSplitRotationTranslationScale(target, action, self.config.anim_fps, prefix, self.getFCurveIndex(action))
         for i in channels:
+            i.reduceKeys(self.config.keyframe_tolerance, self.config.keyframe_angle_tolerance)
             anim.channels.append(i)
 
-def getChannel(target, action, fps, data_path, array_indexes):
-    times = []
+def getFCurveIndex(action):
+    # (data_path, array_index) -> fcurves of the action
+    index = {}
+    for fcurve in action.fcurves:
+        index.setdefault((fcurve.data_path, fcurve.array_index), []).append(fcurve)
+    return index
+
+def getChannel(target, action, fps, data_path, array_indexes, fcurve_index = None):
     duration = 0
     fcurves = []
-    
+
+    if fcurve_index is None:
+        fcurve_index = getFCurveIndex(action)
+
     for array_index in array_indexes:
-        for fcurve in action.fcurves:
-            #osglog.log("fcurves %s %s matches %s %s " %(fcurve.data_path, fcurve.array_index, data_path, array_index))
-            if fcurve.data_path == data_path and fcurve.array_index == array_index:
-                fcurves.append(fcurve)
-                #osglog.log("yes")
+        fcurves.extend(fcurve_index.get((data_path, array_index), []))
             
     if len(fcurves) == 0:
         return None
         
-    
+    times = set()
     for fcurve in fcurves:
-        for keyframe in fcurve.keyframe_points:
-            if times.count(keyframe.co[0]) == 0:
-                times.append(keyframe.co[0])
+        times.update(keyframe.co[0] for keyframe in fcurve.keyframe_points)
     
     if len(times) == 0:
         return None
@@ -1791,7 +2207,7 @@ def getChannel(target, action, fps, data_path, array_indexes):
     if len(array_indexes) == 4:
         channel.type = "QuatSphericalLinearChannel"
     
-    times.sort()
+    times = sorted(times)
     
     #osglog.log("fcurves array_indexes is {}".format(array_indexes))
     
@@ -1818,10 +2234,12 @@ def getChannel(target, action, fps, data_path, array_indexes):
     return channel
 
 # as for blender 2.49
-def exportActionsToKeyframeSplitRotationTranslationScale(target, action, fps, prefix):
+def exportActionsToKeyframeSplitRotationTranslationScale(target, action, fps, prefix, fcurve_index = None):
     channels = []
+    if fcurve_index is None:
+        fcurve_index = getFCurveIndex(action)
 
-    translate = getChannel(target, action, fps, prefix+"location", [0, 1, 2])
+    translate = getChannel(target, action, fps, prefix+"location", [0, 1, 2], fcurve_index)
     if translate:
         translate.setName("translate")
         channels.append(translate)
@@ -1829,22 +2247,22 @@ def exportActionsToKeyframeSplitRotationTranslationScale(target, action, fps, pr
     euler = []
     eulerName = [ "euler_x", "euler_y", "euler_z"]
     for i in [0, 1, 2]:
-        c = getChannel(target, action, fps, prefix+"rotation_euler", [i])
+        c = getChannel(target, action, fps, prefix+"rotation_euler", [i], fcurve_index)
         if c:
             c.setName(eulerName[i])
             channels.append(c)
 
-    quaternion = getChannel(target, action, fps, prefix+"rotation_quaternion", [1, 2, 3, 0])
+    quaternion = getChannel(target, action, fps, prefix+"rotation_quaternion", [1, 2, 3, 0], fcurve_index)
     if quaternion:
         quaternion.setName("quaternion")
         channels.append(quaternion)
         
-    axis_angle = getChannel(target, action, fps, prefix+"rotation_axis_angle", [1, 2, 3, 0])
+    axis_angle = getChannel(target, action, fps, prefix+"rotation_axis_angle", [1, 2, 3, 0], fcurve_index)
     if axis_angle:
         axis_angle.setName("axis_angle")
         channels.append(axis_angle)
 
-    scale = getChannel(target, action, fps, prefix+"scale", [0, 1, 2])
+    scale = getChannel(target, action, fps, prefix+"scale", [0, 1, 2], fcurve_index)
     if scale:
         scale.setName("scale")
         channels.append(scale)
@@ -1852,3 +2270,61 @@ def exportActionsToKeyframeSplitRotationTranslationScale(target, action, fps, pr
     return channels
 
     
+
+def getBakedChannel(target, name, channel_type, times, values):
+    # a sample equal to the previous kept one and to the next one is
+    # dropped, like the duplicate keyframes of a baked action
+    channel = Channel()
+    channel.target = target
+    channel.type = channel_type
+    channel.setName(name)
+    last = len(values) - 1
+    kept = None
+    for (i, value) in enumerate(values):
+        if 0 < i < last:
+            following = values[i + 1]
+            if all(abs(v - p) + abs(v - n) < 0.0001 for (v, p, n) in zip(value, kept, following)):
+                continue
+        kept = value
+        channel.keys.append([times[i]] + list(value))
+
+    # osg needs to have at least two keyframes
+    if len(channel.keys) == 1:
+        c = list(channel.keys[0])
+        c[0] = c[0] + .01
+        channel.keys.append(c)
+
+    return channel
+
+# same channels as exportActionsToKeyframeSplitRotationTranslationScale,
+# built from the matrices sampled by osgbake.bakeBatch with in_memory
+def exportBakedTransformsToChannels(target, baked, fps, prefix):
+    channels = []
+    if prefix not in baked.transforms:
+        return channels
+    (rotation_mode, matrices) = baked.transforms[prefix]
+    if len(matrices) == 0:
+        return channels
+    times = [frame / fps for frame in baked.frames]
+
+    channels.append(getBakedChannel(target, "translate", "Vec3LinearChannel", times,
+                                    [tuple(matrix.to_translation()) for matrix in matrices]))
+
+    if rotation_mode == 'QUATERNION':
+        quaternions = [matrix.to_quaternion() for matrix in matrices]
+        channels.append(getBakedChannel(target, "quaternion", "QuatSphericalLinearChannel", times,
+                                        [(q[1], q[2], q[3], q[0]) for q in quaternions]))
+    elif rotation_mode == 'AXIS_ANGLE':
+        axis_angles = [matrix.to_quaternion().to_axis_angle() for matrix in matrices]
+        channels.append(getBakedChannel(target, "axis_angle", "QuatSphericalLinearChannel", times,
+                                        [(axis[0], axis[1], axis[2], angle) for (axis, angle) in axis_angles]))
+    else:  # euler, XYZ, ZXY etc
+        eulers = [matrix.to_euler(rotation_mode) for matrix in matrices]
+        for (i, name) in enumerate(["euler_x", "euler_y", "euler_z"]):
+            channels.append(getBakedChannel(target, name, "FloatLinearChannel", times,
+                                            [(euler[i],) for euler in eulers]))
+
+    channels.append(getBakedChannel(target, "scale", "Vec3LinearChannel", times,
+                                    [tuple(matrix.to_scale()) for matrix in matrices]))
+
+    return channels
@@ -0,0 +1,275 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# user interface of the exporter, registered by register() of the package
+
+import os
+import pickle
+
+import bpy
+from . import osgconf
+from . import OpenSceneGraphExport
+
+def menu_export_osg_model(self, context):
+    #import os
+    #default_path = os.path.splitext(bpy.data.filepath)[0] + "_" + bpy.context.scene.name
+    #default_path = default_path.replace('.', '_')
+    #self.layout.operator(OSGGUI.bl_idname, text="OSG Model(.osg)").filepath = default_path
+	self.layout.operator(OSGGUI.bl_idname, text="OSG Model(.osgt)")
+
+def register():
+    bpy.utils.register_module(__package__)
+    bpy.types.INFO_MT_file_export.append(menu_export_osg_model)
+
+def unregister():
+    bpy.utils.unregister_module(__package__)
+    bpy.types.INFO_MT_file_export.remove(menu_export_osg_model)
+
+from bpy.props import *
+try:
+    from io_utils import ExportHelper
+    print("Use old import path - your blender is not the latest version")
+except:
+    from bpy_extras.io_utils import ExportHelper
+    #print("Use new import path")
+
+
+# Property subtype constant changed with r50938
+FILE_NAME = "FILE_NAME" if bpy.app.build_revision >= b'50938' else "FILENAME"
+
+class OSGGUI(bpy.types.Operator, ExportHelper):
+    '''Export model data to an OpenSceneGraph file'''
+    bl_idname = "osg.export"
+    bl_label = "OSG Model"
+
+    filename_ext = ".osgt"
+    
+    # List of operator properties, the attributes will be assigned
+    # to the class instance from the operator settings before calling.
+    
+    AUTHOR = StringProperty(name="Author", description="Name of the Author of this model", default="")
+    SELECTED = BoolProperty(name="Only Export Selected", description="Only export the selected model", default=False)
+    ONLY_VISIBLE = BoolProperty(name="Only Export Visible", description="Only export the visible models", default=False)
+    INDENT = IntProperty(name="Number of Indent Spaces", description="Number of Spaces to use for indentation in the model file", default=3, min=1, max=8)
+    FLOATPRE = IntProperty(name="Floating Point Precision", description="The Floating Point Precision to use in exported model file", min=1, max=8, default=4)
+    ANIMFPS = IntProperty(name="Frames Per Second", description="Number of Frames Per Second to use for exported animations", min=1, max=300, default=30)
+    EXPORTANIM = BoolProperty(name="Export animations", description="Export animation yes/no", default=True)
+    APPLYMODIFIERS = BoolProperty(name="Apply Modifiers", description="Apply modifiers before exporting yes/no", default=True)
+    LOG = BoolProperty(name="Write log", description="Write log file yes/no", default=False)
+    LOG_LEVEL = EnumProperty(name="Log level", description="Messages written to the console and the log file",
+                             items=(("ERROR", "Errors", "Only errors"),
+                                    ("WARNING", "Warnings", "Errors and warnings"),
+                                    ("INFO", "Information", "Export progress"),
+                                    ("DEBUG", "Debug", "Every message, slow on large scenes")),
+                             default="INFO")
+    BAKE_CONSTRAINTS = BoolProperty(name="Bake Constraints", description="Bake constraints into actions", default=True)
+    BAKE_FRAME_STEP = IntProperty(name="Bake frame step", description="Frame step when baking actions", default=1, min=1, max=30)
+    KEYFRAME_TOLERANCE = FloatProperty(name="Keyframe tolerance", description="Drop keyframes that linear interpolation reproduces within this distance (0 keeps all keys)", default=0.0, min=0.0, max=10.0, precision=5)
+    KEYFRAME_ANGLE_TOLERANCE = FloatProperty(name="Keyframe angle tolerance", description="Drop rotation keyframes that spherical interpolation reproduces within this angle in radians (0 keeps all keys)", default=0.0, min=0.0, max=1.0, precision=5)
+    BAKE_TO_CHANNELS = BoolProperty(name="Bake without actions", description="Write baked samples to the channels without creating actions", default=False)
+    RUN_OSGCONV = BoolProperty(name="Run osgconv", description="Use osgconv to convert file", default=False)
+    OSGCONV_EXT = StringProperty(name="Convert to", description="File type to ask osgconv convert to (ive, osgb, ...)", default="ive")
+    OSGCONV_EMBED_TEXTURES = BoolProperty(name="Embed textures", default=False)
+    OSGCONV_CLEANUP = BoolProperty(name="Cleanup after conversion", default=False)
+    OSGCONV_PATH = StringProperty(name="osgconv path", subtype=FILE_NAME, default="")
+    RUN_VIEWER = BoolProperty(name="Run viewer (viewer path)", description="Run viewer after export", default=False)
+    VIEWER_PATH = StringProperty(name="viewer path", subtype=FILE_NAME, default="")
+    TEXTURE_PREFIX = StringProperty(name="texture prefix", default="")
+    EXPORT_ALL_SCENES = BoolProperty(name="Export all scenes", default=False)
+    ZERO_TRANSLATIONS = BoolProperty(name="Zero world translations", default=False)
+    OPTIMIZE_INFLUENCE = BoolProperty(name="Optimize bone influences", default=False)
+    INTERN_ARRAYS = BoolProperty(name="Share identical arrays", description="Write arrays with the same content once and reference them", default=False)
+    STREAM_ARRAYS = BoolProperty(name="Spill arrays to disk", description="Keep vertex arrays in a temporary file until they are written to lower memory use", default=False)
+    CACHE_GEOMETRIES = BoolProperty(name="Cache converted meshes", description="Keep converted meshes in a directory next to the output and reuse them for unchanged meshes", default=False)
+    EXPORT_STATS = BoolProperty(name="Write export statistics", description="Write the time spent in each export step and the size of each node type in a json file next to the output", default=False)
+    PROCESSES = IntProperty(name="Worker processes", description="Number of processes converting the meshes and writing the scene", default=1, min=1, max=64)
+    TRIANGULATE = BoolProperty(name="Triangulate quads", description="Export quads as triangles instead of GL_QUADS", default=False)
+    TRIANGULATE_SHORTEST_DIAGONAL = BoolProperty(name="Split quads on shorter diagonal", description="Split each quad along its shorter diagonal", default=False)
+    OPTIMIZE_VERTEX_CACHE = BoolProperty(name="Optimize vertex cache", description="Reorder faces and vertexes for the GPU vertex caches", default=False)
+    SPLIT_GEOMETRIES = BoolProperty(name="Split large geometries", description="Split geometries with more than 65536 vertexes to use 16 bits indexes", default=False)
+    BINARY = BoolProperty(name="Binary file (.osgb)", description="Write the native binary format instead of ascii", default=False)
+   
+    def draw(self, context):
+        layout = self.layout
+        
+        layout.row(align=True).label("Author:")
+        layout.row(align=True).prop(self, "AUTHOR", text="")
+        layout.row(align=True).prop(self, "SELECTED")
+        layout.row(align=True).prop(self, "ONLY_VISIBLE")
+        layout.row(align=True).prop(self, "EXPORTANIM")
+        layout.row(align=True).prop(self, "EXPORT_ALL_SCENES")
+        layout.row(align=True).prop(self, "APPLYMODIFIERS")
+        layout.row(align=True).prop(self, "BAKE_CONSTRAINTS")
+        layout.row(align=True).prop(self, "BAKE_TO_CHANNELS")
+        layout.row(align=True).prop(self, "LOG")
+        layout.row(align=True).prop(self, "LOG_LEVEL")
+        layout.row(align=True).prop(self, "ZERO_TRANSLATIONS")
+        layout.row(align=True).prop(self, "OPTIMIZE_INFLUENCE")
+        layout.row(align=True).prop(self, "TRIANGULATE")
+        layout.row(align=True).prop(self, "TRIANGULATE_SHORTEST_DIAGONAL")
+        layout.row(align=True).prop(self, "OPTIMIZE_VERTEX_CACHE")
+        layout.row(align=True).prop(self, "SPLIT_GEOMETRIES")
+        layout.row(align=True).prop(self, "BINARY")
+        layout.row(align=True).prop(self, "STREAM_ARRAYS")
+        layout.row(align=True).prop(self, "CACHE_GEOMETRIES")
+        layout.row(align=True).prop(self, "EXPORT_STATS")
+        layout.row(align=True).prop(self, "INTERN_ARRAYS")
+        layout.row(align=True).prop(self, "ANIMFPS")
+        layout.row(align=True).prop(self, "PROCESSES")
+        layout.row(align=True).prop(self, "BAKE_FRAME_STEP")
+        layout.row(align=True).prop(self, "KEYFRAME_TOLERANCE")
+        layout.row(align=True).prop(self, "KEYFRAME_ANGLE_TOLERANCE")
+        layout.row(align=True).prop(self, "FLOATPRE")
+        layout.row(align=True).prop(self, "INDENT")
+        layout.row(align=True).label("Texture Prefix:")
+        layout.row(align=True).prop(self, "TEXTURE_PREFIX", text="")
+        layout.row(align=True).prop(self, "RUN_OSGCONV")
+        layout.row(align=True).prop(self, "OSGCONV_EXT")
+        layout.row(align=True).prop(self, "OSGCONV_EMBED_TEXTURES")
+        layout.row(align=True).prop(self, "OSGCONV_CLEANUP")
+        layout.row(align=True).prop(self, "OSGCONV_PATH", text="")
+        layout.row(align=True).prop(self, "RUN_VIEWER")
+        layout.row(align=True).prop(self, "VIEWER_PATH", text="")
+        
+    def invoke(self, context, event):
+        print("config is " + bpy.utils.user_resource('CONFIG'))
+        self.config = osgconf.Config()
+        
+        try:
+            cfg = os.path.join(bpy.utils.user_resource('CONFIG'), "osgExport.cfg")
+            if os.path.exists(cfg):
+                with open(cfg, 'rb') as f:
+                    self.config = pickle.load(f)
+        except Exception:
+            pass
+        
+        self.config.activate()
+            
+        self.SELECTED = (self.config.selected == "SELECTED_ONLY_WITH_CHILDREN")
+        self.ONLY_VISIBLE = self.config.only_visible
+        self.OPTIMIZE_INFLUENCE = self.config.optimize_influence
+        self.INDENT = self.config.indent
+        self.FLOATPRE = self.config.float_precision
+        self.ANIMFPS = context.scene.render.fps
+        
+        self.EXPORTANIM = self.config.export_anim
+        self.APPLYMODIFIERS = self.config.apply_modifiers
+        self.ZERO_TRANSLATIONS = self.config.zero_translations
+        self.LOG = self.config.log
+        self.LOG_LEVEL = self.config.log_level
+        self.BAKE_CONSTRAINTS = self.config.bake_constraints
+        self.BAKE_FRAME_STEP = self.config.bake_frame_step
+        self.BAKE_TO_CHANNELS = self.config.bake_to_channels
+        self.KEYFRAME_TOLERANCE = self.config.keyframe_tolerance
+        self.KEYFRAME_ANGLE_TOLERANCE = self.config.keyframe_angle_tolerance
+        self.RUN_OSGCONV = self.config.run_osgconv
+        self.OSGCONV_EXT = self.config.osgconv_ext
+        self.OSGCONV_EMBED_TEXTURES = self.config.osgconv_embed_textures
+        self.OSGCONV_PATH = self.config.osgconv_path
+        self.OSGCONV_CLEANUP = self.config.osgconv_cleanup
+        
+        self.RUN_VIEWER = self.config.run_viewer
+        self.VIEWER_PATH = self.config.viewer_path
+        self.TEXTURE_PREFIX = self.config.texture_prefix
+        self.EXPORT_ALL_SCENES = self.config.export_all_scenes
+        self.BINARY = self.config.binary
+        self.SPLIT_GEOMETRIES = self.config.split_geometries
+        self.OPTIMIZE_VERTEX_CACHE = self.config.optimize_vertex_cache
+        self.TRIANGULATE = self.config.triangulate
+        self.PROCESSES = self.config.processes
+        self.STREAM_ARRAYS = self.config.stream_arrays
+        self.CACHE_GEOMETRIES = self.config.cache_geometries
+        self.EXPORT_STATS = self.config.export_stats
+        self.INTERN_ARRAYS = self.config.intern_arrays
+        self.TRIANGULATE_SHORTEST_DIAGONAL = self.config.triangulate_shortest_diagonal
+        
+        if bpy.data.filepath in self.config.history:
+            self.filepath = self.config.history[bpy.data.filepath]
+        
+        return super(OSGGUI, self).invoke(context, event)
+    
+    def execute(self, context):
+        if not self.filepath:
+            raise Exception("filepath not set")
+
+        self.config.initFilePaths(self.filepath)
+        
+        self.config.history[bpy.data.filepath] = self.filepath
+        
+        if self.SELECTED:
+            self.config.selected = "SELECTED_ONLY_WITH_CHILDREN"
+        else:
+            self.config.selected = "ALL"
+        self.config.indent = self.INDENT
+        self.config.only_visible = self.ONLY_VISIBLE
+        self.config.float_precision =  self.FLOATPRE
+        self.config.anim_fps = self.ANIMFPS
+        self.config.export_anim = self.EXPORTANIM
+        self.config.apply_modifiers = self.APPLYMODIFIERS
+        self.config.log = self.LOG
+        self.config.log_level = self.LOG_LEVEL
+        self.config.zero_translations = self.ZERO_TRANSLATIONS
+        self.config.bake_constraints = self.BAKE_CONSTRAINTS
+        self.config.bake_frame_step = self.BAKE_FRAME_STEP
+        self.config.bake_to_channels = self.BAKE_TO_CHANNELS
+        self.config.keyframe_tolerance = self.KEYFRAME_TOLERANCE
+        self.config.keyframe_angle_tolerance = self.KEYFRAME_ANGLE_TOLERANCE
+        self.config.run_osgconv = self.RUN_OSGCONV
+        self.config.osgconv_ext = self.OSGCONV_EXT
+        self.config.osgconv_path = self.OSGCONV_PATH
+        self.config.run_viewer = self.RUN_VIEWER
+        self.config.viewer_path = self.VIEWER_PATH
+        self.config.texture_prefix = self.TEXTURE_PREFIX
+        self.config.osgconv_embed_textures = self.OSGCONV_EMBED_TEXTURES
+        self.config.export_all_scenes = self.EXPORT_ALL_SCENES
+        self.config.osgconv_cleanup = self.OSGCONV_CLEANUP
+        self.config.optimize_influence = self.OPTIMIZE_INFLUENCE
+        self.config.binary = self.BINARY
+        self.config.split_geometries = self.SPLIT_GEOMETRIES
+        self.config.optimize_vertex_cache = self.OPTIMIZE_VERTEX_CACHE
+        self.config.triangulate = self.TRIANGULATE
+        self.config.processes = self.PROCESSES
+        self.config.stream_arrays = self.STREAM_ARRAYS
+        self.config.cache_geometries = self.CACHE_GEOMETRIES
+        self.config.export_stats = self.EXPORT_STATS
+        self.config.intern_arrays = self.INTERN_ARRAYS
+        self.config.triangulate_shortest_diagonal = self.TRIANGULATE_SHORTEST_DIAGONAL
+        
+        try:
+            cfg = os.path.join(bpy.utils.user_resource('CONFIG'), "osgExport.cfg")
+            with open(cfg, 'wb') as f:
+                pickle.dump(self.config, f)
+        except Exception:
+            pass
+        
+        bpy.ops.object.mode_set(mode='OBJECT')
+        
+        if self.config.export_all_scenes:
+            for scene in bpy.data.scenes:
+                self.config.scene = scene
+                print(self.filepath + "_" + scene.name)
+                self.config.initFilePaths(os.path.splitext(self.filepath)[0] + "_" + scene.name)
+                print(self.config.fullpath)
+                print(self.config.filename)
+                OpenSceneGraphExport(self.config)
+        else:
+            print("FILENAME:" + repr(self.config.filename))
+            self.config.scene = bpy.context.scene
+            OpenSceneGraphExport(self.config)
+            
+        return {'FINISHED'}
@@ -17,9 +17,70 @@
 # Authors:
 #  Cedric Pinson <cedric.pinson@plopbyte.com>
 
+
+# messages have a level and optionally a subsystem ("geometry",
+# "animation", "material", ...). a message is dropped before it is
+# formatted when its level is above the verbosity of its subsystem, so
+# log("%s", value) costs almost nothing when disabled. loops building
+# several messages should check isEnabled() first
+
+ERROR   = 0
+WARNING = 1
+INFO    = 2
+DEBUG   = 3
+LEVEL_NAMES = { "ERROR": ERROR, "WARNING": WARNING, "INFO": INFO, "DEBUG": DEBUG }
+LABELS = { ERROR: "ERROR", WARNING: "WARNING" }
+
+LEVEL = INFO    # verbosity of the subsystems not in LEVELS
+LEVELS = {}     # subsystem -> verbosity
+CONSOLE = True  # print the messages on stdout
+
 LOGFILE = None
-def log(message):
+BUFFER = []     # lines not yet written to LOGFILE
+BUFFER_LINES = 256
+
+def getLevel(level):
+    # level as a number, names of LEVEL_NAMES are accepted
+    if level in LEVEL_NAMES:
+        return LEVEL_NAMES[level]
+    return int(level)
+
+def setLevel(level, subsystem = None):
+    global LEVEL
+    if subsystem is None:
+        LEVEL = getLevel(level)
+    else:
+        LEVELS[subsystem] = getLevel(level)
+
+def isEnabled(level, subsystem = None):
+    return level <= LEVELS.get(subsystem, LEVEL)
+
+def log(message, *args, level = INFO, subsystem = None):
+    if level > LEVELS.get(subsystem, LEVEL):
+        return
+    if args:
+        message = message % args
+    if level <= WARNING:
+        message = LABELS[level] + " " + message
+    if CONSOLE:
         print("osg:", message)
-        global LOGFILE
-        if LOGFILE:
-                LOGFILE.write(message + "\n")
+    if LOGFILE:
+        BUFFER.append(message + "\n")
+        # warnings and errors are written at once, they are often the last
+        # lines before an exception
+        if len(BUFFER) >= BUFFER_LINES or level <= WARNING:
+            flush()
+
+def error(message, *args, subsystem = None):
+    log(message, *args, level = ERROR, subsystem = subsystem)
+
+def warning(message, *args, subsystem = None):
+    log(message, *args, level = WARNING, subsystem = subsystem)
+
+def debug(message, *args, subsystem = None):
+    log(message, *args, level = DEBUG, subsystem = subsystem)
+
+def flush():
+    if LOGFILE and len(BUFFER) > 0:
+        LOGFILE.write("".join(BUFFER))
+    del BUFFER[:]
@@ -0,0 +1,109 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+# math used by the scene graph. inside blender these are the mathutils
+# types, outside of it small replacements with the same interface for what
+# osgobject needs, so the scene graph and the writers work without blender
+
+import math
+
+try:
+    from mathutils import Matrix, Quaternion, Vector
+except ImportError:
+    class Vector(list):
+        def __init__(self, values = (0.0, 0.0, 0.0)):
+            list.__init__(self, [float(v) for v in values])
+
+        x = property(lambda self: self[0])
+        y = property(lambda self: self[1])
+        z = property(lambda self: self[2])
+
+        def copy(self):
+            return Vector(self)
+
+    class Quaternion(list):
+        def __init__(self, values = (1.0, 0.0, 0.0, 0.0)):
+            list.__init__(self, [float(v) for v in values])
+
+        w = property(lambda self: self[0])
+        x = property(lambda self: self[1])
+        y = property(lambda self: self[2])
+        z = property(lambda self: self[3])
+
+        def copy(self):
+            return Quaternion(self)
+
+    class Matrix(list):
+        # 4x4, indexed like the mathutils of blender 2.62 and later
+        def __init__(self, rows = None):
+            if rows is None:
+                rows = [[1.0 if i == j else 0.0 for j in range(0, 4)] for i in range(0, 4)]
+            list.__init__(self, [Vector(row) for row in rows])
+
+        def copy(self):
+            return Matrix(self)
+
+        def to_4x4(self):
+            return Matrix(self)
+
+        def identity(self):
+            for i in range(0, 4):
+                for j in range(0, 4):
+                    self[i][j] = 1.0 if i == j else 0.0
+
+        def to_quaternion(self):
+            m = self
+            trace = m[0][0] + m[1][1] + m[2][2]
+            if trace > 0.0:
+                s = 2.0 * math.sqrt(trace + 1.0)
+                return Quaternion((0.25 * s, (m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s))
+            if m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+                s = 2.0 * math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2])
+                return Quaternion(((m[2][1] - m[1][2]) / s, 0.25 * s, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s))
+            if m[1][1] > m[2][2]:
+                s = 2.0 * math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2])
+                return Quaternion(((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s, 0.25 * s, (m[1][2] + m[2][1]) / s))
+            s = 2.0 * math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1])
+            return Quaternion(((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, 0.25 * s))
+
+
+# osg matrices are written row by row with the translation in the last
+# row. blender 2.62 transposed the mathutils matrices, the translation is
+# in the last column since then
+
+def getColumns(matrix):
+    return [(matrix[0][i], matrix[1][i], matrix[2][i], matrix[3][i]) for i in range(0,4)]
+
+def getRows(matrix):
+    return [(matrix[i][0], matrix[i][1], matrix[i][2], matrix[i][3]) for i in range(0,4)]
+
+# layout of the matrices to write, blender 2.62 and later by default
+getMatrixRows = getColumns
+
+def setBlenderVersion(version):
+    # select the matrix layout once for the blender running the export
+    global getMatrixRows
+    if version[0] >= 2 and version[1] >= 62:
+        getMatrixRows = getColumns
+    else:
+        getMatrixRows = getRows
@@ -0,0 +1,488 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+# mesh processing on flat arrays extracted from blender, this module must
+# not use bpy so it can work on data copied out of blender
+
+import array
+import hashlib
+import json
+import os
+import sys
+import time
+
+from . import osglog
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WELD_DIGITS = 5
+
+
+class MeshData(object):
+    # flat copy of the blender tessellated faces, filled with foreach_get
+    def __init__(self):
+        object.__init__(self)
+        self.coords = []          # 3 floats per vertex
+        self.vertex_normals = []  # 3 floats per vertex
+        self.face_vertexes = []   # 4 indexes per face, the 4th is 0 for triangles
+        self.face_materials = []
+        self.face_smooth = []
+        self.face_normals = []    # 3 floats per face
+        self.uv_layers = []       # (name, 8 floats per face)
+        self.vertex_groups = {}   # group index -> [(vertex, weight)]
+
+    def faceCount(self):
+        return len(self.face_materials)
+
+    def faceSize(self, face):
+        if self.face_vertexes[face*4+3] == 0:
+            return 3
+        return 4
+
+
+def collectFaces(data, material_index):
+    # returns the faces using the material as (face index, corner indexes)
+    # and the mesh vertex of each corner
+    faces = []
+    corners = []
+    face_vertexes = data.face_vertexes
+    for face in range(0, data.faceCount()):
+        if data.face_materials[face] != material_index:
+            continue
+        size = data.faceSize(face)
+        start = len(corners)
+        corners.extend(face_vertexes[face*4:face*4+size])
+        faces.append((face, list(range(start, start + size))))
+    return faces, corners
+
+
+def collectCornerAttributes(data, faces, corners):
+    # expand positions, normals and uvs per corner as flat lists
+    coords = []
+    normals = []
+    uvs = [(name, []) for name, values in data.uv_layers]
+    for face, face_corners in faces:
+        smooth = data.face_smooth[face]
+        for corner in face_corners:
+            vertex = corners[corner]
+            coords.extend(data.coords[vertex*3:vertex*3+3])
+            if smooth:
+                normals.extend(data.vertex_normals[vertex*3:vertex*3+3])
+            else:
+                normals.extend(data.face_normals[face*3:face*3+3])
+        for layer in range(0, len(uvs)):
+            start = face*8
+            uvs[layer][1].extend(data.uv_layers[layer][1][start:start + 2*len(face_corners)])
+    return coords, normals, uvs
+
+
+def weldVertexes(attributes, count, digits = WELD_DIGITS):
+    # attributes is a list of (flat values, components), corners with the
+    # same values once quantized share one vertex. returns the vertex of
+    # each corner and the first corner of each vertex, vertexes are
+    # numbered in order of first use
+    if numpy is not None and count > 0:
+        return weldVertexesNumpy(attributes, count, digits)
+
+    rows = []
+    for values, components in attributes:
+        quantized = [round(v, digits) for v in values]
+        rows.append(zip(*[iter(quantized)] * components))
+
+    index = {}
+    remap = []
+    representatives = []
+    for corner, key in enumerate(zip(*rows)):
+        vertex = index.setdefault(key, len(representatives))
+        if vertex == len(representatives):
+            representatives.append(corner)
+        remap.append(vertex)
+    return remap, representatives
+
+
+def weldVertexesNumpy(attributes, count, digits):
+    columns = [numpy.round(numpy.asarray(values, dtype=numpy.float64).reshape(count, components), digits)
+               for values, components in attributes]
+    # adding 0.0 turns -0.0 into 0.0 so rows can be compared as bytes
+    table = numpy.ascontiguousarray(numpy.hstack(columns) + 0.0)
+    rows = table.view(numpy.dtype((numpy.void, table.dtype.itemsize * table.shape[1]))).ravel()
+    unique, first, inverse = numpy.unique(rows, return_index=True, return_inverse=True)
+    order = numpy.argsort(first)
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    return rank[inverse.ravel()].tolist(), first[order].tolist()
+
+
+def triangulateFaces(faces, position = None):
+    # split quads in two triangles with the same winding, along the
+    # shorter diagonal when position(vertex) is given, else along the
+    # first/third vertex diagonal
+    result = []
+    for face in faces:
+        if len(face) != 4:
+            result.append(face)
+            continue
+        (a, b, c, d) = face
+        if position is not None:
+            ac = sum((p - q) ** 2 for (p, q) in zip(position(a), position(c)))
+            bd = sum((p - q) ** 2 for (p, q) in zip(position(b), position(d)))
+            if bd < ac:
+                result.append([a, b, d])
+                result.append([b, c, d])
+                continue
+        result.append([a, b, c])
+        result.append([a, c, d])
+    return result
+
+
+class GeometryData(object):
+    # result of buildGeometryData, only plain python data so it can be
+    # sent back from a worker process
+    def __init__(self):
+        object.__init__(self)
+        self.corner_count = 0
+        self.vertexes = array.array("f")  # 3 floats per vertex
+        self.normals = array.array("f")   # 3 floats per vertex
+        self.uvs = []                     # (name, 2 floats per vertex)
+        self.faces = []      # vertex indexes of each face
+        self.groups = []     # (name, [[vertex, weight]]), empty when the group has no vertexes
+        self.timings = {}    # "weld" and "influences" seconds
+
+
+def buildGeometryData(data, material_index, groups, triangulate = False, shortest_diagonal = False):
+    # weld the faces using material_index and remap the vertex groups, groups
+    # is a list of (group index, group name). returns None without faces
+    faces, corners = collectFaces(data, material_index)
+    if len(faces) == 0:
+        return None
+
+    result = GeometryData()
+    result.corner_count = len(corners)
+
+    # corners with the same position, normal and uvs become one vertex
+    start = time.time()
+    coords, normals, uvs = collectCornerAttributes(data, faces, corners)
+    attributes = [(coords, 3), (normals, 3)]
+    for name, values in uvs:
+        attributes.append((values, 2))
+    merged_vertexes, mapping_vertexes = weldVertexes(attributes, len(corners))
+    result.timings["weld"] = time.time() - start
+
+    for (original, face) in faces:
+        result.faces.append([merged_vertexes[v] for v in face])
+
+    if triangulate:
+        position = None
+        if shortest_diagonal:
+            position = lambda v: coords[mapping_vertexes[v]*3:mapping_vertexes[v]*3+3]
+        result.faces = triangulateFaces(result.faces, position)
+
+    start = time.time()
+    original_vertexes2optimized = {}
+    for k in range(0, len(corners)):
+        index = corners[k]
+        if not index in original_vertexes2optimized:
+            original_vertexes2optimized[index] = set()
+        original_vertexes2optimized[index].add(merged_vertexes[k])
+    for index in original_vertexes2optimized.keys():
+        original_vertexes2optimized[index] = sorted(original_vertexes2optimized[index])
+
+    for (group_index, group_name) in groups:
+        verts = {}
+        for idx, weight in data.vertex_groups.get(group_index, []):
+            if idx in original_vertexes2optimized:
+                for v in original_vertexes2optimized[idx]:
+                    if not v in verts:
+                        verts[v] = weight
+        result.groups.append((group_name, [list(e) for e in verts.items()]))
+    result.timings["influences"] = time.time() - start
+
+    for vindex in mapping_vertexes:
+        result.vertexes.extend(coords[vindex*3:vindex*3+3])
+        result.normals.extend(normals[vindex*3:vindex*3+3])
+    for name, values in uvs:
+        layer = array.array("f")
+        for vindex in mapping_vertexes:
+            layer.extend(values[vindex*2:vindex*2+2])
+        result.uvs.append((name, layer))
+    return result
+
+
+# bump when buildGeometryData output or the cache file layout changes so
+# old cache entries are ignored
+CACHE_VERSION = 3
+# entries not used for this long or beyond this total size are removed at
+# the end of the export, the least recently used first
+CACHE_MAX_AGE = 30 * 24 * 3600
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+class GeometryCache(object):
+    # buildGeometryData results stored in a directory, keyed by a hash of
+    # the mesh data and the options so an unchanged mesh is not converted
+    # again on the next export. an entry is a json header line followed by
+    # the raw bytes of the arrays listed in the header
+    def __init__(self, path):
+        object.__init__(self)
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def getKey(self, data, material_index, groups, *options):
+        digest = hashlib.sha1(repr((CACHE_VERSION, WELD_DIGITS, material_index, groups, options)).encode("utf-8"))
+        for (values, typecode) in ((data.coords, "d"),
+                                   (data.vertex_normals, "d"),
+                                   (data.face_vertexes, "l"),
+                                   (data.face_materials, "l"),
+                                   (data.face_smooth, "b"),
+                                   (data.face_normals, "d")):
+            digest.update(array.array(typecode, values).tobytes())
+        for (name, values) in data.uv_layers:
+            digest.update(name.encode("utf-8"))
+            digest.update(array.array("d", values).tobytes())
+        for (group_index, group_name) in groups:
+            weights = data.vertex_groups.get(group_index, [])
+            digest.update(array.array("d", [x for pair in weights for x in pair]).tobytes())
+        return digest.hexdigest()
+
+    def getFileName(self, key):
+        return os.path.join(self.path, key + ".cache")
+
+    def load(self, key):
+        # returns (result,) or None when the key is not in the cache
+        filename = self.getFileName(key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, "rb") as sfile:
+                header = json.loads(sfile.readline().decode("utf-8"))
+                if header["version"] != CACHE_VERSION:
+                    return None
+                blocks = []
+                for (typecode, itemsize, count) in header["blocks"]:
+                    values = array.array(typecode)
+                    if values.itemsize != itemsize:
+                        raise ValueError("%s items of %d bytes" % (typecode, itemsize))
+                    data = sfile.read(itemsize * count)
+                    if len(data) != itemsize * count:
+                        raise EOFError("truncated entry")
+                    values.frombytes(data)
+                    if header["byteorder"] != sys.byteorder:
+                        values.byteswap()
+                    blocks.append(values)
+                result = self.unpack(header, blocks)
+            # the modification time orders the entries for prune
+            os.utime(filename, None)
+            return (result,)
+        except (IOError, OSError, ValueError, KeyError, IndexError, TypeError, EOFError) as e:
+            osglog.warning("ignoring geometry cache entry %s (%s)", filename, e)
+            return None
+
+    def store(self, key, result):
+        # write to a temporary name first so an interrupted export does not
+        # leave a truncated entry
+        (header, blocks) = self.pack(result)
+        header["version"] = CACHE_VERSION
+        header["byteorder"] = sys.byteorder
+        header["blocks"] = [(values.typecode, values.itemsize, len(values)) for values in blocks]
+        filename = self.getFileName(key)
+        tmp = "%s.%d" % (filename, os.getpid())
+        with open(tmp, "wb") as sfile:
+            sfile.write(json.dumps(header).encode("utf-8") + b"\n")
+            for values in blocks:
+                sfile.write(values.tobytes())
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmp, filename)
+
+    def pack(self, result):
+        # (json header, arrays) of a buildGeometryData result
+        if result is None:
+            return ({"empty": True}, [])
+        header = {"corner_count": result.corner_count,
+                  "timings": result.timings,
+                  "uvs": [name for (name, values) in result.uvs],
+                  "groups": [name for (name, weights) in result.groups]}
+        blocks = [array.array("f", result.vertexes),
+                  array.array("f", result.normals)]
+        blocks.extend(array.array("f", values) for (name, values) in result.uvs)
+        blocks.append(array.array("I", [len(face) for face in result.faces]))
+        blocks.append(array.array("I", [v for face in result.faces for v in face]))
+        for (name, weights) in result.groups:
+            blocks.append(array.array("I", [vertex for (vertex, weight) in weights]))
+            blocks.append(array.array("d", [weight for (vertex, weight) in weights]))
+        return (header, blocks)
+
+    def unpack(self, header, blocks):
+        if header.get("empty", False):
+            return None
+        result = GeometryData()
+        result.corner_count = header["corner_count"]
+        result.timings = dict(header["timings"])
+        blocks = iter(blocks)
+        result.vertexes = next(blocks)
+        result.normals = next(blocks)
+        result.uvs = [(name, next(blocks)) for name in header["uvs"]]
+        sizes = next(blocks)
+        indexes = next(blocks)
+        start = 0
+        for size in sizes:
+            result.faces.append(indexes[start:start + size].tolist())
+            start += size
+        for name in header["groups"]:
+            vertexes = next(blocks)
+            weights = next(blocks)
+            result.groups.append((name, [[vertex, weight] for (vertex, weight) in zip(vertexes, weights)]))
+        return result
+
+    def prune(self, max_bytes = CACHE_MAX_BYTES, max_age = CACHE_MAX_AGE):
+        # remove the entries unused for max_age seconds, then the least
+        # recently used ones until the directory holds max_bytes
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.path):
+            if not name.endswith(".cache"):
+                continue
+            filename = os.path.join(self.path, name)
+            try:
+                info = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, filename))
+        entries.sort(reverse = True)
+        total = 0
+        removed = 0
+        for (mtime, size, filename) in entries:
+            if now - mtime <= max_age and total + size <= max_bytes:
+                total += size
+                continue
+            try:
+                os.remove(filename)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# vertex cache optimization, Tom Forsyth "Linear-Speed Vertex Cache
+# Optimisation". faces are kept as they are, only their order changes
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_FACE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+
+def vertexCacheScore(position, remaining, face_size, cache_size):
+    if remaining == 0:
+        return -1.0
+    score = 0.0
+    if position >= 0:
+        if position < face_size:
+            score = LAST_FACE_SCORE
+        else:
+            scaler = 1.0 / (cache_size - face_size)
+            score = (1.0 - (position - face_size) * scaler) ** CACHE_DECAY_POWER
+    return score + VALENCE_BOOST_SCALE * remaining ** -VALENCE_BOOST_POWER
+
+
+def optimizeVertexCache(indexes, face_size, vertex_count, cache_size = CACHE_SIZE):
+    # returns indexes with the faces reordered for the post transform cache
+    face_count = len(indexes) // face_size
+    if face_count < 2:
+        return list(indexes)
+
+    vertex_faces = [[] for v in range(0, vertex_count)]
+    for face in range(0, face_count):
+        for v in indexes[face*face_size:face*face_size + face_size]:
+            vertex_faces[v].append(face)
+
+    remaining = [len(faces) for faces in vertex_faces]
+    position = [-1] * vertex_count
+    vertex_score = [vertexCacheScore(-1, remaining[v], face_size, cache_size) for v in range(0, vertex_count)]
+    faceScore = lambda face: sum(vertex_score[v] for v in indexes[face*face_size:face*face_size + face_size])
+    emitted = [False] * face_count
+
+    result = []
+    cache = []
+    next_face = 0
+    best = max(range(0, face_count), key=faceScore)
+    while best >= 0:
+        face_vertexes = indexes[best*face_size:best*face_size + face_size]
+        result.extend(face_vertexes)
+        emitted[best] = True
+        for v in face_vertexes:
+            vertex_faces[v].remove(best)
+            remaining[v] -= 1
+
+        # most recent vertexes first, the cache can overflow by one face
+        cache = list(face_vertexes) + [v for v in cache if v not in face_vertexes]
+        evicted = cache[cache_size:]
+        cache = cache[:cache_size]
+        for v in evicted:
+            position[v] = -1
+            vertex_score[v] = vertexCacheScore(-1, remaining[v], face_size, cache_size)
+
+        touched = set()
+        for (p, v) in enumerate(cache):
+            position[v] = p
+            vertex_score[v] = vertexCacheScore(p, remaining[v], face_size, cache_size)
+            touched.update(vertex_faces[v])
+        for v in evicted:
+            touched.update(vertex_faces[v])
+
+        best = -1
+        best_score = -1.0
+        for face in touched:
+            score = faceScore(face)
+            if score > best_score:
+                best = face
+                best_score = score
+
+        if best < 0:
+            # nothing in the cache, continue with the next face left
+            while next_face < face_count and emitted[next_face]:
+                next_face += 1
+            if next_face < face_count:
+                best = next_face
+    return result
+
+
+def optimizeVertexFetch(primitives, vertex_count):
+    # primitives is a list of index lists, returns the vertex order that
+    # follows the first use in the primitives and the remapped indexes
+    remap = {}
+    for indexes in primitives:
+        for v in indexes:
+            if v not in remap:
+                remap[v] = len(remap)
+    # vertexes not used by any primitive are kept at the end
+    for v in range(0, vertex_count):
+        if v not in remap:
+            remap[v] = len(remap)
+    order = [0] * vertex_count
+    for (v, new) in remap.items():
+        order[new] = v
+    return order, [[remap[v] for v in indexes] for indexes in primitives]
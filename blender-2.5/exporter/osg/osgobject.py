@@ -20,19 +20,80 @@
 #  Jeremy Moles <jeremy@emperorlinux.com>
 
 
-import bpy
-import mathutils
+import array
+import hashlib
+import io
+import math
 import os
+import struct
+import sys
+import tempfile
 from . import osglog
+from . import osgmath
+from . import osgstats
 
-Matrix    = mathutils.Matrix
-Vector    = mathutils.Vector
+Matrix    = osgmath.Matrix
+Vector    = osgmath.Vector
 FLOATPRE  = 5
 CONCAT    = lambda s, j="": j.join(str(v) for v in s)
 STRFLT    = lambda f: "%%.%df" % FLOATPRE % float(f)
 INDENT    = 2
 VERSION   = (0,0,0)
 
+# indentation prefixes already expanded, keyed by (INDENT, indent_level, marker)
+INDENT_PREFIXES = {}
+
+# osg binary format (.osgb), written with the same serializer version as the
+# ascii header
+BINARY_MAGIC   = (0x6C910EA1, 0x1AFB4545)
+BINARY_VERSION = 92
+
+GLENUMS = { "GL_LINES": 0x0001,
+            "GL_TRIANGLES": 0x0004,
+            "GL_QUADS": 0x0007,
+            "GL_LIGHTING": 0x0B50,
+            "GL_BLEND": 0x0BE2,
+            "GL_TEXTURE_2D": 0x0DE1,
+            "REPEAT": 0x2901,
+            "CLAMP": 0x2900,
+            "CLAMP_TO_EDGE": 0x812F,
+            "CLAMP_TO_BORDER": 0x812D,
+            "MIRROR": 0x8370,
+            "NEAREST": 0x2600,
+            "LINEAR": 0x2601,
+            "NEAREST_MIPMAP_NEAREST": 0x2700,
+            "LINEAR_MIPMAP_NEAREST": 0x2701,
+            "NEAREST_MIPMAP_LINEAR": 0x2702,
+            "LINEAR_MIPMAP_LINEAR": 0x2703,
+            "SEPARATE_SPECULAR_COLOR": 0x81FA,
+            "SINGLE_COLOR": 0x81F9 }
+GLENUMS.update(("GL_LIGHT%d" % i, 0x4000 + i) for i in range(0, 8))
+
+MODE_VALUES = { "OFF": 0, "ON": 1 }
+DATA_VARIANCES = { "DYNAMIC": 0, "STATIC": 1, "UNKNOWN": 2 }
+MATERIAL_COLOR_MODES = { "AMBIENT": 0x1200,
+                         "DIFFUSE": 0x1201,
+                         "SPECULAR": 0x1202,
+                         "EMISSION": 0x1600,
+                         "AMBIENT_AND_DIFFUSE": 0x1602,
+                         "OFF": 0x1603 }
+# array type -> (binary id, components)
+ARRAY_TYPES = { "Vec2fArray": (15, 2),
+                "Vec3fArray": (16, 3),
+                "Vec4fArray": (17, 4) }
+# primitive set -> (binary id, struct format of an index)
+DRAW_ELEMENTS_TYPES = { "DrawElementsUByte": (52, "B"),
+                        "DrawElementsUShort": (53, "H"),
+                        "DrawElementsUInt": (54, "I") }
+# channel type -> struct format of a key (time + value)
+CHANNEL_KEY_FORMATS = { "FloatLinearChannel": "df",
+                        "Vec3LinearChannel": "dfff",
+                        "QuatSphericalLinearChannel": "ddddd" }
+
+
+def getMatrixRows(matrix):
+    return osgmath.getMatrixRows(matrix)
+
 
 def findNode(name, root):
     if root.name == name:
@@ -63,10 +124,202 @@ def findMaterial(name, root):
     return None
 
 
+class OutputBuffer(object):
+    # collect the serialized text in memory and write it to the underlying
+    # file in big chunks instead of one write per line, encoded unless the
+    # file is a text file
+    def __init__(self, output, chunks = 65536):
+        object.__init__(self)
+        self.output = output
+        self.text = isinstance(output, io.TextIOBase)
+        self.max_chunks = chunks
+        self.chunks = []
+        self.write = self.chunks.append
+        self.stats = None
+        # SubtreeWriter writing the children of the root in worker processes
+        self.subtree_writer = None
+
+    def countBytes(self, stats):
+        # add the size written by each object type to the "bytes <type>"
+        # counters of stats, the ascii output counts characters. nested
+        # objects are only counted in their own type
+        self.stats = stats
+        self.written = 0
+        self.nested = []
+        append = self.chunks.append
+        def write(data):
+            self.written += len(data)
+            append(data)
+        self.write = write
+
+    def beginObject(self):
+        self.nested.append([self.written, 0])
+
+    def endObject(self, obj):
+        (start, nested) = self.nested.pop()
+        size = self.written - start
+        self.stats.add("bytes " + obj.__class__.__name__, size - nested)
+        if len(self.nested) > 0:
+            self.nested[-1][1] += size
+
+    def writeSerialized(self, text, counters):
+        # text of objects written by another output, counters are its
+        # "bytes" counters when it counted them
+        self.write(text)
+        if self.stats is not None:
+            for (name, value) in counters.items():
+                self.stats.add(name, value)
+            if len(self.nested) > 0:
+                self.nested[-1][1] += len(text)
+
+    def checkpoint(self):
+        if len(self.chunks) >= self.max_chunks:
+            self.flush()
+
+    def flush(self):
+        if len(self.chunks) > 0:
+            text = "".join(self.chunks)
+            self.output.write(text if self.text else text.encode('utf-8'))
+            del self.chunks[:]
+
+
+class BinaryOutput(OutputBuffer):
+    # pack the scene in the osg binary serializer layout, little endian.
+    # objects and arrays get their ids when they are first written, later
+    # occurences only write the id like the ascii references
+    def __init__(self, output, chunks = 65536):
+        OutputBuffer.__init__(self, output, chunks)
+        self.objects = {}
+        self.arrays = {}
+        self.nested_callbacks = {}
+
+    def flush(self):
+        if len(self.chunks) > 0:
+            self.output.write(b"".join(self.chunks))
+            del self.chunks[:]
+
+    def writeHeader(self):
+        self.write(struct.pack("<IIIII", BINARY_MAGIC[0], BINARY_MAGIC[1], 1, BINARY_VERSION, 0))
+        self.writeString("0")
+
+    def writeBool(self, value):
+        self.write(b"\x01" if value else b"\x00")
+
+    def writeInt(self, value):
+        self.write(struct.pack("<i", value))
+
+    def writeUInt(self, value):
+        self.write(struct.pack("<I", value))
+
+    def writeFloat(self, value):
+        self.write(struct.pack("<f", value))
+
+    def writeDouble(self, value):
+        self.write(struct.pack("<d", value))
+
+    def writeFloats(self, values):
+        self.writeTyped(values, "f")
+
+    def writeTyped(self, values, typecode):
+        # typed arrays are written as they are, byte swapped on big endian
+        if isinstance(values, array.array) and values.typecode == typecode:
+            if sys.byteorder != "little":
+                values = array.array(typecode, values)
+                values.byteswap()
+            self.write(values.tobytes())
+        else:
+            self.write(struct.pack("<%d%s" % (len(values), typecode), *values))
+
+    def writeDoubles(self, values):
+        self.write(struct.pack("<%dd" % len(values), *values))
+
+    def writeString(self, string):
+        data = string.encode('utf-8')
+        self.writeUInt(len(data))
+        self.write(data)
+
+    def writeGLenum(self, name):
+        self.writeUInt(GLENUMS[name])
+
+    def writeMatrix(self, matrix):
+        for row in getMatrixRows(matrix):
+            self.writeDoubles(row)
+
+    def writeObject(self, obj):
+        self.writeString(obj.getNameSpaceClass())
+        uid = self.objects.get(obj)
+        if uid is not None:
+            self.writeUInt(uid)
+            return
+        uid = len(self.objects) + 1
+        self.objects[obj] = uid
+        self.writeUInt(uid)
+        if self.stats is None:
+            obj.serializeBinary(self)
+        else:
+            self.beginObject()
+            obj.serializeBinary(self)
+            self.endObject(obj)
+        self.checkpoint()
+
+    def writeOptionalObject(self, obj):
+        self.writeBool(obj is not None)
+        if obj is not None:
+            self.writeObject(obj)
+
+    def writeObjectList(self, objects):
+        self.writeBool(len(objects) > 0)
+        if len(objects) > 0:
+            self.writeUInt(len(objects))
+            for i in objects:
+                self.writeObject(i)
+
+    # osg keeps only one callback per slot, the following ones are
+    # chained as NestedCallback of the previous one
+    def writeCallbacks(self, callbacks):
+        for i in range(1, len(callbacks)):
+            self.nested_callbacks[callbacks[i-1]] = callbacks[i]
+        if len(callbacks) > 0:
+            self.writeOptionalObject(callbacks[0])
+        else:
+            self.writeOptionalObject(None)
+
+    def writeArray(self, array):
+        uid = self.arrays.get(array)
+        if uid is not None:
+            self.writeUInt(uid)
+            return
+        uid = len(self.arrays) + 1
+        self.arrays[array] = uid
+        self.writeUInt(uid)
+        if self.stats is None:
+            array.serializeBinary(self)
+        else:
+            self.beginObject()
+            array.serializeBinary(self)
+            self.endObject(array)
+
+    def writeImage(self, filename, key):
+        self.writeBool(True)
+        uid = self.objects.get(key)
+        if uid is not None:
+            self.writeUInt(uid)
+            return
+        uid = len(self.objects) + 1
+        self.objects[key] = uid
+        self.writeUInt(uid)
+        self.writeString(filename)
+        self.writeInt(0) # WriteHint
+        self.writeInt(2) # read image from external file
+
+
 class Writer(object):
     instances = {}
     wrote_elements = {}
     file_object = None
+    # id -> (object, already written) of the shared objects met by a
+    # SubtreeWriter worker
+    met_objects = None
 
     def __init__(self, comment = None):
         object.__init__(self)
@@ -76,28 +329,59 @@ class Writer(object):
         Writer.instances[self] = True
 
     def writeFile(self, output):
+        if not isinstance(output, OutputBuffer):
+            output = OutputBuffer(output)
         self.writeHeader(output)
         self.write(output)
+        output.flush()
 
     def writeHeader(self, output):
-        output.write("#Ascii Scene\n".encode('utf-8'))
-        output.write("#Version 92\n".encode('utf-8'))
-        output.write(("#Generator osgexport %d.%d.%d\n\n" % VERSION).encode('utf-8'))
+        output.write("#Ascii Scene\n")
+        output.write("#Version 92\n")
+        output.write("#Generator osgexport %d.%d.%d\n\n" % VERSION)
+
+    def writeBinaryFile(self, output):
+        if not isinstance(output, BinaryOutput):
+            output = BinaryOutput(output)
+        output.writeHeader()
+        output.writeObject(self)
+        output.flush()
 
     def write(self, output):
-        Writer.serializeInstanceOrUseIt(self, output)
-        
+        if not isinstance(output, OutputBuffer):
+            # a plain file object
+            buffered = OutputBuffer(output)
+            self.write(buffered)
+            buffered.flush()
+            return
+        if output.subtree_writer is not None and self in output.subtree_writer.results:
+            output.subtree_writer.writeResult(self, output)
+        else:
+            Writer.serializeInstanceOrUseIt(self, output)
+        output.checkpoint()
+
+    # expand the leading indentation markers of a line, "$" is the
+    # indentation of the current element and each "#" one more level
     def encode(self, string):
-        text = string.replace("\t", "").replace("#", (" " * INDENT)).replace("$", (" " * (INDENT*self.indent_level) ))
-        return text.encode('utf-8')
+        if "\t" in string:
+            string = string.replace("\t", "")
+        text = string.lstrip("$#")
+        if len(text) == len(string):
+            return string
+        marker = string[:len(string) - len(text)]
+        key = (INDENT, self.indent_level, marker)
+        prefix = INDENT_PREFIXES.get(key)
+        if prefix is None:
+            level = marker.count("#")
+            if "$" in marker:
+                level += self.indent_level
+            prefix = " " * (INDENT * level)
+            INDENT_PREFIXES[key] = prefix
+        return prefix + text
 
     def writeMatrix(self, output, matrix):
-        if bpy.app.version[0] >= 2 and bpy.app.version[1] >= 62:
-            for i in range(0,4):
-                output.write(self.encode("$##%s %s %s %s\n" % (STRFLT(matrix[0][i]), STRFLT(matrix[1][i]),STRFLT(matrix[2][i]), STRFLT(matrix[3][i])) ) )
-        else:
-            for i in range(0,4):
-                output.write(self.encode("$##%s %s %s %s\n" % (STRFLT(matrix[i][0]), STRFLT(matrix[i][1]),STRFLT(matrix[i][2]), STRFLT(matrix[i][3])) ) )
+        for row in getMatrixRows(matrix):
+            output.write(self.encode("$##%s %s %s %s\n" % (STRFLT(row[0]), STRFLT(row[1]), STRFLT(row[2]), STRFLT(row[3]))))
         output.write(self.encode("$#}\n"))
 
 
@@ -109,8 +393,17 @@ class Writer(object):
         ArrayData.instance = 0
         Object.instance = 0
 
+    @staticmethod
+    def metObject(obj):
+        if id(obj) not in Writer.met_objects and \
+                getattr(obj, "uniqueID", None) is not None and \
+                hasattr(obj, 'serializeReference'):
+            Writer.met_objects[id(obj)] = (obj, obj in Writer.wrote_elements)
+
     @staticmethod
     def serializeInstanceOrUseIt(obj, output):
+        if Writer.met_objects is not None:
+            Writer.metObject(obj)
         if obj in Writer.wrote_elements and \
                 hasattr(obj,"uniqueID") and \
                 obj.uniqueID != None and \
@@ -118,7 +411,12 @@ class Writer(object):
             return obj.serializeReference(output)
 
         Writer.wrote_elements[obj] = True
-        return obj.serialize(output)
+        if getattr(output, "stats", None) is None:
+            return obj.serialize(output)
+        output.beginObject()
+        result = obj.serialize(output)
+        output.endObject(obj)
+        return result
 
 class Object(Writer):
     instance = 0
@@ -176,6 +474,22 @@ class Object(Writer):
             self.userdata.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+
+    def serializeBinaryContent(self, output):
+        if self.name != "None":
+            output.writeString(self.name)
+        else:
+            output.writeString("")
+        output.writeInt(DATA_VARIANCES[self.dataVariance])
+        output.writeOptionalObject(self.userdata)
+
+    # fields of osg::NodeCallback, the callback objects don't have their
+    # own hierarchy here
+    def serializeBinaryCallbackContent(self, output):
+        output.writeOptionalObject(output.nested_callbacks.get(self))
+
 
 class StringValueObject(Object):
     def __init__(self, *args, **kwargs):
@@ -196,6 +510,12 @@ class StringValueObject(Object):
 
         output.write(self.encode("$}\n"))
 
+    def serializeBinary(self, output):
+        output.writeString(self.key)
+        output.writeInt(DATA_VARIANCES[self.dataVariance])
+        output.writeOptionalObject(self.userdata)
+        output.writeString(self.value)
+
 class DefaultUserDataContainer(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -220,6 +540,15 @@ class DefaultUserDataContainer(Object):
             s.indent_level = self.indent_level + 2
             s.write(output)
         output.write(self.encode("$#}\n"))
+
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeBool(False) # UDC_UserData
+        output.writeBool(False) # UDC_Descriptions
+        output.writeObjectList(self.value)
         
 
 class UpdateMatrixTransform(Object):
@@ -247,6 +576,14 @@ class UpdateMatrixTransform(Object):
             s.write(output)
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Object.serializeBinaryCallbackContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeObjectList(self.stacked_transforms)
+
 class UpdateMaterial(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -288,6 +625,13 @@ class StackedMatrixElement(Object):
         output.write(self.encode("$#Matrix {\n"))
         self.writeMatrix(output, self.matrix)
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeMatrix(self.matrix)
+
 
 class StackedTranslateElement(Object):
     def __init__(self, *args, **kwargs):
@@ -311,6 +655,13 @@ class StackedTranslateElement(Object):
     def serializeContent(self, output):
         output.write(self.encode("$#Translate %s %s %s\n" % (STRFLT(self.translate[0]), STRFLT(self.translate[1]),STRFLT(self.translate[2])) ) )
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeFloats((self.translate[0], self.translate[1], self.translate[2]))
+
 
 class StackedScaleElement(Object):
     def __init__(self, *args, **kwargs):
@@ -334,6 +685,13 @@ class StackedScaleElement(Object):
     def serializeContent(self, output):
         output.write(self.encode("$#Scale %s %s %s\n" % (STRFLT(self.scale[0]), STRFLT(self.scale[1]),STRFLT(self.scale[2]))))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeFloats((self.scale[0], self.scale[1], self.scale[2]))
+
 class StackedRotateAxisElement(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -357,6 +715,14 @@ class StackedRotateAxisElement(Object):
         output.write(self.encode("$#Axis %s %s %s\n" % (STRFLT(self.axis[0]), STRFLT(self.axis[1]),STRFLT(self.axis[2]))))
         output.write(self.encode("$#Angle %s\n" % (STRFLT(self.angle))))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeFloats((self.axis[0], self.axis[1], self.axis[2]))
+        output.writeDouble(self.angle)
+
 class StackedQuaternionElement(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -381,6 +747,13 @@ class StackedQuaternionElement(Object):
     def serializeContent(self, output):
         output.write(self.encode("$#Quaternion %s %s %s %s\n" % (STRFLT(self.quaternion.x), STRFLT(self.quaternion.y),STRFLT(self.quaternion.z),STRFLT(self.quaternion.w) ) ))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeDoubles((self.quaternion.x, self.quaternion.y, self.quaternion.z, self.quaternion.w))
+
 class UpdateBone(UpdateMatrixTransform):
     def __init__(self, *args, **kwargs):
         UpdateMatrixTransform.__init__(self, *args, **kwargs)
@@ -397,6 +770,11 @@ class UpdateBone(UpdateMatrixTransform):
         UpdateMatrixTransform.serializeContent(self, output)
         output.write(self.encode("$}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Object.serializeBinaryCallbackContent(self, output)
+        UpdateMatrixTransform.serializeBinaryContent(self, output)
+
 class UpdateSkeleton(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -413,6 +791,10 @@ class UpdateSkeleton(Object):
         Object.serializeContent(self, output)
         output.write(self.encode("$}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Object.serializeBinaryCallbackContent(self, output)
+
 class Node(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -444,6 +826,20 @@ class Node(Object):
             self.stateset.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeBool(False) # InitialBound
+        output.writeOptionalObject(None) # ComputeBoundingSphereCallback
+        output.writeCallbacks(self.update_callbacks)
+        output.writeOptionalObject(None) # EventCallback
+        output.writeOptionalObject(None) # CullCallback
+        output.writeBool(self.cullingActive == "TRUE")
+        output.writeUInt(0xffffffff) # NodeMask
+        output.writeOptionalObject(self.stateset)
+
 class Geode(Node):
     def __init__(self, *args, **kwargs):
         Node.__init__(self, *args, **kwargs)
@@ -471,6 +867,14 @@ class Geode(Node):
                 i.write(output)
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeObjectList([i for i in self.drawables if i is not None])
+
 class Group(Node):
     def __init__(self, *args, **kwargs):
         Node.__init__(self, *args, **kwargs)
@@ -494,6 +898,14 @@ class Group(Node):
                 i.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeObjectList(self.children)
+
 class MatrixTransform(Group):
     def __init__(self, *args, **kwargs):
         Group.__init__(self, *args, **kwargs)
@@ -515,6 +927,16 @@ class MatrixTransform(Group):
         output.write(self.encode("$#Matrix {\n"))
         self.writeMatrix(output, self.matrix)
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        Group.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeInt(0) # osg::Transform ReferenceFrame RELATIVE_RF
+        output.writeMatrix(self.matrix)
+
 class StateAttribute(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -533,6 +955,14 @@ class StateAttribute(Object):
                 i.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinaryContent(self, output):
+        Object.serializeBinaryContent(self, output)
+        if len(self.update_callbacks) > 0:
+            output.writeOptionalObject(self.update_callbacks[0])
+        else:
+            output.writeOptionalObject(None)
+        output.writeOptionalObject(None) # EventCallback
+
 class StateTextureAttribute(StateAttribute):
     def __init__(self, *args, **kwargs):
         StateAttribute.__init__(self, *args, **kwargs)
@@ -584,6 +1014,23 @@ class Light(StateAttribute):
         output.write(self.encode("$#SpotExponent %s\n" % STRFLT(self.spot_exponent)))
         output.write(self.encode("$#SpotCutoff %s\n" % STRFLT(self.spot_cutoff)))
 
+    def serializeBinary(self, output):
+        StateAttribute.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeInt(self.light_num)
+        output.writeFloats(self.ambient[0:4])
+        output.writeFloats(self.diffuse[0:4])
+        output.writeFloats(self.specular[0:4])
+        output.writeFloats(self.position[0:4])
+        output.writeFloats(self.direction[0:3])
+        output.writeFloat(self.constant_attenuation)
+        output.writeFloat(self.linear_attenuation)
+        output.writeFloat(self.quadratic_attenuation)
+        output.writeFloat(self.spot_exponent)
+        output.writeFloat(self.spot_cutoff)
+
 
 class LightSource(Group):
     def __init__(self, *args, **kwargs):
@@ -609,6 +1056,16 @@ class LightSource(Group):
             self.light.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        Group.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeOptionalObject(self.light)
+        output.writeInt(0) # ReferenceFrame RELATIVE_RF
+
 class Texture2D(StateTextureAttribute):
     def __init__(self, *args, **kwargs):
         StateTextureAttribute.__init__(self, *args, **kwargs)
@@ -620,6 +1077,9 @@ class Texture2D(StateTextureAttribute):
         self.min_filter = "LINEAR_MIPMAP_LINEAR"
         self.mag_filter = "LINEAR"
         self.internalFormatMode = "USE_IMAGE_DATA_FORMAT"
+        # created with the texture, its UniqueID does not depend on the
+        # order the textures are written
+        self.image = Image()
 
     def className(self):
         return "Texture2D"
@@ -636,12 +1096,41 @@ class Texture2D(StateTextureAttribute):
         output.write(self.encode("$#WRAP_R %s\n" % self.wrap_r))
         output.write(self.encode("$#MIN_FILTER %s\n" % self.min_filter))
         output.write(self.encode("$#MAG_FILTER %s\n" % self.mag_filter))
-        image = Image(filename=self.file)
+        self.image.filename = self.file
         output.write(self.encode("$#Image TRUE {\n"))
-        image.indent_level = self.indent_level + 1
-        image.write(output)
+        self.image.indent_level = self.indent_level + 1
+        self.image.write(output)
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        StateAttribute.serializeBinaryContent(self, output)
+        # osg::Texture
+        for mode in (self.wrap_s, self.wrap_t, self.wrap_r, self.min_filter, self.mag_filter):
+            output.writeBool(True)
+            output.writeGLenum(mode)
+        output.writeFloat(1.0) # MaxAnisotropy
+        output.writeBool(True) # UseHardwareMipMapGeneration
+        output.writeBool(False) # UnRefImageDataAfterApply
+        output.writeBool(False) # ClientStorageHint
+        output.writeBool(True) # ResizeNonPowerOfTwoHint
+        output.writeDoubles((0.0, 0.0, 0.0, 0.0)) # BorderColor
+        output.writeInt(0) # BorderWidth
+        output.writeInt(0) # InternalFormatMode USE_IMAGE_DATA_FORMAT
+        output.writeBool(False) # InternalFormat
+        output.writeBool(False) # SourceFormat
+        output.writeBool(False) # SourceType
+        output.writeBool(False) # ShadowComparison
+        output.writeInt(0x0203) # ShadowCompareFunc LEQUAL
+        output.writeInt(0x1909) # ShadowTextureMode LUMINANCE
+        output.writeFloat(0.0) # ShadowAmbient
+        # osg::Texture2D
+        output.writeImage(self.file, (self, "Image"))
+        output.writeInt(0) # TextureWidth
+        output.writeInt(0) # TextureHeight
+
 class Image(Object):
     def __init__(self, *args, **kwargs):
         self.filename = kwargs.get("filename");
@@ -685,6 +1174,21 @@ class Material(StateAttribute):
 
         output.write(self.encode("$#Shininess TRUE Front %s Back %s\n" % (STRFLT(self.shininess), STRFLT(self.shininess))))
 
+    def serializeBinary(self, output):
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        StateAttribute.serializeBinaryContent(self, output)
+        output.writeInt(MATERIAL_COLOR_MODES[self.colormode])
+        for color in (self.ambient, self.diffuse, self.specular, self.emission):
+            output.writeBool(True)
+            output.writeBool(True) # front and back
+            output.writeFloats(color[0:4])
+            output.writeFloats(color[0:4])
+        output.writeBool(True)
+        output.writeBool(True) # front and back
+        output.writeFloats((self.shininess, self.shininess))
+
 class LightModel(StateAttribute):
     def __init__(self, *args, **kwargs):
         StateAttribute.__init__(self, *args, **kwargs)
@@ -709,6 +1213,16 @@ class LightModel(StateAttribute):
         output.write(self.encode("$#ColorControl %s\n" % self.color_control))
         output.write(self.encode("$#LocalViewer %s\n" % self.local_viewer))
 
+    def serializeBinary(self, output):
+        StateAttribute.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeFloats(self.ambient[0:4])
+        output.writeInt(GLENUMS[self.color_control])
+        output.writeBool(self.local_viewer == "TRUE")
+        output.writeBool(False) # TwoSided
+
 class StateSet(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -778,6 +1292,298 @@ class StateSet(Object):
                     output.write(self.encode("$##Data 0\n"))
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeBool(len(self.modes) > 0)
+        if len(self.modes) > 0:
+            output.writeUInt(len(self.modes))
+            for mode, value in self.modes.items():
+                output.writeGLenum(mode)
+                output.writeInt(MODE_VALUES[value])
+
+        attributes = [i for i in self.attributes if i is not None]
+        output.writeBool(len(attributes) > 0)
+        if len(attributes) > 0:
+            output.writeUInt(len(attributes))
+            for i in attributes:
+                output.writeObject(i)
+                output.writeInt(MODE_VALUES["OFF"])
+
+        max_texture_used = self.getMaxTextureUnitUsed()
+        output.writeBool(len(self.texture_attributes) > 0)
+        if len(self.texture_attributes) > 0:
+            output.writeUInt(1+max_texture_used)
+            for i in range(0, max_texture_used+1):
+                if i in self.texture_attributes:
+                    output.writeUInt(1)
+                    output.writeGLenum("GL_TEXTURE_2D")
+                    output.writeInt(MODE_VALUES["ON"])
+                else:
+                    output.writeUInt(0)
+
+        output.writeBool(len(self.texture_attributes) > 0)
+        if len(self.texture_attributes) > 0:
+            output.writeUInt(1+max_texture_used)
+            for i in range(0, max_texture_used+1):
+                attributes = [a for a in self.texture_attributes.get(i, []) if a is not None]
+                output.writeUInt(len(attributes))
+                for a in attributes:
+                    output.writeObject(a)
+                    output.writeInt(MODE_VALUES["OFF"])
+
+        output.writeBool(False) # UniformList
+        output.writeInt(0) # RenderingHint DEFAULT_BIN
+        output.writeInt(0) # RenderBinMode INHERIT_RENDERBIN_DETAILS
+        output.writeInt(0) # BinNumber
+        output.writeString("") # BinName
+        output.writeBool(True) # NestRenderBins
+        output.writeOptionalObject(None) # UpdateCallback
+        output.writeOptionalObject(None) # EventCallback
+
+def formatArrayLines(values, dim, precision, prefix = "", block = 1024):
+    # ascii lines of a flat float list, one format operation per block of
+    # lines
+    return formatLines(values, dim, prefix + " ".join(["%%.%df" % precision] * dim), block)
+
+def formatLines(values, dim, line, block = 1024):
+    # line formats dim values, applied to each group of dim values
+    count = len(values) // dim
+    rest = count % block
+    block_format = "\n".join([line] * block)
+    parts = []
+    for start in range(0, (count - rest) * dim, block * dim):
+        parts.append(block_format % tuple(values[start:start + block * dim]))
+    if rest > 0:
+        parts.append("\n".join([line] * rest) % tuple(values[(count - rest) * dim:count * dim]))
+    return "\n".join(parts)
+
+def collectInstances(root, cls):
+    # instances of cls reachable from root, their attributes are not
+    # visited
+    result = []
+    visited = set()
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if id(item) in visited:
+            continue
+        visited.add(id(item))
+        if isinstance(item, cls):
+            result.append(item)
+        elif isinstance(item, Writer):
+            stack.extend(item.__dict__.values())
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(v for v in item if isinstance(v, (Writer, dict, list, tuple)))
+    return result
+
+def internArrays(root):
+    # vertex attributes with the same content share one ArrayData, the
+    # others are dropped and only the first one is written
+    interned = {}
+    count = 0
+    for attribute in collectInstances(root, VertexAttributeData):
+        data = attribute.array
+        if data is None:
+            continue
+        key = (data.type, data.getContentHash())
+        if key not in interned:
+            interned[key] = data
+        elif interned[key] is not data:
+            attribute.array = interned[key]
+            count += 1
+    return count
+
+def collectWriters(root, objects):
+    # adds the Writer objects reachable from root and not yet in objects
+    # to objects, keyed by id(). returns the ids of the added ones
+    added = set()
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Writer):
+            if id(item) in objects:
+                continue
+            objects[id(item)] = item
+            added.add(id(item))
+            stack.extend(item.__dict__.values())
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(v for v in item if isinstance(v, (Writer, dict, list, tuple)))
+    return added
+
+def writeSubtree(index):
+    # run in the worker processes of SubtreeWriter
+    return SubtreeWriter.current.writeChild(index)
+
+class SubtreeWriter(object):
+    # writes the children of the root in worker processes forked once the
+    # scene is complete. a shared object is written in full the first time
+    # the serial writer meets it and referenced afterwards, so a worker
+    # assumes the objects reachable from the previous children are written
+    # and reports the shared objects it met. they are checked in order and
+    # a child written with a wrong assumption is written again here, the
+    # output stays the one of the serial writer
+    current = None
+
+    def __init__(self, root, output):
+        object.__init__(self)
+        self.root = root
+        self.output = output
+        self.pool = None
+        self.results = {}
+        self.objects = { id(root): root }
+        # ids of the objects reachable from the root before its children,
+        # then from each child and not from the previous ones
+        self.reachable = [collectWriters([v for (k, v) in root.__dict__.items() if k != "children"], self.objects)]
+        for child in root.children:
+            self.reachable.append(collectWriters(child, self.objects))
+        # inherited by the workers forked after
+        SubtreeWriter.current = self
+
+    def submit(self, pool):
+        self.pool = pool
+        for (index, child) in enumerate(self.root.children):
+            self.results[child] = (index, pool.submit(writeSubtree, (index,)))
+        self.output.subtree_writer = self
+
+    def writeChild(self, index):
+        # in a worker: (text of the child, "bytes" counters, [(id, already
+        # written)] of the shared objects met)
+        Writer.wrote_elements = { self.root: True }
+        for ids in self.reachable[:index + 1]:
+            for i in ids:
+                Writer.wrote_elements[self.objects[i]] = True
+        Writer.met_objects = {}
+        child = self.root.children[index]
+        child.indent_level = self.root.indent_level + 2
+        text = io.StringIO()
+        output = OutputBuffer(text)
+        stats = None
+        if self.output.stats is not None:
+            stats = osgstats.Stats()
+            output.countBytes(stats)
+        child.write(output)
+        output.flush()
+        met = [(i, written) for (i, (obj, written)) in Writer.met_objects.items() if self.objects.get(i) is obj]
+        return (text.getvalue(), stats.counters if stats is not None else None, met)
+
+    def writeResult(self, child, output):
+        (index, result) = self.results.pop(child)
+        try:
+            (text, counters, met) = self.pool.get(result)
+        except Exception as e:
+            osglog.warning("writing %s in a worker process failed (%s), writing it in order", child.name, e)
+            met = None
+        if met is not None and all((self.objects[i] in Writer.wrote_elements) == written for (i, written) in met):
+            output.writeSerialized(text, counters)
+            for (i, written) in met:
+                Writer.wrote_elements[self.objects[i]] = True
+            return
+        if met is not None:
+            osglog.log("shared objects of %s are written elsewhere, writing it in order", child.name, subsystem="writer")
+        output.subtree_writer = None
+        try:
+            Writer.serializeInstanceOrUseIt(child, output)
+        finally:
+            output.subtree_writer = self
+
+class StridedArray(object):
+    # elements of dim values kept in one flat typed array, indexing and
+    # iteration give the elements as lists
+    def __init__(self, dim, values = (), typecode = "f"):
+        object.__init__(self)
+        self.dim = dim
+        if isinstance(values, array.array) and values.typecode == typecode:
+            self.data = values
+        else:
+            self.data = array.array(typecode, values)
+
+    @staticmethod
+    def fromElements(elements, dim, typecode = "f"):
+        return StridedArray(dim, [v for item in elements for v in item], typecode)
+
+    def __len__(self):
+        return len(self.data) // self.dim
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("StridedArray index out of range")
+        return self.data[index * self.dim:(index + 1) * self.dim].tolist()
+
+    def __iter__(self):
+        values = self.data.tolist()
+        dim = self.dim
+        for start in range(0, len(values), dim):
+            yield values[start:start + dim]
+
+    def append(self, element):
+        if len(element) != self.dim:
+            raise ValueError("element of size %d in a StridedArray of size %d" % (len(element), self.dim))
+        self.data.extend(element)
+
+    def extend(self, elements):
+        for element in elements:
+            self.append(element)
+
+    def component(self, index):
+        # values of one component of every element
+        return self.data[index::self.dim]
+
+    def take(self, indexes):
+        # new array with the elements at indexes
+        dim = self.dim
+        data = self.data
+        result = array.array(data.typecode)
+        for i in indexes:
+            result.extend(data[i * dim:i * dim + dim])
+        return StridedArray(dim, result, data.typecode)
+
+class ArraySpill(object):
+    # temporary file holding spilled ArrayData elements, typed arrays keep
+    # their type and lists are stored as doubles so they are read back
+    # exactly
+    def __init__(self):
+        object.__init__(self)
+        self.file = tempfile.TemporaryFile()
+
+    def store(self, elements, dim):
+        # returns the key to load the elements back
+        self.file.seek(0, 2)
+        offset = self.file.tell()
+        if isinstance(elements, StridedArray):
+            elements.data.tofile(self.file)
+            return (offset, elements.data.typecode)
+        array.array("d", [float(v) for item in elements for v in item]).tofile(self.file)
+        return (offset, None)
+
+    def load(self, key, count, dim):
+        (offset, typecode) = key
+        values = array.array(typecode or "d")
+        if hasattr(os, "pread"):
+            # no file position shared with the SubtreeWriter workers
+            self.file.flush()
+            values.frombytes(os.pread(self.file.fileno(), count * dim * values.itemsize, offset))
+        else:
+            self.file.seek(offset)
+            values.fromfile(self.file, count * dim)
+        if typecode is not None:
+            return StridedArray(dim, values, typecode)
+        values = values.tolist()
+        return [values[i:i + dim] for i in range(0, len(values), dim)]
+
+    def close(self):
+        self.file.close()
+
 class ArrayData(Object):
     instance = 0
 
@@ -785,24 +1591,77 @@ class ArrayData(Object):
         Object.__init__(self)
         self.array = kwargs.get('array')
         self.type = kwargs.get('type')
+        if isinstance(self.array, list) and self.type in ARRAY_TYPES:
+            self.array = StridedArray.fromElements(self.array, ARRAY_TYPES[self.type][1])
         self.uniqueID = ArrayData.instance
+        # (spill, offset, count, dim) when the elements were moved to disk
+        self.spilled = None
         ArrayData.instance += 1
 
+    def spill(self, spill):
+        # move the elements to spill, they are read back when written
+        if self.spilled is not None or self.array is None or len(self.array) == 0:
+            return
+        dim = len(self.array[0])
+        self.spilled = (spill, spill.store(self.array, dim), len(self.array), dim)
+        self.array = None
+
+    def getElements(self):
+        if self.spilled is not None:
+            (spill, offset, count, dim) = self.spilled
+            return spill.load(offset, count, dim)
+        return self.array
+
+    def getSize(self):
+        if self.spilled is not None:
+            return self.spilled[2]
+        return len(self.array)
+
+    def getContentHash(self):
+        elements = self.getElements()
+        if isinstance(elements, StridedArray):
+            values = elements.data
+            digest = hashlib.sha1(values.typecode.encode("ascii"))
+            digest.update(str(elements.dim).encode("ascii"))
+        else:
+            values = array.array("d", [float(v) for item in elements for v in item])
+            digest = hashlib.sha1(b"d")
+            digest.update(str(len(elements[0]) if len(elements) > 0 else 0).encode("ascii"))
+        digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def reorder(self, order):
+        # element i becomes the element order[i]
+        if isinstance(self.array, StridedArray):
+            self.array = self.array.take(order)
+        else:
+            self.array = [self.array[v] for v in order]
+
     def serializeReference(self, output):
         output.write(self.encode("$Array TRUE ArrayID %d\n" % self.uniqueID))
 
     def serialize(self, output):
-        output.write(self.encode("$Array TRUE ArrayID %s %s %d {\n" % (self.uniqueID, self.type, len(self.array))))
-        dim = len(self.array[0])
-        for i in self.array:
-            if dim == 3:
-                output.write(self.encode("$#%s %s %s\n" % (STRFLT(i[0]), STRFLT(i[1]), STRFLT(i[2]) ) ) )
-            elif dim == 2:
-                output.write(self.encode("$#%s %s\n" % (STRFLT(i[0]), STRFLT(i[1])) ) )
-            elif dim == 4:
-                output.write(self.encode("$#%s %s %s %s\n" % (STRFLT(i[0]), STRFLT(i[1]), STRFLT(i[2]), STRFLT(i[3]) ) ) )
+        output.write(self.encode("$Array TRUE ArrayID %s %s %d {\n" % (self.uniqueID, self.type, self.getSize())))
+        elements = self.getElements()
+        if len(elements) > 0 and len(elements[0]) in (2, 3, 4):
+            dim = len(elements[0])
+            if isinstance(elements, StridedArray):
+                values = elements.data
+            else:
+                values = [i[a] for i in elements for a in range(0, dim)]
+            output.write(formatArrayLines(values, dim, FLOATPRE, self.encode("$#")) + "\n")
         output.write(self.encode("$}\n") )
 
+    def serializeBinary(self, output):
+        type_id, dim = ARRAY_TYPES[self.type]
+        elements = self.getElements()
+        output.writeInt(type_id)
+        output.writeInt(len(elements))
+        if isinstance(elements, StridedArray) and elements.dim == dim:
+            output.writeFloats(elements.data)
+        else:
+            output.writeFloats([v[i] for v in elements for i in range(0, dim)])
+
 class VertexAttributeData(Writer):
     def __init__(self, *args, **kwargs):
         Writer.__init__(self)
@@ -811,7 +1670,7 @@ class VertexAttributeData(Writer):
            self.array = ArrayData(array = kwargs.get('array', None), type = kwargs.get('type', None))
 
     def getArray(self):
-        return self.array.array
+        return self.array.getElements()
 
     def serialize(self, output):
         output.write(self.encode("$%s {\n" % (self.className())))
@@ -825,6 +1684,14 @@ class VertexAttributeData(Writer):
         output.write(self.encode("$#Normalize 0\n"))
         output.write(self.encode("$}\n"))
 
+    def serializeBinary(self, output):
+        output.writeBool(self.array is not None)
+        if self.array is not None:
+            output.writeArray(self.array)
+        output.writeBool(False) # Indices
+        output.writeInt(4) # Binding BIND_PER_VERTEX
+        output.writeInt(0) # Normalize
+
 class VertexArray(VertexAttributeData):
     def __init__(self, *args, **kwargs):
         kwargs["array"] = kwargs.get("array", [])
@@ -863,21 +1730,28 @@ class TexCoordArray(VertexAttributeData):
 class DrawElements(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
-        self.indexes = []
+        self.indexes = array.array("I")
         self.type = None
+        # number of vertexes of the geometry, it bounds the indexes. None
+        # when unknown, the indexes are scanned to find the element type
+        self.vertex_count = None
+
+    def setIndexes(self, indexes):
+        self.indexes = array.array("I", indexes)
+
+    def addIndexes(self, indexes):
+        self.indexes.extend(indexes)
 
     def getSizeArray(self):
-        # dont waste time here
-        # return max drawElements
-        # return "DrawElementsUInt"
-        element = "DrawElementsUByte"
-        for i in self.indexes:
-            if i > 255 and element == "DrawElementsUByte":
-                element = "DrawElementsUShort"
-            elif i > 65535 and element == "DrawElementsUShort":
-                element = "DrawElementsUInt"
-                break
-        return element
+        if self.vertex_count is not None:
+            max_index = self.vertex_count - 1
+        else:
+            max_index = max(self.indexes) if len(self.indexes) > 0 else 0
+        if max_index > 65535:
+            return "DrawElementsUInt"
+        if max_index > 255:
+            return "DrawElementsUShort"
+        return "DrawElementsUByte"
 
     def className(self):
         return "DrawElements"
@@ -891,14 +1765,17 @@ class DrawElements(Object):
         if self.type == "GL_QUADS":
             n = 4
 
-        total = int(len(self.indexes) / n)
-        for i in range(0, total):
-            output.write(self.encode("$##"))
-            for a in range(0,n):
-                output.write(self.encode("%s " % self.indexes[i*n+a]))
-            output.write(self.encode("\n") )
+        if len(self.indexes) >= n:
+            output.write(formatLines(self.indexes, n, self.encode("$##") + "%d " * n) + "\n")
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        type_id, index_format = DRAW_ELEMENTS_TYPES[self.getSizeArray()]
+        output.writeInt(type_id)
+        output.writeGLenum(self.type)
+        output.writeUInt(len(self.indexes))
+        output.writeTyped(array.array(index_format, self.indexes), index_format)
+
     
 class Geometry(Object):
     def __init__(self, *args, **kwargs):
@@ -910,6 +1787,7 @@ class Geometry(Object):
         self.colors = None
         self.uvs = {}
         self.stateset = None
+        self.use_vertex_buffer_objects = False
 
     def className(self):
         return "Geometry"
@@ -965,6 +1843,57 @@ class Geometry(Object):
                     emptyTexCoord.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        # osg::Drawable
+        output.writeOptionalObject(self.stateset)
+        output.writeBool(False) # InitialBound
+        output.writeOptionalObject(None) # ComputeBoundingBoxCallback
+        output.writeOptionalObject(None) # Shape
+        output.writeBool(not self.use_vertex_buffer_objects) # SupportsDisplayList
+        output.writeBool(not self.use_vertex_buffer_objects) # UseDisplayList
+        output.writeBool(self.use_vertex_buffer_objects)
+        output.writeOptionalObject(None) # UpdateCallback
+        output.writeOptionalObject(None) # EventCallback
+        output.writeOptionalObject(None) # CullCallback
+        output.writeOptionalObject(None) # DrawCallback
+
+        # osg::Geometry
+        output.writeBool(len(self.primitives) > 0)
+        if len(self.primitives) > 0:
+            output.writeUInt(len(self.primitives))
+            for i in self.primitives:
+                i.serializeBinary(output)
+
+        for data in (self.vertexes, self.normals, self.colors):
+            output.writeBool(data is not None)
+            if data is not None:
+                data.serializeBinary(output)
+        output.writeBool(False) # SecondaryColorData
+        output.writeBool(False) # FogCoordData
+
+        # texture coordinates are stored by unit, missing units are empty
+        units = {}
+        for i in self.uvs.values():
+            if i:
+                units[i.index] = i
+        output.writeBool(len(units) > 0)
+        if len(units) > 0:
+            output.writeUInt(max(units.keys()) + 1)
+            for i in range(0, max(units.keys()) + 1):
+                if i in units:
+                    units[i].serializeBinary(output)
+                else:
+                    output.writeBool(False) # Array
+                    output.writeBool(False) # Indices
+                    output.writeInt(0) # Binding BIND_OFF
+                    output.writeInt(0) # Normalize
+        output.writeBool(False) # VertexAttribData
+        output.writeBool(False) # FastPathHint
+
 ################################## animation node ######################################
 class Bone(MatrixTransform):
     def __init__(self, skeleton = None, bone = None, parent=None, **kwargs):
@@ -1059,6 +1988,19 @@ class Bone(MatrixTransform):
         output.write(self.encode("$#InvBindMatrixInSkeletonSpace {\n"))
         self.writeMatrix(output, matrix)
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        Group.serializeBinaryContent(self, output)
+        MatrixTransform.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeMatrix(self.bone_inv_bind_matrix_skeleton.copy())
+        identity = Matrix().to_4x4()
+        identity.identity()
+        output.writeMatrix(identity) # MatrixInSkeletonSpace
+
 class Skeleton(MatrixTransform):
     def __init__(self, name="", matrix=None):
         MatrixTransform.__init__(self)
@@ -1090,12 +2032,19 @@ class Skeleton(MatrixTransform):
         MatrixTransform.serializeContent(self, output)
         output.write(self.encode("$}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Node.serializeBinaryContent(self, output)
+        Group.serializeBinaryContent(self, output)
+        MatrixTransform.serializeBinaryContent(self, output)
+
 class RigGeometry(Geometry):
     def __init__(self, *args, **kwargs):
         Geometry.__init__(self, *args, **kwargs)
         self.groups = {}
         self.dataVariance = "DYNAMIC"
         self.sourcegeometry = None
+        self.use_vertex_buffer_objects = True
 
     def className(self):
         return "RigGeometry"
@@ -1124,6 +2073,19 @@ class RigGeometry(Geometry):
             self.sourcegeometry.write(output)
             output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Geometry.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeBool(len(self.groups) > 0)
+        if len(self.groups) > 0:
+            output.writeUInt(len(self.groups))
+            for name, grp in self.groups.items():
+                grp.serializeBinary(output)
+        output.writeOptionalObject(self.sourcegeometry)
+
 class AnimationManagerBase(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -1149,6 +2111,15 @@ class AnimationManagerBase(Object):
             i.write(output)
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        Object.serializeBinaryCallbackContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeObjectList(self.animations)
+        output.writeBool(True) # AutomaticLink
+
 
 class BasicAnimationManager(AnimationManagerBase):
     def __init__(self, *args, **kwargs):
@@ -1173,7 +2144,6 @@ class VertexGroup(Object):
         return "VertexGroup"
 
     def serialize(self, output):
-        self.setName(self.targetGroupName)
         output.write(self.encode("$VertexInfluence \"%s\" %d {\n" % (self.targetGroupName, len(self.vertexes)) ) )
         self.serializeContent(output)
         output.write(self.encode("$}\n"))
@@ -1182,6 +2152,18 @@ class VertexGroup(Object):
         for i in self.vertexes:
             output.write(self.encode("$#%s %s\n" % (i[0],STRFLT(i[1])) ) )
 
+    def serializeBinary(self, output):
+        output.writeString(self.targetGroupName)
+        output.writeUInt(len(self.vertexes))
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        values = []
+        for i in self.vertexes:
+            values.append(i[0])
+            values.append(i[1])
+        output.write(struct.pack("<" + "if" * len(self.vertexes), *values))
+
 class Animation(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -1207,6 +2189,87 @@ class Animation(Object):
             i.write(output)
         output.write(self.encode("$#}\n"))
 
+    def serializeBinary(self, output):
+        Object.serializeBinaryContent(self, output)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeDouble(0.0) # Duration, computed from the channels
+        output.writeFloat(0.0) # Weight
+        output.writeDouble(0.0) # StartTime
+        output.writeInt(2) # PlayMode LOOP
+        output.writeBool(len(self.channels) > 0)
+        if len(self.channels) > 0:
+            output.writeUInt(len(self.channels))
+            for i in self.channels:
+                i.serializeBinary(output)
+
+def getKeyRatio(first, last, key):
+    # position of key between first and last, keys sharing the time of
+    # first are at first
+    duration = last[0] - first[0]
+    if duration <= 0.0:
+        return 0.0
+    return (key[0] - first[0]) / duration
+
+def linearKeyError(first, last, key):
+    # distance of key to the linear interpolation of first and last
+    t = getKeyRatio(first, last, key)
+    return max(abs(v - (a + (b - a) * t)) for (a, b, v) in zip(first[1:], last[1:], key[1:]))
+
+def slerpKeys(q0, q1, t):
+    cosomega = sum(a * b for (a, b) in zip(q0, q1))
+    if cosomega < 0.0:
+        cosomega = -cosomega
+        q1 = [-b for b in q1]
+    if cosomega > 0.9999:
+        scale0 = 1.0 - t
+        scale1 = t
+    else:
+        omega = math.acos(cosomega)
+        sinomega = math.sin(omega)
+        scale0 = math.sin((1.0 - t) * omega) / sinomega
+        scale1 = math.sin(t * omega) / sinomega
+    return [a * scale0 + b * scale1 for (a, b) in zip(q0, q1)]
+
+def sphericalKeyError(first, last, key):
+    # angle between key and the spherical interpolation of first and last
+    t = getKeyRatio(first, last, key)
+    q = slerpKeys(first[1:], last[1:], t)
+    length = math.sqrt(sum(a * a for a in q))
+    cosangle = abs(sum(a * b for (a, b) in zip(q, key[1:]))) / length
+    return 2.0 * math.acos(min(1.0, cosangle))
+
+def reduceKeys(keys, error, tolerance):
+    # Douglas-Peucker on the key times, the first and last keys are kept
+    # and a key is kept when dropping it would exceed the tolerance. of
+    # keys sharing the same time only the last one is kept, osg needs at
+    # least two keys
+    merged = [key for (key, following) in zip(keys, keys[1:]) if key[0] != following[0]] + keys[-1:]
+    if len(merged) < 2:
+        return keys
+    keys = merged
+    if len(keys) < 3:
+        return keys
+    keep = [False] * len(keys)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(keys) - 1)]
+    while stack:
+        (first, last) = stack.pop()
+        worst = -1
+        worst_error = tolerance
+        for i in range(first + 1, last):
+            e = error(keys[first], keys[last], keys[i])
+            if e > worst_error:
+                worst = i
+                worst_error = e
+        if worst >= 0:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [key for (key, kept) in zip(keys, keep) if kept]
+
+
 class Channel(Object):
     def __init__(self, *args, **kwargs):
         Object.__init__(self, *args, **kwargs)
@@ -1214,6 +2277,15 @@ class Channel(Object):
         self.target = "none"
         self.type = "Unknown"
 
+    def reduceKeys(self, tolerance, angle_tolerance):
+        # only the quaternion channels are interpolated on the sphere, the
+        # axis angle ones are 4 values interpolated like the others
+        if self.name == "quaternion":
+            if angle_tolerance > 0.0:
+                self.keys = reduceKeys(self.keys, sphericalKeyError, angle_tolerance)
+        elif tolerance > 0.0:
+            self.keys = reduceKeys(self.keys, linearKeyError, tolerance)
+
     def generateID(self):
         return None
     
@@ -1235,3 +2307,17 @@ class Channel(Object):
                 output.write(self.encode(" %s" % (STRFLT(i[a]))))
             output.write(self.encode("\n"))
         output.write(self.encode("$#}\n"))
+
+    def serializeBinary(self, output):
+        output.writeString(self.type)
+        self.serializeBinaryContent(output)
+
+    def serializeBinaryContent(self, output):
+        output.writeString(self.name)
+        output.writeString(self.target)
+        output.writeBool(True) # KeyFrameContainer
+        output.writeUInt(len(self.keys))
+        values = []
+        for i in self.keys:
+            values.extend(i)
+        output.write(struct.pack("<" + CHANNEL_KEY_FORMATS[self.type] * len(self.keys), *values))
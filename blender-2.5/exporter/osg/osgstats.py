@@ -0,0 +1,64 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+# timings and counters of an export, written as a json report next to
+# the exported file
+
+import contextlib
+import json
+import time
+
+
+class Stats(object):
+    def __init__(self):
+        object.__init__(self)
+        self.timings = {}   # name -> [calls, seconds]
+        self.counters = {}  # name -> value
+
+    def addTime(self, name, seconds, calls = 1):
+        timing = self.timings.setdefault(name, [0, 0.0])
+        timing[0] += calls
+        timing[1] += seconds
+
+    def add(self, name, value = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        # with stats.timer("name"): adds the wall time of the block
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.addTime(name, time.time() - start)
+
+    def getReport(self):
+        timings = {}
+        for name, (calls, seconds) in self.timings.items():
+            timings[name] = { "calls": calls, "seconds": seconds }
+        return { "timings": timings, "counters": dict(self.counters) }
+
+    def writeReport(self, filename):
+        with open(filename, "w") as sfile:
+            json.dump(self.getReport(), sfile, indent=2, sort_keys=True)
+            sfile.write("\n")
@@ -0,0 +1,152 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+# benchmark of the exporter hot paths without blender, the scenes are
+# generated by scenes.py and bpy/mathutils are replaced by the modules in
+# stubs/. run it with python 3:
+#
+#   python3 benchmark.py [--size 200] [--repeat 3] [--json result.json] [name ...]
+#
+# each benchmark reports its best time of the repeats and the throughput,
+# compare the numbers of two revisions on the same machine
+
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "exporter"))
+
+import scenes
+
+
+def loadExporter():
+    import osg
+    from osg import osglog, osgbake, osgconf, osgdata, osgobject
+    osglog.setLevel(osglog.ERROR)
+    return osg
+
+
+def convertMesh(osg, obj, mesh):
+    config = osg.osgconf.Config()
+    converter = osg.osgdata.BlenderObjectToGeometry(object = obj, mesh = mesh,
+                                                    config = config,
+                                                    unique_objects = osg.osgdata.UniqueObject())
+    return converter.convert()
+
+
+def benchGeometry(osg, options):
+    (obj, mesh) = scenes.createGridMesh(options.size)
+    corners = sum(len(face.vertices) for face in mesh.tessfaces)
+    start = timeit.default_timer()
+    convertMesh(osg, obj, mesh)
+    return (timeit.default_timer() - start, corners, "verts")
+
+
+def benchSerialize(osg, options, binary):
+    (obj, mesh) = scenes.createGridMesh(options.size)
+    geode = osg.osgobject.Geode()
+    for geometry in convertMesh(osg, obj, mesh):
+        rig = osg.osgobject.RigGeometry()
+        rig.sourcegeometry = geometry
+        rig.groups = geometry.groups
+        geode.drawables.append(rig)
+    osg.osgobject.Writer.resetWriter()
+    osg.osgobject.Writer.wrote_elements = {}
+    output = io.BytesIO()
+    start = timeit.default_timer()
+    if binary:
+        geode.writeBinaryFile(output)
+    else:
+        geode.writeFile(output)
+    return (timeit.default_timer() - start, len(output.getvalue()) / (1024.0 * 1024.0), "MB")
+
+
+def benchChannels(osg, options):
+    action = scenes.createAction(options.bones, options.frames)
+    index = osg.osgdata.getFCurveIndex(action)
+    keys = 0
+    start = timeit.default_timer()
+    for bone in range(0, options.bones):
+        name = "Bone%d" % bone
+        channels = osg.osgdata.exportActionsToKeyframeSplitRotationTranslationScale(name, action, 25.0, "pose.bones[\"%s\"]." % name, index)
+        keys += sum(len(channel.keys) for channel in channels)
+    return (timeit.default_timer() - start, keys, "keys")
+
+
+def benchBake(osg, options):
+    scene = scenes.Scene()
+    armatures = scenes.createArmatures(scene, options.armatures, options.bones)
+    start = timeit.default_timer()
+    actions = osg.osgbake.bakeBatch(scene, armatures, 1, options.frames, 1,
+                                    False, True, True, False, False, True)
+    keys = 0
+    for baked in actions.values():
+        for prefix in baked.transforms:
+            channels = osg.osgdata.exportBakedTransformsToChannels("target", baked, 25.0, prefix)
+            keys += sum(len(channel.keys) for channel in channels)
+    return (timeit.default_timer() - start, keys, "keys")
+
+
+BENCHMARKS = [("geometry", benchGeometry),
+              ("serialize_ascii", lambda osg, options: benchSerialize(osg, options, False)),
+              ("serialize_binary", lambda osg, options: benchSerialize(osg, options, True)),
+              ("channels", benchChannels),
+              ("bake", benchBake)]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="benchmark the osg exporter without blender")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all by default: %s" % ", ".join(name for name, bench in BENCHMARKS))
+    parser.add_argument("--size", type=int, default=200, help="vertexes per side of the grid mesh")
+    parser.add_argument("--bones", type=int, default=32, help="bones per armature")
+    parser.add_argument("--armatures", type=int, default=4, help="armatures baked together")
+    parser.add_argument("--frames", type=int, default=250, help="frames of the animations")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark, the best one is kept")
+    parser.add_argument("--json", help="write the results in this file")
+    options = parser.parse_args(argv)
+
+    osg = loadExporter()
+    results = {}
+    for (name, bench) in BENCHMARKS:
+        if options.names and name not in options.names:
+            continue
+        runs = [bench(osg, options) for i in range(0, max(1, options.repeat))]
+        (seconds, amount, unit) = min(runs)
+        rate = amount / seconds if seconds > 0 else 0.0
+        results[name] = { "seconds": seconds, "amount": amount, "unit": unit, "rate": rate }
+        print("%-18s %12.2f %-5s %8.3f s %14.2f %s/s" % (name, amount, unit, seconds, rate, unit))
+
+    if options.json:
+        with open(options.json, "w") as sfile:
+            json.dump(results, sfile, indent=2, sort_keys=True)
+            sfile.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
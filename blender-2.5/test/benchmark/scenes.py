@@ -0,0 +1,183 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+# synthetic blender data for the benchmark, plain python objects with the
+# attributes the exporter reads. everything is generated from a seed so
+# two runs export the same data
+
+import math
+import random
+
+import mathutils
+
+
+class Item(object):
+    def __init__(self, **kwargs):
+        object.__init__(self)
+        self.__dict__.update(kwargs)
+
+
+class Collection(list):
+    def foreach_get(self, attribute, values):
+        i = 0
+        for item in self:
+            value = getattr(item, attribute)
+            if isinstance(value, (list, tuple)):
+                values[i:i + len(value)] = value
+                i += len(value)
+            else:
+                values[i] = value
+                i += 1
+
+    def items(self):
+        return [(item.name, item) for item in self]
+
+
+def createGridMesh(size, materials = 2, uv_layers = 1, groups = 4, seed = 1):
+    # size x size vertexes on a bumpy grid, half of the cells are quads and
+    # the others two triangles. returns (object, mesh)
+    rand = random.Random(seed)
+    vertexes = Collection()
+    for x in range(0, size):
+        for y in range(0, size):
+            weights = [Item(group=g, weight=round(rand.random(), 3)) for g in rand.sample(range(0, groups), min(groups, 2))]
+            vertexes.append(Item(index=len(vertexes),
+                                 co=[x * 0.25, y * 0.25, round(rand.random(), 2)],
+                                 normal=[0.0, 0.0, 1.0],
+                                 groups=weights))
+
+    faces = Collection()
+    for x in range(0, size - 1):
+        for y in range(0, size - 1):
+            (a, b, c, d) = (x * size + y, (x + 1) * size + y, (x + 1) * size + y + 1, x * size + y + 1)
+            if rand.random() < 0.5:
+                cells = [[a, b, c, d]]
+            else:
+                cells = [[a, b, c], [a, c, d]]
+            for cell in cells:
+                faces.append(Item(index=len(faces),
+                                  vertices=cell,
+                                  vertices_raw=cell + [0] * (4 - len(cell)),
+                                  material_index=rand.randint(0, materials - 1),
+                                  use_smooth=rand.random() < 0.5,
+                                  normal=[0.0, 0.0, 1.0]))
+
+    layers = Collection()
+    for layer in range(0, uv_layers):
+        data = Collection()
+        for face in faces:
+            uvs = [round(rand.random(), 2) for i in range(0, 8)]
+            data.append(Item(uv1=uvs[0:2], uv2=uvs[2:4], uv3=uvs[4:6], uv4=uvs[6:8], uv_raw=uvs))
+        layers.append(Item(name="UVMap%d" % layer, active=(layer == 0), data=data))
+
+    mesh = Item(name="Grid",
+                vertices=vertexes,
+                tessfaces=faces,
+                tessface_uv_textures=layers,
+                tessface_vertex_colors=[],
+                materials=[None] * materials)
+    mesh.update = lambda **kwargs: None
+    obj = Item(name="Grid",
+               type="MESH",
+               data=mesh,
+               modifiers=[],
+               vertex_groups=[Item(name="Group%d" % g, index=g) for g in range(0, groups)])
+    return (obj, mesh)
+
+
+class Scene(object):
+    # frame_set only records the frame, the bones compute their matrix
+    # from it when they are read
+    def __init__(self):
+        object.__init__(self)
+        self.frame_current = 1
+        self.frame = 1
+
+    def frame_set(self, frame):
+        self.frame = frame
+
+
+class PoseBone(object):
+    def __init__(self, scene, name, phase):
+        object.__init__(self)
+        self.scene = scene
+        self.name = name
+        self.phase = phase
+        self.rotation_mode = "QUATERNION"
+        self.bone = Item(select=True)
+        self.constraints = []
+
+    @property
+    def matrix_basis(self):
+        angle = math.sin(self.scene.frame * 0.1 + self.phase)
+        matrix = mathutils.Matrix.Rotation(angle, 4, "Z")
+        matrix[0][3] = self.phase
+        matrix[1][3] = angle
+        return matrix
+
+
+def createArmatures(scene, count, bones):
+    # count armature objects of bones bones each
+    armatures = []
+    for a in range(0, count):
+        pose = Item(bones=Collection([PoseBone(scene, "Bone%d" % b, a + b * 0.1) for b in range(0, bones)]))
+        armatures.append(Item(name="Armature%d" % a,
+                              type="ARMATURE",
+                              data=Item(pose_position="REST"),
+                              pose=pose,
+                              rotation_mode="QUATERNION",
+                              constraints=[],
+                              matrix_local=mathutils.Matrix.Translation((a, 0.0, 0.0))))
+    return armatures
+
+
+class Curve(object):
+    # fcurve keyed on every frame
+    def __init__(self, data_path, index):
+        object.__init__(self)
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = []
+        self.samples = {}
+
+    def insert(self, frame, value):
+        self.samples[frame] = value
+        self.keyframe_points.append(Item(co=(frame, value)))
+
+    def evaluate(self, frame):
+        return self.samples[frame]
+
+
+def createAction(bones, frames):
+    # action with a location, rotation and scale curve per bone keyed on
+    # every frame
+    action = Item(name="Action", fcurves=[], frame_range=(1, frames))
+    for b in range(0, bones):
+        prefix = "pose.bones[\"Bone%d\"]." % b
+        for (path, size) in (("location", 3), ("rotation_quaternion", 4), ("scale", 3)):
+            for index in range(0, size):
+                curve = Curve(prefix + path, index)
+                for frame in range(1, frames + 1):
+                    curve.insert(frame, math.sin(frame * 0.05 + b + index))
+                action.fcurves.append(curve)
+    return action
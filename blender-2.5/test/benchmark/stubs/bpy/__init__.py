@@ -0,0 +1,60 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+# stand-in for the blender python module, it only provides what the
+# exporter modules need to be imported outside of blender. the benchmark
+# builds its scenes with plain python objects
+
+from . import props
+
+
+class Namespace(object):
+    pass
+
+
+app = Namespace()
+app.version = (2, 63, 0)
+
+types = Namespace()
+
+class Operator(object):
+    pass
+
+class NlaTrack(object):
+    pass
+
+types.Operator = Operator
+types.NlaTrack = NlaTrack
+
+path = Namespace()
+path.abspath = lambda filename: filename
+path.basename = lambda filename: filename.split("/")[-1]
+
+data = Namespace()
+data.objects = {}
+data.actions = {}
+
+context = Namespace()
+
+utils = Namespace()
+utils.register_class = lambda cls: None
+utils.unregister_class = lambda cls: None
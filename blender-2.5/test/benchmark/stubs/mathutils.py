@@ -0,0 +1,157 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+# stand-in for the blender mathutils module, matrices are lists of rows
+# like the mathutils of blender 2.62 and later
+
+import math
+
+
+class Vector(list):
+    def __init__(self, values = (0.0, 0.0, 0.0)):
+        list.__init__(self, [float(v) for v in values])
+
+    x = property(lambda self: self[0])
+    y = property(lambda self: self[1])
+    z = property(lambda self: self[2])
+
+    def copy(self):
+        return Vector(self)
+
+    def __neg__(self):
+        return Vector([-v for v in self])
+
+    @property
+    def length(self):
+        return math.sqrt(sum(v * v for v in self))
+
+
+class Euler(Vector):
+    def copy(self):
+        return Euler(self)
+
+
+class Quaternion(list):
+    def __init__(self, values = (1.0, 0.0, 0.0, 0.0)):
+        list.__init__(self, [float(v) for v in values])
+
+    w = property(lambda self: self[0])
+    x = property(lambda self: self[1])
+    y = property(lambda self: self[2])
+    z = property(lambda self: self[3])
+
+    def copy(self):
+        return Quaternion(self)
+
+    def to_axis_angle(self):
+        angle = 2.0 * math.acos(max(-1.0, min(1.0, self[0])))
+        s = math.sqrt(max(0.0, 1.0 - self[0] * self[0]))
+        if s < 1e-8:
+            return (Vector((1.0, 0.0, 0.0)), angle)
+        return (Vector((self[1] / s, self[2] / s, self[3] / s)), angle)
+
+
+class Matrix(list):
+    def __init__(self, rows = None):
+        if rows is None:
+            rows = [[1.0 if i == j else 0.0 for j in range(0, 4)] for i in range(0, 4)]
+        list.__init__(self, [Vector(row) for row in rows])
+
+    def copy(self):
+        return Matrix(self)
+
+    def to_4x4(self):
+        return Matrix(self)
+
+    def identity(self):
+        for i in range(0, 4):
+            for j in range(0, 4):
+                self[i][j] = 1.0 if i == j else 0.0
+        return self
+
+    def __mul__(self, other):
+        return Matrix([[sum(self[i][k] * other[k][j] for k in range(0, 4)) for j in range(0, 4)] for i in range(0, 4)])
+
+    def inverted(self):
+        # rigid transforms only, enough for the synthetic scenes
+        rotation = [[self[j][i] for j in range(0, 3)] for i in range(0, 3)]
+        translation = [-sum(rotation[i][k] * self[k][3] for k in range(0, 3)) for i in range(0, 3)]
+        return Matrix([rotation[0] + [translation[0]],
+                       rotation[1] + [translation[1]],
+                       rotation[2] + [translation[2]],
+                       [0.0, 0.0, 0.0, 1.0]])
+
+    @staticmethod
+    def Translation(vector):
+        matrix = Matrix()
+        for i in range(0, 3):
+            matrix[i][3] = vector[i]
+        return matrix
+
+    @staticmethod
+    def Rotation(angle, size, axis):
+        # rotation around "X", "Y" or "Z"
+        (c, s) = (math.cos(angle), math.sin(angle))
+        (a, b) = { "X": (1, 2), "Y": (2, 0), "Z": (0, 1) }[axis]
+        matrix = Matrix()
+        matrix[a][a] = c
+        matrix[a][b] = -s
+        matrix[b][a] = s
+        matrix[b][b] = c
+        return matrix
+
+    def to_translation(self):
+        return Vector((self[0][3], self[1][3], self[2][3]))
+
+    def to_scale(self):
+        return Vector([math.sqrt(sum(self[i][j] ** 2 for i in range(0, 3))) for j in range(0, 3)])
+
+    def to_3x3_normalized(self):
+        scale = self.to_scale()
+        return [[self[i][j] / scale[j] for j in range(0, 3)] for i in range(0, 3)]
+
+    def to_quaternion(self):
+        m = self.to_3x3_normalized()
+        trace = m[0][0] + m[1][1] + m[2][2]
+        if trace > 0.0:
+            s = 2.0 * math.sqrt(trace + 1.0)
+            return Quaternion((0.25 * s, (m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s))
+        if m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2])
+            return Quaternion(((m[2][1] - m[1][2]) / s, 0.25 * s, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s))
+        if m[1][1] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2])
+            return Quaternion(((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s, 0.25 * s, (m[1][2] + m[2][1]) / s))
+        s = 2.0 * math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1])
+        return Quaternion(((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, 0.25 * s))
+
+    def to_euler(self, order = "XYZ"):
+        # XYZ order whatever order is asked
+        m = self.to_3x3_normalized()
+        y = math.asin(max(-1.0, min(1.0, -m[2][0])))
+        if abs(m[2][0]) < 0.999999:
+            x = math.atan2(m[2][1], m[2][2])
+            z = math.atan2(m[1][0], m[0][0])
+        else:
+            x = math.atan2(-m[1][2], m[1][1])
+            z = 0.0
+        return Euler((x, y, z))
@@ -0,0 +1,151 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# shared setup of the headless tests: the exporter package is imported
+# from the source tree with the bpy/mathutils stand-ins of the benchmark
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "data")
+sys.path.insert(0, os.path.join(HERE, "..", "benchmark"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmark", "stubs"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "exporter"))
+
+from osg import osglog, osgobject
+
+osglog.setLevel(osglog.ERROR)
+
+
+def createConverter(obj, mesh, config = None, **kwargs):
+    from osg import osgconf, osgdata
+    if config is None:
+        config = osgconf.Config()
+    return osgdata.BlenderObjectToGeometry(object = obj, mesh = mesh,
+                                           config = config,
+                                           unique_objects = osgdata.UniqueObject(),
+                                           **kwargs)
+
+
+def getFaces(geometry):
+    # sorted faces of geometry, each face is the tuple of the position,
+    # normal and uvs of its vertexes, independent of the vertex order
+    sizes = { "GL_LINES": 2, "GL_TRIANGLES": 3, "GL_QUADS": 4 }
+    vertexes = geometry.vertexes.getArray()
+    normals = geometry.normals.getArray()
+    uvs = [geometry.uvs[key].getArray() for key in sorted(geometry.uvs.keys())]
+    faces = []
+    for primitive in geometry.primitives:
+        size = sizes[primitive.type]
+        for start in range(0, len(primitive.indexes), size):
+            face = []
+            for v in primitive.indexes[start:start + size]:
+                face.append(tuple(vertexes[v]) + tuple(normals[v]) + tuple(x for uv in uvs for x in uv[v]))
+            faces.append(tuple(face))
+    return sorted(faces)
+
+
+def resetWriter():
+    # ids and written objects are global to the writer
+    osgobject.Writer.resetWriter()
+    osgobject.Writer.wrote_elements = {}
+
+
+def createScene():
+    # small graph using the node, stateset, skeleton and animation types
+    # of the writer, a shared geode and a shared stateset
+    o = osgobject
+    resetWriter()
+    root = o.Group()
+    root.setName("Root")
+
+    geometry = o.Geometry()
+    geometry.setName("Cube")
+    geometry.vertexes = o.VertexArray(array = [[i * 0.5, -i * 0.25, 1.0] for i in range(0, 6)])
+    geometry.normals = o.NormalArray(array = [[0.0, 0.0, 1.0]] * 6)
+    geometry.uvs = {0: o.TexCoordArray(array = [[0.5, i * 0.125] for i in range(0, 6)])}
+    triangles = o.DrawElements()
+    triangles.type = "GL_TRIANGLES"
+    triangles.setIndexes([0, 1, 2, 2, 1, 3])
+    quads = o.DrawElements()
+    quads.type = "GL_QUADS"
+    quads.setIndexes([2, 3, 4, 5])
+    geometry.primitives = [triangles, quads]
+
+    stateset = o.StateSet()
+    material = o.Material()
+    material.setName("Material")
+    stateset.attributes.append(material)
+    stateset.modes["GL_BLEND"] = "ON"
+    texture = o.Texture2D()
+    texture.file = "textures/image.png"
+    stateset.texture_attributes[0] = [texture]
+    geometry.stateset = stateset
+
+    geode = o.Geode()
+    geode.setName("Mesh")
+    geode.drawables.append(geometry)
+    transform = o.MatrixTransform()
+    transform.setName("Cube")
+    transform.children.append(geode)
+    root.children.append(transform)
+    shared = o.MatrixTransform()
+    shared.setName("CubeInstance")
+    shared.children.append(geode)
+    root.children.append(shared)
+
+    callback = o.UpdateMatrixTransform(name = "Cube")
+    callback.stacked_transforms.append(o.StackedTranslateElement())
+    callback.stacked_transforms.append(o.StackedQuaternionElement())
+    transform.update_callbacks.append(callback)
+
+    skeleton = o.Skeleton("Armature", o.Matrix().to_4x4())
+    bone = o.Bone()
+    bone.setName("Bone")
+    bone.bone_inv_bind_matrix_skeleton = o.Matrix().to_4x4()
+    skeleton.children.append(bone)
+    rig = o.RigGeometry()
+    rig.vertexes = o.VertexArray(array = [[0.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    group = o.VertexGroup()
+    group.targetGroupName = "Bone"
+    group.vertexes = [(0, 1.0), (1, 0.5)]
+    rig.groups["Bone"] = group
+    rig_geode = o.Geode()
+    rig_geode.drawables.append(rig)
+    skeleton.children.append(rig_geode)
+    root.children.append(skeleton)
+
+    animation = o.Animation()
+    animation.setName("Action")
+    channel = o.Channel()
+    channel.type = "Vec3LinearChannel"
+    channel.setName("translate")
+    channel.target = "Cube"
+    channel.keys = [[i / 25.0, i * 1.0, i * 2.0, 0.5] for i in range(0, 10)]
+    animation.channels.append(channel)
+    manager = o.BasicAnimationManager()
+    manager.animations = [animation]
+    root.update_callbacks.append(manager)
+    return root
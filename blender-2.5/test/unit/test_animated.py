@@ -0,0 +1,89 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# objects baked before the scene traversal are the ones it animates
+
+import unittest
+
+import common
+import scenes
+from osg import osgbake, osgdata
+
+
+def createObject(name, paths, obj_type = "EMPTY", constraints = ()):
+    action = scenes.Item(name=name + "Action", fcurves=[scenes.Curve(path, 0) for path in paths])
+    animation_data = None
+    if len(paths) > 0:
+        animation_data = scenes.Item(action=action, nla_tracks=[])
+    return scenes.Item(name=name, type=obj_type, animation_data=animation_data, constraints=list(constraints))
+
+
+class Actions(object):
+    def __init__(self):
+        self.removed = []
+
+    def remove(self, action):
+        self.removed.append(action)
+
+
+class AnimatedObjectsTest(unittest.TestCase):
+    def setUp(self):
+        self.export = osgdata.Export()
+
+    def testTransformKeys(self):
+        moving = createObject("Moving", ["location"])
+        rotating = createObject("Rotating", ["rotation_euler"])
+        colored = createObject("Colored", ["color"])
+        static = createObject("Static", [])
+        self.assertEqual(self.export.getAnimatedObjects([moving, rotating, colored, static]), [moving, rotating])
+
+    def testConstraints(self):
+        constrained = createObject("Constrained", [], constraints = [scenes.Item(name="Track")])
+        self.assertEqual(self.export.getAnimatedObjects([constrained]), [constrained])
+        self.export.config.bake_constraints = False
+        self.assertEqual(self.export.getAnimatedObjects([constrained]), [])
+
+    def testArmatures(self):
+        armature = createObject("Armature", ["pose.bones[\"Bone\"].location"], "ARMATURE")
+        self.assertEqual(self.export.getAnimatedObjects([armature]), [armature])
+        self.export.config.export_anim = False
+        self.assertEqual(self.export.getAnimatedObjects([armature]), [])
+
+    def testUnusedBakedActionsAreRemoved(self):
+        actions = Actions()
+        data_actions = osgdata.bpy.data.actions
+        osgdata.bpy.data.actions = actions
+        try:
+            obj = createObject("Moving", ["location"])
+            baked = osgbake.BakedTransforms("Action", (1, 2))
+            self.export.baked_actions = { (obj, "MovingAction"): "baked action", (obj, "Other"): baked }
+            self.export.removeUnusedBakedActions()
+        finally:
+            osgdata.bpy.data.actions = data_actions
+        self.assertEqual(actions.removed, ["baked action"])
+        self.assertEqual(self.export.baked_actions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# bones looked up by name in their skeleton
+
+import unittest
+
+import common
+from osg import osgdata, osgobject
+
+
+def createSkeleton():
+    skeleton = osgobject.Skeleton("Armature", osgobject.Matrix().to_4x4())
+    parent = osgobject.Bone()
+    parent.setName("Spine")
+    child = osgobject.Bone()
+    child.setName("Head")
+    parent.children.append(child)
+    skeleton.children.append(parent)
+    skeleton.collectBones()
+    return (skeleton, parent, child)
+
+
+class FindBoneTest(unittest.TestCase):
+    def testNestedBone(self):
+        (skeleton, parent, child) = createSkeleton()
+        self.assertIs(osgdata.findBoneInSkeleton(skeleton, "Spine"), parent)
+        self.assertIs(osgdata.findBoneInSkeleton(skeleton, "Head"), child)
+        self.assertIs(osgdata.findBoneInSkeleton(skeleton, "Armature"), skeleton)
+
+    def testMissingBone(self):
+        (skeleton, parent, child) = createSkeleton()
+        self.assertIsNone(osgdata.findBoneInSkeleton(skeleton, "Tail"))
+        # the parent of the object is not exported or not an armature
+        self.assertIsNone(osgdata.findBoneInSkeleton(None, "Head"))
+        self.assertIsNone(osgdata.findBoneInSkeleton(osgobject.MatrixTransform(), "Head"))
+
+
+if __name__ == "__main__":
+    unittest.main()
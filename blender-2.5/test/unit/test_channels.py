@@ -0,0 +1,131 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# keyframe reduction of the animation channels and the channels built
+# from baked matrices
+
+import math
+import unittest
+
+import common
+import scenes
+from osg import osgbake, osgdata, osgobject
+
+
+def createChannel(name, channel_type, keys):
+    channel = osgobject.Channel()
+    channel.setName(name)
+    channel.type = channel_type
+    channel.keys = keys
+    return channel
+
+
+def interpolate(keys, time):
+    # linear value of the reduced keys at time
+    for (first, last) in zip(keys, keys[1:]):
+        if first[0] <= time <= last[0]:
+            t = (time - first[0]) / (last[0] - first[0])
+            return [a + (b - a) * t for (a, b) in zip(first[1:], last[1:])]
+    raise ValueError(time)
+
+
+class ReduceKeysTest(unittest.TestCase):
+    def testLinearKeysAreDropped(self):
+        channel = createChannel("translate", "Vec3LinearChannel", [[t / 25.0, t * 1.0, t * 2.0, 3.0] for t in range(0, 30)])
+        channel.reduceKeys(0.0001, 0.0)
+        self.assertEqual(channel.keys, [[0.0, 0.0, 0.0, 3.0], [29 / 25.0, 29.0, 58.0, 3.0]])
+
+    def testToleranceIsKept(self):
+        keys = [[t / 25.0, math.sin(t * 0.2), math.cos(t * 0.1), 0.0] for t in range(0, 60)]
+        channel = createChannel("translate", "Vec3LinearChannel", [list(k) for k in keys])
+        channel.reduceKeys(0.01, 0.0)
+        self.assertLess(len(channel.keys), len(keys))
+        for key in keys:
+            value = interpolate(channel.keys, key[0])
+            self.assertLessEqual(max(abs(a - b) for (a, b) in zip(value, key[1:])), 0.01 + 1e-9)
+
+    def testZeroToleranceKeepsKeys(self):
+        keys = [[t / 25.0, t * 1.0] for t in range(0, 10)]
+        channel = createChannel("euler_x", "FloatLinearChannel", [list(k) for k in keys])
+        channel.reduceKeys(0.0, 0.0)
+        self.assertEqual(channel.keys, keys)
+
+    def testQuaternionsAreReducedOnTheSphere(self):
+        # constant rotation speed, spherical interpolation of the ends
+        # gives every key
+        keys = [[t / 25.0, 0.0, 0.0, math.sin(t * 0.05), math.cos(t * 0.05)] for t in range(0, 30)]
+        channel = createChannel("quaternion", "QuatSphericalLinearChannel", keys)
+        channel.reduceKeys(0.0, 0.0001)
+        self.assertEqual(len(channel.keys), 2)
+
+    def testAxisAngleIsReducedLinearly(self):
+        # unit length values that are no quaternions
+        keys = [[t / 25.0, math.cos(t * 0.1) * 0.6, math.sin(t * 0.1) * 0.6, 0.0, 0.8] for t in range(0, 30)]
+        channel = createChannel("axis_angle", "QuatSphericalLinearChannel", [list(k) for k in keys])
+        channel.reduceKeys(0.0001, 10.0)
+        self.assertEqual(len(channel.keys), len(keys))
+
+    def testKeysAtTheSameTime(self):
+        channel = createChannel("translate", "Vec3LinearChannel",
+                                [[0.0, 0.0, 0.0, 0.0], [0.0, 1.0, 1.0, 1.0], [0.5, 2.0, 2.0, 2.0], [1.0, 3.0, 3.0, 3.0]])
+        channel.reduceKeys(0.0001, 0.0)
+        self.assertEqual(channel.keys, [[0.0, 1.0, 1.0, 1.0], [1.0, 3.0, 3.0, 3.0]])
+        channel = createChannel("translate", "Vec3LinearChannel", [[0.0, 1.0, 1.0, 1.0], [0.0, 1.0, 1.0, 1.0]])
+        channel.reduceKeys(0.0001, 0.0)
+        self.assertEqual(len(channel.keys), 2)
+
+
+class BakedChannelsTest(unittest.TestCase):
+    def bake(self, frames = 20):
+        scene = scenes.Scene()
+        armature = scenes.createArmatures(scene, 1, 2)[0]
+        return (armature, osgbake.bakeBatch(scene, [armature], 1, frames, 1,
+                                            False, True, True, False, False, True)[armature])
+
+    def testBoneChannels(self):
+        (armature, baked) = self.bake()
+        self.assertEqual(baked.frame_range, (1, 20))
+        channels = osgdata.exportBakedTransformsToChannels("Bone0", baked, 25.0, "pose.bones[\"Bone0\"].")
+        self.assertEqual([c.name for c in channels], ["translate", "quaternion", "scale"])
+        self.assertEqual([c.type for c in channels], ["Vec3LinearChannel", "QuatSphericalLinearChannel", "Vec3LinearChannel"])
+        translate = channels[0]
+        self.assertEqual(len(translate.keys), 20)
+        self.assertAlmostEqual(translate.keys[0][0], 1 / 25.0)
+        # constant scale only keeps its ends
+        self.assertEqual(len(channels[2].keys), 2)
+        for key in channels[1].keys:
+            self.assertAlmostEqual(sum(v * v for v in key[1:]), 1.0)
+
+    def testSingleFrameHasTwoKeys(self):
+        (armature, baked) = self.bake(1)
+        channels = osgdata.exportBakedTransformsToChannels("Bone0", baked, 25.0, "pose.bones[\"Bone0\"].")
+        self.assertTrue(all(len(c.keys) == 2 for c in channels))
+
+    def testUnknownPrefix(self):
+        (armature, baked) = self.bake()
+        self.assertEqual(osgdata.exportBakedTransformsToChannels("Bone9", baked, 25.0, "pose.bones[\"Bone9\"]."), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# conversion of the meshes to geometries: splitting for 16 bits indexes,
+# geometry cache and shared arrays
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import common
+import scenes
+from osg import osgmesh, osgobject
+
+
+class SplitTest(unittest.TestCase):
+    def setUp(self):
+        (obj, mesh) = scenes.createGridMesh(12, materials = 1)
+        self.converter = common.createConverter(obj, mesh)
+        self.geometry = self.converter.convert()[0]
+
+    def testSmallGeometryIsKept(self):
+        self.assertEqual(self.converter.splitGeometry(self.geometry), [self.geometry])
+
+    def testSplitKeepsFacesAndInfluences(self):
+        parts = self.converter.splitGeometry(self.geometry, 60)
+        self.assertGreater(len(parts), 1)
+        faces = []
+        for part in parts:
+            count = len(part.vertexes.getArray())
+            self.assertLessEqual(count, 60)
+            self.assertEqual(len(part.normals.getArray()), count)
+            for uv in part.uvs.values():
+                self.assertEqual(len(uv.getArray()), count)
+            for group in part.groups.values():
+                self.assertTrue(all(v < count for (v, weight) in group.vertexes))
+            faces.extend(common.getFaces(part))
+        self.assertEqual(sorted(faces), common.getFaces(self.geometry))
+        weights = sum(len(group.vertexes) for group in self.geometry.groups.values())
+        split_weights = sum(len(group.vertexes) for part in parts for group in part.groups.values())
+        self.assertGreaterEqual(split_weights, weights)
+
+    def testSplitUses16BitsIndexes(self):
+        large = osgobject.DrawElements()
+        large.setIndexes([0, 1, 70000])
+        self.assertEqual(large.getSizeArray(), "DrawElementsUInt")
+        for part in self.converter.splitGeometry(self.geometry, 300):
+            for primitive in part.primitives:
+                self.assertNotEqual(primitive.getSizeArray(), "DrawElementsUInt")
+
+    def testElementTypeFromVertexCount(self):
+        elements = osgobject.DrawElements()
+        elements.setIndexes([0, 1, 2])
+        elements.vertex_count = 256
+        self.assertEqual(elements.getSizeArray(), "DrawElementsUByte")
+        elements.vertex_count = 257
+        self.assertEqual(elements.getSizeArray(), "DrawElementsUShort")
+        for part in self.converter.splitGeometry(self.geometry, 300):
+            for primitive in part.primitives:
+                self.assertEqual(primitive.vertex_count, len(part.vertexes.getArray()))
+                self.assertLess(max(primitive.indexes), primitive.vertex_count)
+
+
+class GeometryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        (self.obj, self.mesh) = scenes.createGridMesh(8)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def convert(self):
+        cache = osgmesh.GeometryCache(self.directory)
+        return [common.getFaces(g) for g in common.createConverter(self.obj, self.mesh, geometry_cache = cache).convert()]
+
+    def testSecondExportReadsTheCache(self):
+        calls = []
+        build = osgmesh.buildGeometryData
+        def countingBuild(*args):
+            calls.append(args)
+            return build(*args)
+        osgmesh.buildGeometryData = countingBuild
+        try:
+            first = self.convert()
+            converted = len(calls)
+            second = self.convert()
+        finally:
+            osgmesh.buildGeometryData = build
+        self.assertGreater(converted, 0)
+        self.assertEqual(len(calls), converted)
+        self.assertEqual(first, second)
+
+    def testEntryRoundTrip(self):
+        cache = osgmesh.GeometryCache(self.directory)
+        converter = common.createConverter(self.obj, self.mesh)
+        job = converter.getGeometryJob(self.mesh, 0)
+        result = osgmesh.buildGeometryData(*job)
+        key = cache.getKey(*job)
+        self.assertIsNone(cache.load(key))
+        cache.store(key, result)
+        (loaded,) = cache.load(key)
+        self.assertEqual(loaded.__dict__, result.__dict__)
+        cache.store("empty", None)
+        self.assertEqual(cache.load("empty"), (None,))
+
+    def testBrokenEntryIsAMiss(self):
+        cache = osgmesh.GeometryCache(self.directory)
+        with open(cache.getFileName("broken"), "wb") as sfile:
+            sfile.write(b"\x80\x03cos\nsystem\n")
+        self.assertIsNone(cache.load("broken"))
+
+    def testPrune(self):
+        cache = osgmesh.GeometryCache(self.directory)
+        for (key, age) in (("old", 40), ("recent", 1), ("new", 0)):
+            cache.store(key, None)
+            mtime = os.path.getmtime(cache.getFileName(key)) - age * 24 * 3600
+            os.utime(cache.getFileName(key), (mtime, mtime))
+        self.assertEqual(cache.prune(), 1)
+        self.assertFalse(os.path.exists(cache.getFileName("old")))
+        size = os.path.getsize(cache.getFileName("new"))
+        self.assertEqual(cache.prune(max_bytes = size), 1)
+        self.assertEqual(os.listdir(self.directory), ["new.cache"])
+
+
+class InternArraysTest(unittest.TestCase):
+    def createRoot(self):
+        common.resetWriter()
+        root = osgobject.Group()
+        for i in range(0, 2):
+            (obj, mesh) = scenes.createGridMesh(5, materials = 1)
+            geode = osgobject.Geode()
+            geode.drawables.extend(common.createConverter(obj, mesh).convert())
+            root.children.append(geode)
+        return root
+
+    def testIdenticalArraysAreShared(self):
+        root = self.createRoot()
+        # vertexes, normals and uvs of the second mesh
+        self.assertEqual(osgobject.internArrays(root), 3)
+        (first, second) = [geode.drawables[0] for geode in root.children]
+        self.assertIs(first.vertexes.array, second.vertexes.array)
+        self.assertIs(first.normals.array, second.normals.array)
+
+    def testSharedArraysAreWrittenOnce(self):
+        root = self.createRoot()
+        output = io.BytesIO()
+        root.writeFile(output)
+        full = output.getvalue()
+
+        root = self.createRoot()
+        osgobject.internArrays(root)
+        output = io.BytesIO()
+        root.writeFile(output)
+        interned = output.getvalue()
+        self.assertEqual(full.count(b"Array TRUE ArrayID"), interned.count(b"Array TRUE ArrayID"))
+        self.assertEqual(interned.count(b"{\n"), full.count(b"{\n") - 3)
+        self.assertLess(len(interned), len(full))
+
+
+if __name__ == "__main__":
+    unittest.main()
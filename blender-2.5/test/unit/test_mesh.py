@@ -0,0 +1,151 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# welding, triangulation and vertex cache ordering of osgmesh
+
+import random
+import unittest
+
+import common
+import scenes
+from osg import osgmesh
+
+
+def referenceWeld(attributes, count, digits = osgmesh.WELD_DIGITS):
+    # vertexes with the same rounded attributes are merged, in order of
+    # first use
+    keys = {}
+    mapping = []
+    merged = []
+    for i in range(0, count):
+        key = tuple(tuple(round(v, digits) for v in values[i * dim:(i + 1) * dim]) for (values, dim) in attributes)
+        if key not in keys:
+            keys[key] = len(merged)
+            merged.append(i)
+        mapping.append(keys[key])
+    return (mapping, merged)
+
+
+def createAttributes(count, seed = 1):
+    rand = random.Random(seed)
+    coords = []
+    normals = []
+    uvs = []
+    for i in range(0, count):
+        # few distinct values so many corners are welded
+        coords.extend([rand.randint(0, 3) * 0.5, rand.randint(0, 3) * 0.5, 0.0])
+        normals.extend([0.0, 0.0, 1.0 if rand.random() < 0.5 else -1.0])
+        uvs.extend([rand.randint(0, 1) * 0.5, 0.25])
+    return [(coords, 3), (normals, 3), (uvs, 2)]
+
+
+def getCacheMissRatio(indexes, face_size, cache_size = 32):
+    # vertexes transformed per face with a fifo cache
+    cache = []
+    misses = 0
+    for v in indexes:
+        if v not in cache:
+            misses += 1
+            cache.append(v)
+            if len(cache) > cache_size:
+                cache.pop(0)
+    return misses / (len(indexes) / float(face_size))
+
+
+class WeldTest(unittest.TestCase):
+    def testSameAsReference(self):
+        attributes = createAttributes(2000)
+        self.assertEqual(osgmesh.weldVertexes(attributes, 2000), referenceWeld(attributes, 2000))
+
+    def testNearlyEqualValuesAreWelded(self):
+        attributes = [([0.0, 0.0, 0.0, 0.000001, 0.0, 0.0, 1.0, 0.0, 0.0], 3)]
+        (mapping, merged) = osgmesh.weldVertexes(attributes, 3)
+        self.assertEqual(mapping, [0, 0, 1])
+        self.assertEqual(merged, [0, 2])
+
+    @unittest.skipIf(osgmesh.numpy is None, "numpy not installed")
+    def testNumpyWeldSameAsPython(self):
+        attributes = createAttributes(2000, seed = 2)
+        expected = referenceWeld(attributes, 2000)
+        (mapping, merged) = osgmesh.weldVertexesNumpy(attributes, 2000, osgmesh.WELD_DIGITS)
+        self.assertEqual((list(mapping), list(merged)), expected)
+
+
+class TriangulateTest(unittest.TestCase):
+    def testQuadsAreSplit(self):
+        self.assertEqual(osgmesh.triangulateFaces([[0, 1, 2, 3], [4, 5, 6]]),
+                         [[0, 1, 2], [0, 2, 3], [4, 5, 6]])
+
+    def testShortestDiagonal(self):
+        # the 1-3 diagonal is shorter than the 0-2 one
+        positions = { 0: (0.0, 0.0, 0.0), 1: (1.0, 0.0, 0.0), 2: (3.0, 1.0, 0.0), 3: (0.0, 1.0, 0.0) }
+        triangles = osgmesh.triangulateFaces([[0, 1, 2, 3]], lambda v: positions[v])
+        self.assertEqual(triangles, [[0, 1, 3], [1, 2, 3]])
+
+    def testConvertedGeometryHasOnlyTriangles(self):
+        from osg import osgconf
+        (obj, mesh) = scenes.createGridMesh(8, materials = 1)
+        quads = common.createConverter(obj, mesh).convert()[0]
+        config = osgconf.Config()
+        config.triangulate = True
+        triangles = common.createConverter(obj, mesh, config).convert()[0]
+        self.assertEqual([p.type for p in triangles.primitives], ["GL_TRIANGLES"])
+        quad_corners = sum(len(p.indexes) for p in quads.primitives if p.type == "GL_QUADS")
+        triangle_corners = sum(len(p.indexes) for p in quads.primitives if p.type == "GL_TRIANGLES")
+        self.assertEqual(len(triangles.primitives[0].indexes), triangle_corners + quad_corners // 4 * 6)
+
+
+class VertexCacheTest(unittest.TestCase):
+    def createShuffledGrid(self, width = 40):
+        triangles = []
+        for y in range(0, width):
+            for x in range(0, width):
+                a = y * (width + 1) + x
+                c = a + width + 1
+                triangles.append((a, a + 1, c + 1))
+                triangles.append((a, c + 1, c))
+        random.Random(1).shuffle(triangles)
+        return ([v for t in triangles for v in t], (width + 1) * (width + 1))
+
+    def testSameTrianglesFewerMisses(self):
+        (indexes, count) = self.createShuffledGrid()
+        optimized = osgmesh.optimizeVertexCache(indexes, 3, count)
+        self.assertEqual(sorted(tuple(indexes[i:i + 3]) for i in range(0, len(indexes), 3)),
+                         sorted(tuple(optimized[i:i + 3]) for i in range(0, len(optimized), 3)))
+        self.assertLess(getCacheMissRatio(optimized, 3), getCacheMissRatio(indexes, 3) * 0.5)
+
+    def testFetchOrderIsAPermutation(self):
+        (indexes, count) = self.createShuffledGrid(10)
+        (order, primitives) = osgmesh.optimizeVertexFetch([indexes], count)
+        self.assertEqual(sorted(order), list(range(0, count)))
+        # vertexes are numbered in order of first use
+        first_use = []
+        for v in primitives[0]:
+            if v not in first_use:
+                first_use.append(v)
+        self.assertEqual(first_use, list(range(0, len(first_use))))
+
+
+if __name__ == "__main__":
+    unittest.main()
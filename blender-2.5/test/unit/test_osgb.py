@@ -0,0 +1,138 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# the .osgb writer checked against data/scene.osgb, a file written by the
+# writer itself: the comparison only catches unintended changes of the
+# output. the scene is read back with osgconv when it is installed. after
+# an intended change of the binary output regenerate the file with
+#
+#   OSGEXPORT_UPDATE_GOLDEN=1 python3 test_osgb.py
+#
+# and read it with osgconv data/scene.osgb scene.osgt before committing it
+
+import io
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+
+import common
+from osg import osgconf, osgdata, osgobject
+
+GOLDEN = os.path.join(common.DATA, "scene.osgb")
+
+
+def writeScene():
+    output = io.BytesIO()
+    common.createScene().writeBinaryFile(output)
+    return output.getvalue()
+
+
+def findOsgconv():
+    return os.getenv("OSGCONV") or shutil.which("osgconv")
+
+
+class BinaryWriterTest(unittest.TestCase):
+    def testHeader(self):
+        (magic0, magic1, file_type, version, options) = struct.unpack("<IIIII", writeScene()[:20])
+        self.assertEqual((magic0, magic1), osgobject.BINARY_MAGIC)
+        self.assertEqual(file_type, 1)
+        self.assertEqual(version, osgobject.BINARY_VERSION)
+
+    def testSharedObjectsWrittenOnce(self):
+        data = writeScene()
+        # the class name is written before the id of every occurence, the
+        # content of the geode shared by two transforms only once
+        self.assertEqual(data.count(b"osg::Geode"), 3)
+        self.assertEqual(data.count(b"GeodeMesh"), 1)
+
+    def testSameOutputTwice(self):
+        self.assertEqual(writeScene(), writeScene())
+
+    def testGolden(self):
+        data = writeScene()
+        if os.getenv("OSGEXPORT_UPDATE_GOLDEN"):
+            with open(GOLDEN, "wb") as sfile:
+                sfile.write(data)
+            self.skipTest("golden file updated")
+        with open(GOLDEN, "rb") as sfile:
+            self.assertEqual(data, sfile.read())
+
+    @unittest.skipUnless(findOsgconv(), "osgconv not found")
+    def testOsgconvReadBack(self):
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, "scene.osgb")
+            converted = os.path.join(directory, "scene.osgt")
+            with open(source, "wb") as sfile:
+                sfile.write(writeScene())
+            subprocess.check_call([findOsgconv(), source, converted])
+            with open(converted, "rb") as sfile:
+                text = sfile.read()
+            self.assertIn(b"osgAnimation::Skeleton", text)
+            self.assertIn(b"osgAnimation::BasicAnimationManager", text)
+        finally:
+            shutil.rmtree(directory)
+
+
+class OsgconvStepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.calls = []
+        self.call = osgdata.subprocess.call
+        osgdata.subprocess.call = lambda args: self.calls.append(args) or 0
+
+    def tearDown(self):
+        osgdata.subprocess.call = self.call
+        shutil.rmtree(self.directory)
+
+    def export(self, binary):
+        config = osgconf.Config()
+        config.initFilePaths(os.path.join(self.directory, "scene"))
+        config.binary = binary
+        config.run_osgconv = True
+        config.osgconv_cleanup = True
+        export = osgdata.Export(config)
+        export.root = common.createScene()
+        export.items = [export.root]
+        export.writeFiles()
+
+    def testBinaryExportIsKept(self):
+        # the default osgconv extension is the one of the binary export
+        self.export(True)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(os.listdir(self.directory), ["scene.osgb"])
+
+    def testTextExportIsConverted(self):
+        self.export(False)
+        source = os.path.join(self.directory, "scene.osgt")
+        self.assertEqual([args[-2:] for args in self.calls], [[source, os.path.join(self.directory, "scene.osgb")]])
+        # removed by the cleanup
+        self.assertFalse(os.path.exists(source))
+
+
+if __name__ == "__main__":
+    unittest.main()
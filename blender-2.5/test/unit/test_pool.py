@@ -0,0 +1,85 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# conversion of the meshes in worker processes
+
+import os
+import signal
+import sys
+import time
+import unittest
+
+import common
+import scenes
+from osg import osgdata, osgmesh
+
+PARENT = os.getpid()
+build = osgmesh.buildGeometryData
+
+
+def dyingBuild(*args):
+    # the worker is killed like by the system or a crash, without error
+    if os.getpid() != PARENT:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return build(*args)
+
+
+def convert(pool, materials = 2):
+    (obj, mesh) = scenes.createGridMesh(8, materials = materials)
+    converter = common.createConverter(obj, mesh)
+    if pool is not None:
+        converter.submitJobs(pool)
+    return [common.getFaces(g) for g in converter.convert()]
+
+
+@unittest.skipIf(not sys.platform.startswith("linux"), "needs forked workers")
+class WorkerPoolTest(unittest.TestCase):
+    def tearDown(self):
+        osgmesh.buildGeometryData = build
+
+    def testSameAsSerial(self):
+        pool = osgdata.WorkerPool(2)
+        try:
+            self.assertEqual(convert(pool), convert(None))
+            self.assertFalse(pool.isBroken())
+        finally:
+            pool.terminate()
+
+    def testKilledWorker(self):
+        # the forked workers convert with dyingBuild
+        osgmesh.buildGeometryData = dyingBuild
+        pool = osgdata.WorkerPool(2)
+        try:
+            start = time.time()
+            converted = convert(pool)
+            self.assertTrue(pool.isBroken())
+            self.assertLess(time.time() - start, 30.0)
+        finally:
+            pool.terminate()
+        osgmesh.buildGeometryData = build
+        self.assertEqual(converted, convert(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
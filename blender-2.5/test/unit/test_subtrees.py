@@ -0,0 +1,131 @@
+# -*- python-indent: 4; mode: python -*-
+# -*- coding: UTF-8 -*-
+#
+# Copyright (C) 2008-2012 Cedric Pinson
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#  Cedric Pinson <cedric.pinson@plopbyte.com>
+
+
+
+# the children of the root written in worker processes give the output of
+# the serial writer
+
+import io
+import os
+import unittest
+
+import common
+import scenes
+from osg import osgdata, osgobject, osgstats
+
+
+def createRoot():
+    # the scene of common with two meshes sharing their arrays and a
+    # stateset and more children than workers
+    root = common.createScene()
+    stateset = osgobject.StateSet()
+    stateset.attributes.append(osgobject.Material())
+    for i in range(0, 4):
+        (obj, mesh) = scenes.createGridMesh(6, materials = 1)
+        geode = osgobject.Geode()
+        geode.setName("Grid%d" % i)
+        geode.drawables.extend(common.createConverter(obj, mesh).convert())
+        geode.stateset = stateset
+        root.children.append(geode)
+    osgobject.internArrays(root)
+    return root
+
+
+def write(root, processes, stats = None):
+    osgobject.Writer.wrote_elements = {}
+    sfile = io.BytesIO()
+    output = osgobject.OutputBuffer(sfile)
+    if stats is not None:
+        output.countBytes(stats)
+    pool = None
+    if processes > 1:
+        subtrees = osgobject.SubtreeWriter(root, output)
+        pool = osgdata.WorkerPool(processes, True)
+        subtrees.submit(pool)
+    try:
+        root.writeFile(output)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        osgobject.SubtreeWriter.current = None
+    return sfile.getvalue()
+
+
+def writeCounting(root):
+    # output with two workers and the count of children written by them
+    written = []
+    writeSerialized = osgobject.OutputBuffer.writeSerialized
+    def countingWriteSerialized(output, text, counters):
+        written.append(text)
+        return writeSerialized(output, text, counters)
+    osgobject.OutputBuffer.writeSerialized = countingWriteSerialized
+    try:
+        data = write(root, 2)
+    finally:
+        osgobject.OutputBuffer.writeSerialized = writeSerialized
+    return (data, len(written))
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs forked workers")
+class SubtreeWriterTest(unittest.TestCase):
+    def testSameAsSerial(self):
+        root = createRoot()
+        serial = write(root, 1)
+        self.assertEqual(write(root, 2), serial)
+        self.assertEqual(write(root, 3), serial)
+
+    def testChildrenWrittenByWorkers(self):
+        root = createRoot()
+        self.assertEqual(writeCounting(root)[1], len(root.children))
+
+    def testWrongAssumption(self):
+        # the stateset is reachable from the first child but only written
+        # by the following ones, their workers reference it
+        root = createRoot()
+        root.children[0].extra = root.children[-1].stateset
+        (data, count) = writeCounting(root)
+        self.assertEqual(data, write(root, 1))
+        # the child writing the stateset is written again in order
+        self.assertEqual(count, len(root.children) - 1)
+
+    def testSpilledArrays(self):
+        root = createRoot()
+        spill = osgobject.ArraySpill()
+        try:
+            for data in osgobject.collectInstances(root, osgobject.ArrayData):
+                data.spill(spill)
+            self.assertEqual(write(root, 2), write(root, 1))
+        finally:
+            spill.close()
+
+    def testByteCounters(self):
+        root = createRoot()
+        serial = osgstats.Stats()
+        write(root, 1, serial)
+        parallel = osgstats.Stats()
+        write(root, 2, parallel)
+        self.assertEqual(parallel.counters, serial.counters)
+
+
+if __name__ == "__main__":
+    unittest.main()